@@ -0,0 +1,58 @@
+# Microbenchmark of the data transfer rates of pyferret.getdata and 
+# pyferret.putdata for several array shapes.  Not part of the benchmark 
+# tests (timings vary); run in python after importing and starting 
+# pyferret, such as from running "pyferret -python < benchgetputdata.py"
+
+from __future__ import print_function
+
+import sys ; sys.ps1 = '' ; sys.ps2 = ''
+import time
+import numpy
+
+# (description, X size, Y size, Z size, T size, Ferret subset qualifiers)
+shapes = (
+    ("X full",         4000000,    1,  1,   1, ""),
+    ("X-Y full",          2000, 2000,  1,   1, ""),
+    ("X-Y-T full",         360,  180,  1,  60, ""),
+    ("X-Y-T subset",       360,  180,  1,  60, "[i=21:340,j=11:170]"),
+    ("X-Z-T thin-X",         4,   10, 50, 500, ""),
+)
+numreps = 5
+
+pyferret.run('SET MEMORY /SIZE=500')
+print("%-16s %12s %12s %12s %12s" % ("shape", "num values", "get GB/s", "put GB/s", "nocopy GB/s"))
+for (descript, nx, ny, nz, nt, subset) in shapes:
+    pyferret.run('CANCEL VARIABLE /ALL')
+    pyferret.run('DEFINE AXIS /X=1:%d:1 xbench' % nx)
+    pyferret.run('DEFINE AXIS /Y=1:%d:1 ybench' % ny)
+    pyferret.run('DEFINE AXIS /Z=1:%d:1 zbench' % nz)
+    pyferret.run('DEFINE AXIS /T=1:%d:1 tbench' % nt)
+    pyferret.run('DEFINE GRID /X=xbench /Y=ybench /Z=zbench /T=tbench gbench')
+    pyferret.run('LET benchvar = X[g=gbench] + Y[g=gbench] + Z[g=gbench] + T[g=gbench]')
+    pyferret.run('LOAD benchvar')
+    name = 'benchvar' + subset
+    # first call outside the timing to have Ferret cache the result
+    datadict = pyferret.getdata(name, False)
+    nbytes = datadict['data'].nbytes
+    starttime = time.time()
+    for k in range(numreps):
+        datadict = pyferret.getdata(name, False)
+    getrate = numreps * nbytes / (time.time() - starttime) / 1.0E9
+    datadict['name'] = 'putbench'
+    starttime = time.time()
+    for k in range(numreps):
+        pyferret.putdata(datadict)
+    putrate = numreps * nbytes / (time.time() - starttime) / 1.0E9
+    starttime = time.time()
+    for k in range(numreps):
+        pyferret.putdata(datadict, copy=False)
+    nocopyrate = numreps * nbytes / (time.time() - starttime) / 1.0E9
+    pyferret.run('CANCEL PYVAR putbench')
+    print("%-16s %12d %12.3f %12.3f %12.3f" % (descript, datadict['data'].size, getrate, putrate, nocopyrate))
+
+pyferret.run('CANCEL VARIABLE /ALL')
+pyferret.run('CANCEL GRID gbench')
+pyferret.run('CANCEL AXIS xbench')
+pyferret.run('CANCEL AXIS ybench')
+pyferret.run('CANCEL AXIS zbench')
+pyferret.run('CANCEL AXIS tbench')
@@ -0,0 +1,65 @@
+# To be run in python after importing and starting pyferret
+# such as from running "pyferret -python"
+
+from __future__ import print_function
+
+import sys ; sys.ps1 = '' ; sys.ps2 = ''
+import numpy
+print()
+
+def checkchunks(chunks, fulldict, axis, size):
+    '''
+    Checks that the (coords, data) chunks along axis, each with at most
+    size points, reassemble to the data and coordinates of fulldict
+    '''
+    fulldata = numpy.asarray(fulldict['data'])
+    fullcoords = fulldict['axis_coords'][axis]
+    sizes = [ chunk[1].shape[axis] for chunk in chunks ]
+    print('chunk sizes along axis %d: %s' % (axis, str(sizes)))
+    if max(sizes) > size:
+        raise ValueError('chunk larger than %d' % size)
+    data = numpy.concatenate([ numpy.asarray(chunk[1]) for chunk in chunks ], axis=axis)
+    if data.shape != fulldata.shape:
+        raise ValueError('shape of the reassembled data %s does not match %s' % \
+                         (str(data.shape), str(fulldata.shape)))
+    if not numpy.array_equal(data, fulldata):
+        raise ValueError('reassembled data does not match')
+    coords = numpy.concatenate([ chunk[0] for chunk in chunks ], axis=0)
+    if not numpy.array_equal(coords, fullcoords):
+        raise ValueError('reassembled coordinates do not match')
+
+print(">>> coads = pyferret.FerDSet('coads_climatology.cdf')")
+coads = pyferret.FerDSet('coads_climatology.cdf')
+
+# 12 time steps in chunks of 5 (5, 5, 2)
+print(">>> chunks = list(pyferret.iterdata('sst[d=coads_climatology]', 'T', 5, False))")
+chunks = list(pyferret.iterdata('sst[d=coads_climatology]', 'T', 5, False))
+checkchunks(chunks, pyferret.getdata('sst[d=coads_climatology]', False), pyferret.T_AXIS, 5)
+
+# 90 latitudes in chunks of 7 (twelve of 7 and one of 6), with other qualifiers
+print(">>> chunks = list(pyferret.iterdata('sst[d=coads_climatology,x=120E:60W,l=2:3]', 'Y', 7, False))")
+chunks = list(pyferret.iterdata('sst[d=coads_climatology,x=120E:60W,l=2:3]', 'Y', 7, False))
+checkchunks(chunks, pyferret.getdata('sst[d=coads_climatology,x=120E:60W,l=2:3]', False), pyferret.Y_AXIS, 7)
+
+# a chunk size larger than the axis
+print(">>> chunks = list(pyferret.iterdata('sst[d=1]', pyferret.T_AXIS, 100, False))")
+chunks = list(pyferret.iterdata('sst[d=1]', pyferret.T_AXIS, 100, False))
+checkchunks(chunks, pyferret.getdata('sst[d=1]', False), pyferret.T_AXIS, 100)
+
+# FerVar.iterchunks uses the qualified name of the variable
+print(">>> chunks = list(coads.sst.iterchunks('T', 5))")
+chunks = list(coads.sst.iterchunks('T', 5))
+checkchunks(chunks, pyferret.getdata(coads.sst.fername(), False), pyferret.T_AXIS, 5)
+print(">>> chunks = list(coads.sst.iterchunks('X', 50))")
+chunks = list(coads.sst.iterchunks('X', 50))
+checkchunks(chunks, pyferret.getdata(coads.sst.fername(), False), pyferret.X_AXIS, 50)
+
+# slice limits missing from a subset of a qualified variable are taken from its grid
+print(">>> coads.sst2 = coads.sst['85N':,'25E':'29E',:,1]")
+coads.sst2 = coads.sst['85N':,'25E':'29E',:,1]
+print(">>> coads.sst2.data.shape")
+print(coads.sst2.data.shape)
+
+print(">>> coads.close()")
+coads.close()
+print('iterdata and iterchunks: SUCCESS')
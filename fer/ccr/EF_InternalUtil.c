@@ -1679,6 +1679,7 @@ void FORTRAN(create_pyefcn)(char fname[], int *lenfname, char pymod[], int *lenp
 
     *lenerrstring = strlen(errstring);
     if ( *lenerrstring > 0 ) {
+        pyefcn_unregister(ef_ptr->id);
         list_remove_rear(STATIC_ExternalFunctionList, __FILE__, __LINE__);
         FerMem_Free(ef_ptr->internals_ptr, __FILE__, __LINE__);
         FerMem_Free(ef_ptr, __FILE__, __LINE__);
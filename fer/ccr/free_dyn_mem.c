@@ -2,6 +2,12 @@
  * free c heap storage that was used by a Ferret mvar
  *
  * V702 1/17 *sh* for trac enhancement #2369 -- dynamic memory management
+ *
+ * The storage of an mvar may also be referenced from Python (read-only
+ * views of the data returned by pyferret.getdata).  Such storage is
+ * "held" with hold_dyn_mem; if Ferret frees held storage (the variable
+ * is canceled, redefined, purged, or deleted to make room), the free is
+ * deferred until the last hold is released with release_dyn_mem.
  */
 
 #include <Python.h> /* make sure Python.h is first */
@@ -9,8 +15,93 @@
 #include "ferret.h"
 #include "FerMem.h"
 
+/* Storage that is held, the number of holds, and if Ferret has freed it */
+typedef struct HeldDynMem_ {
+    double *mvar;
+    int     numholds;
+    int     freed;
+} HeldDynMem;
+
+static HeldDynMem *heldDynMem = NULL;
+static int         numHeldDynMem = 0;
+static int         maxHeldDynMem = 0;
+
+/*
+ * Returns the index in heldDynMem of the storage mvar, or -1 if not held.
+ * Only a few blocks of storage are expected to be held at any time.
+ */
+static int findHeldDynMem(double *mvar)
+{
+  int k;
+
+  for (k = 0; k < numHeldDynMem; k++) {
+    if ( heldDynMem[k].mvar == mvar )
+      return k;
+  }
+  return -1;
+}
+
+/*
+ * Adds a hold on the storage mvar of a Ferret mvar, preventing it from
+ * being released by free_dyn_mem until the hold is released.
+ * Returns 0 if successful, or -1 if memory for the hold could not be allocated.
+ */
+int hold_dyn_mem(double *mvar)
+{
+  HeldDynMem *newHeld;
+  int k;
+
+  k = findHeldDynMem(mvar);
+  if ( k >= 0 ) {
+    heldDynMem[k].numholds++;
+    return 0;
+  }
+  if ( numHeldDynMem >= maxHeldDynMem ) {
+    newHeld = (HeldDynMem *) FerMem_Realloc(heldDynMem,
+                  (maxHeldDynMem + 16) * sizeof(HeldDynMem), __FILE__, __LINE__);
+    if ( newHeld == NULL )
+      return -1;
+    heldDynMem = newHeld;
+    maxHeldDynMem += 16;
+  }
+  heldDynMem[numHeldDynMem].mvar = mvar;
+  heldDynMem[numHeldDynMem].numholds = 1;
+  heldDynMem[numHeldDynMem].freed = 0;
+  numHeldDynMem++;
+  return 0;
+}
+
+/*
+ * Releases a hold on the storage mvar added by hold_dyn_mem.
+ * If this was the last hold and Ferret has already freed
+ * this storage, the storage is actually freed here.
+ */
+void release_dyn_mem(double *mvar)
+{
+  int k;
+
+  k = findHeldDynMem(mvar);
+  if ( k < 0 )
+    return;
+  heldDynMem[k].numholds--;
+  if ( heldDynMem[k].numholds > 0 )
+    return;
+  if ( heldDynMem[k].freed )
+    FerMem_Free( mvar, __FILE__, __LINE__ );
+  numHeldDynMem--;
+  heldDynMem[k] = heldDynMem[numHeldDynMem];
+}
+
 void FORTRAN(free_dyn_mem)(double *mvar)
 {
+  int k;
+
+  /* if held, free when the last hold is released */
+  k = findHeldDynMem(mvar);
+  if ( k >= 0 ) {
+    heldDynMem[k].freed = 1;
+    return;
+  }
   FerMem_Free( mvar, __FILE__, __LINE__ );
   mvar = NULL;
 }
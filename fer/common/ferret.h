@@ -43,6 +43,8 @@
 FILE *executableOutput(char *exeArgv[], pid_t *childPidPtr, char errMsg[]);
 void ferret_dispatch_c(char *init_command, smPtr sBuffer);
 int  getJavaVersion(char javaExeName[], char errMsg[]);
+int  hold_dyn_mem(double *mvar);
+void release_dyn_mem(double *mvar);
 void set_batch_graphics( char *outfile, int *pngonly );
 void set_secure(void);
 void set_server(void);
@@ -47,6 +47,10 @@ from pyferret import libpyferret
 # so constants in that module are seen as part of this module
 from pyferret.libpyferret import *
 
+# arrays in shared memory for passing data between processes
+from pyferret import shareddata
+from pyferret.shareddata import *
+
 # methods for transferring data between the Ferret engine and Python
 from pyferret import datamethods
 # also import the methods given in datamethods into pyferret
@@ -750,6 +754,7 @@ def start(memsize=125, journal=True, verify=False, restrict=False,
                   "stats.stats_pmf",
                   "stats.stats_ppf",
                   "stats.stats_rvs",
+                  "stats.stats_rvs_seeded",
                   "stats.stats_sf",
                   "stats.stats_chisquare",
                   "stats.stats_fit",
@@ -766,6 +771,36 @@ def start(memsize=125, journal=True, verify=False, restrict=False,
                   "stats.stats_ttest2ind",
                   "stats.stats_ttest2rel",
                   "stats.stats_zscore",
+                  "stats.stats_stats_x",
+                  "stats.stats_stats_y",
+                  "stats.stats_stats_z",
+                  "stats.stats_stats_t",
+                  "stats.stats_stats_e",
+                  "stats.stats_stats_f",
+                  "stats.stats_pearsonr_x",
+                  "stats.stats_pearsonr_y",
+                  "stats.stats_pearsonr_z",
+                  "stats.stats_pearsonr_t",
+                  "stats.stats_pearsonr_e",
+                  "stats.stats_pearsonr_f",
+                  "stats.stats_spearmanr_x",
+                  "stats.stats_spearmanr_y",
+                  "stats.stats_spearmanr_z",
+                  "stats.stats_spearmanr_t",
+                  "stats.stats_spearmanr_e",
+                  "stats.stats_spearmanr_f",
+                  "stats.stats_linregress_x",
+                  "stats.stats_linregress_y",
+                  "stats.stats_linregress_z",
+                  "stats.stats_linregress_t",
+                  "stats.stats_linregress_e",
+                  "stats.stats_linregress_f",
+                  "stats.stats_zscore_x",
+                  "stats.stats_zscore_y",
+                  "stats.stats_zscore_z",
+                  "stats.stats_zscore_t",
+                  "stats.stats_zscore_e",
+                  "stats.stats_zscore_f",
                   "stats.stats_helper",
                   ))
     except ImportError:
@@ -43,22 +43,20 @@
 #include "ferret.h"
 #include "pyferret.h"
 
-/* For older versions of NumPy (v1.4 with RHEL6), define this flag as the deprecated flag */
-#ifndef NPY_ARRAY_OWNDATA
-#define NPY_ARRAY_OWNDATA NPY_OWNDATA
-#endif
-
 /*
  * This function copies the data from the ndarray given by data_ndarray_ptr 
  * to the array of doubles given by dest.  The argument data_ndarray_ptr 
- * is a pointer to a PyObject pointer that is a float64 ndarray containing
- * the array of data for this static variable.
+ * is a pointer to a PyObject pointer that is a float64 or float32 ndarray
+ * containing the array of data for this static variable.  Float32 data is
+ * converted to double as it is copied.
  */
 void FORTRAN(copy_pystat_data)(double dest[], void *data_ndarray_ptr)
 {
     PyArrayObject *data_ndarray;
     double        *data;
+    float         *fltdata;
     npy_intp       num_items;
+    npy_intp       k;
 
     data_ndarray = *( (PyArrayObject **) data_ndarray_ptr);
 
@@ -67,14 +65,21 @@ void FORTRAN(copy_pystat_data)(double dest[], void *data_ndarray_ptr)
      *    ISFARRAY_RO checks if it is F-contiguous, aligned, and in machine byte-order 
      */
     num_items = PyArray_Size((PyObject *) data_ndarray);
-    if ( (num_items < 1) || (PyArray_TYPE(data_ndarray) != NPY_DOUBLE) ||
-         (! PyArray_ISFARRAY_RO(data_ndarray)) || (! PyArray_CHKFLAGS(data_ndarray, NPY_ARRAY_OWNDATA)) ) {
+    if ( (num_items < 1) ||
+         ((PyArray_TYPE(data_ndarray) != NPY_DOUBLE) && (PyArray_TYPE(data_ndarray) != NPY_FLOAT)) ||
+         (! PyArray_ISFARRAY_RO(data_ndarray)) ) {
         fflush(stdout);
         fputs("Unexpected data_ndarray pointer passed to copy_pystat_data_\n", stderr);
         fflush(stderr);
         abort();
     }
-    data = (double *) PyArray_DATA(data_ndarray);
-    memcpy(dest, data, (size_t)num_items * sizeof(double));
+    if ( PyArray_TYPE(data_ndarray) == NPY_FLOAT ) {
+        fltdata = (float *) PyArray_DATA(data_ndarray);
+        for (k = 0; k < num_items; k++)
+            dest[k] = (double) fltdata[k];
+    }
+    else {
+        data = (double *) PyArray_DATA(data_ndarray);
+        memcpy(dest, data, (size_t)num_items * sizeof(double));
+    }
 }
-
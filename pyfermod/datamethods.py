@@ -14,6 +14,7 @@ else:
     import StringIO
 
 from pyferret import libpyferret
+from pyferret.shareddata import SharedData
 
 # set of units (in uppercase) for checking if a custom axis is actual a longitude axis
 _UC_LONGITUDE_UNITS = frozenset( ("DEG E", "DEG_E", "DEG EAST", "DEG_EAST",
@@ -239,7 +240,22 @@ def getstrdata(name):
              "axis_names":axis_names, "axis_units":axis_units, "axis_coords":axis_coords }
 
 
-def getdata(name, create_mask=True):
+def _floatdtype(dtype):
+    """
+    Returns the numpy.dtype for dtype, which must describe either
+    float64 or float32.  Raises a ValueError if this is not the case.
+    """
+    try:
+        fltdtype = numpy.dtype(dtype)
+    except TypeError:
+        raise ValueError("dtype must be float64 or float32")
+    if fltdtype not in (numpy.dtype(numpy.float64), numpy.dtype(numpy.float32)):
+        raise ValueError("dtype must be float64 or float32")
+    return fltdtype
+
+
+def getdata(name, create_mask=True, copy=True, dtype=numpy.float64, shrink_mask=False,
+            shared=False):
     """
     Returns the numeric array and axes information for the data variable
     described in name as a dictionary.
@@ -247,17 +263,44 @@ def getdata(name, create_mask=True):
     Arguments:
         name: the name of the numeric data to retrieve
         create_mask: return the numeric data array as a MaskedArray object?
+        copy: return a copy of the data?  If False, the data array will be a
+              read-only view of the data in Ferret's memory.  That memory
+              is not freed while the view exists, even if Ferret cancels,
+              redefines, or purges the variable (or is stopped); the view
+              then keeps the values it had when it was created.
+        dtype: the type of the returned data array; either numpy.float64
+               or numpy.float32.  Ferret computes values as float64, so a
+               float32 data array is always a copy (regardless of copy),
+               with the values converted while being copied.
+        shrink_mask: if True, and create_mask is True, the mask of a
+               MaskedArray with no missing values is numpy.ma.nomask
+               instead of a full-sized array of False values.
+        shared: if True, the data array values are copied directly from
+               Ferret's memory into a new array in memory that can be shared
+               with other processes (regardless of copy), and the dictionary
+               returned also contains 'shared', a SharedData handle to this
+               array.  The handle can be passed to multiprocessing workers,
+               which call its getarray method to use the data without it
+               being copied, and can be given as the 'data' for putdata.
+               Call the unlink method of the handle when the shared array is
+               no longer needed.
     Returns:
         A dictionary contains the numeric data array and axes information.
         Note that 'name' is not assigned, which is required for the putdata
         method.  The dictionary contains the following key/value pairs:
             'title' : the string passed in the name argument
             'data': the numeric data array.  If create_mask is True, this
-                    will be a NumPy float64 MaskedArray object with the
-                    masked array properly assigned.  If create_mask is False,
-                    this will just be a NumPy float64 ndarray.
+                    will be a NumPy MaskedArray object with the masked array
+                    properly assigned.  If create_mask is False, this will
+                    just be a NumPy ndarray.  The type of the values is given
+                    by dtype.  If copy is False (and dtype is float64), the
+                    underlying ndarray is read-only.
+            'shared': (only if shared is True) the SharedData handle to the
+                    shared array of data values.  Masked values in this
+                    array are the missing value.
             'missing_value': the missing data value.  This will be a NumPy
-                    float64 ndarray containing a single value.
+                    ndarray, of the same type as the data, containing a single
+                    value.
             'data_unit': a string describing the unit of the data.
             'axis_types': a list of integer values describing the type of
                     each axis.  Possible values are the following constants
@@ -310,8 +353,15 @@ def getdata(name, create_mask=True):
         raise ValueError("name must be a string")
     elif name.isspace():
         raise ValueError("name cannot be an empty string")
-    # get the data and related information from Ferret
-    vals = libpyferret._get(name)
+    dtype = _floatdtype(dtype)
+    single = (dtype == numpy.float32)
+    # get the data and related information from Ferret;
+    # the mask, if requested, is determined while copying the data
+    if shared:
+        # get a view of the data to be copied once into the shared array
+        vals = libpyferret._get(name, False, False, bool(create_mask))
+    else:
+        vals = libpyferret._get(name, bool(copy), single, bool(create_mask))
     # break apart the tuple to simplify (returning a dictionary would have been better)
     data = vals[0]
     bdfs = vals[1]
@@ -320,6 +370,14 @@ def getdata(name, create_mask=True):
     axis_names = vals[4]
     axis_units = vals[5]
     axis_coords = vals[6]
+    datamask = vals[7]
+    if shared:
+        sharedhandle = SharedData(data.shape, dtype)
+        sharedarray = sharedhandle.getarray()
+        # copies, and converts to dtype if needed, in a single pass
+        sharedarray[...] = data
+        data = sharedarray
+        bdfs = bdfs.astype(dtype)
     # A custom axis could be standard axis that is not in Ferret's expected order,
     # so check the units
     for k in range(libpyferret.MAX_FERRET_NDIM):
@@ -329,23 +387,140 @@ def getdata(name, create_mask=True):
                 axis_types[k] = libpyferret.AXISTYPE_LONGITUDE
             elif uc_units in _UC_LATITUDE_UNITS:
                 axis_types[k] = libpyferret.AXISTYPE_LATITUDE
-    # libpyferret._get returns a copy of the data, so no need to force a copy
+    # libpyferret._get returns a copy of the data, or a read-only view if requested,
+    # so no need to force a copy
     if create_mask:
-        if numpy.isnan(bdfs[0]):
-            # NaN comparisons always return False, even to another NaN
-            datavar = numpy.ma.array(data, fill_value=bdfs[0], mask=numpy.isnan(data))
-        else:
-            # since values in data and bdfs[0] are all float64 values assigned by Ferret,
-            # using equality should work correctly
-            datavar = numpy.ma.array(data, fill_value=bdfs[0], mask=( data == bdfs[0] ))
+        # libpyferret._get returns None for the mask if there is no missing data
+        if datamask is None:
+            if shrink_mask:
+                datamask = numpy.ma.nomask
+            else:
+                datamask = numpy.zeros(data.shape, dtype=bool, order='F')
+        datavar = numpy.ma.array(data, fill_value=bdfs[0], mask=datamask, copy=False)
     else:
         datavar = data
-    return { "title": name, "data":datavar, "missing_value":bdfs, "data_unit":data_unit,
-             "axis_types":axis_types, "axis_names":axis_names, "axis_units":axis_units,
-             "axis_coords":axis_coords }
+    datadict = { "title": name, "data":datavar, "missing_value":bdfs, "data_unit":data_unit,
+                 "axis_types":axis_types, "axis_names":axis_names, "axis_units":axis_units,
+                 "axis_coords":axis_coords }
+    if shared:
+        datadict["shared"] = sharedhandle
+    return datadict
+
 
+# Ferret axis letters and the index letters used to subscript along each axis
+_AXIS_LETTERS = ("X", "Y", "Z", "T", "E", "F")
+_INDEX_LETTERS = ("I", "J", "K", "L", "M", "N")
 
-def putdata(datavar_dict, axis_pos=None):
+def _addqualifiers(name, quals):
+    """
+    Returns name with the Ferret qualifiers in quals (such as "L=1:10")
+    added to any square-bracketed qualifiers at the end of name.
+    """
+    stripped = name.rstrip()
+    if stripped.endswith("]"):
+        return stripped[:-1] + "," + quals + "]"
+    return stripped + "[" + quals + "]"
+
+
+def _gridqualifier(name):
+    """
+    Returns the Ferret qualifier (such as "G=SST,D=coads_climatology") naming
+    the grid of the variable described in name, which may include qualifiers
+    (such as "SST[D=coads_climatology,Y=-20:20]").  The grid is named using
+    the bare variable name, with any D= qualifier in name, since qualifiers
+    cannot be nested (as in "G=SST[D=coads_climatology]").
+    """
+    stripped = name.strip()
+    start = stripped.find("[")
+    if (start < 0) or (not stripped.endswith("]")):
+        return "G=" + stripped
+    quals = [ "G=" + stripped[:start].rstrip() ]
+    for qual in stripped[start+1:-1].split(","):
+        qual = qual.strip()
+        if qual[:2].upper() == "D=":
+            quals.append(qual)
+    return ",".join(quals)
+
+
+def iterdata(name, axis="T", size=1, create_mask=True, dtype=numpy.float64):
+    """
+    Generator returning the numeric data of the variable described in name
+    in chunks along one axis, so the full variable never needs to reside
+    in memory at one time.  Each chunk is retrieved with getdata using a
+    region restricted along the given axis (such as name[L=1:size]),
+    and the result of each chunk is left unprotected in Ferret's memory
+    so it can be reclaimed by Ferret when retrieving the next chunk.
+
+    Arguments:
+        name: the name of the Ferret variable to retrieve.  This may include
+              qualifiers, such as "sst[d=coads_climatology,Y=-20:20]", but
+              should not restrict the axis being iterated over.  The points
+              along axis are those of the grid of the bare variable name in
+              the dataset given by any D= qualifier.
+        axis: the axis to iterate over; one of "X", "Y", "Z", "T", "E", "F",
+              or one of the pyferret integer values X_AXIS, Y_AXIS, Z_AXIS,
+              T_AXIS, E_AXIS, or F_AXIS.
+        size: the (maximum) number of points along axis in each chunk
+        create_mask: return the numeric data arrays as MaskedArray objects?
+        dtype: the type of the data arrays; either numpy.float64 or numpy.float32
+    Returns:
+        A generator yielding (coords, data) tuples, where coords is the
+        ndarray of coordinates along axis of the chunk (as given in the
+        'axis_coords' of getdata) and data is the numeric data array for
+        the chunk (as given in the 'data' of getdata).
+    Raises:
+        ValueError if the data name or other arguments are invalid
+        MemoryError if Ferret has not been started or has been stopped
+    See also:
+        getdata
+    """
+    # check name
+    if not isinstance(name, str):
+        raise ValueError("name must be a string")
+    elif name.isspace():
+        raise ValueError("name cannot be an empty string")
+    # check axis
+    if isinstance(axis, str):
+        try:
+            axisnum = _AXIS_LETTERS.index(axis.strip().upper())
+        except ValueError:
+            raise ValueError("axis must be one of %s" % ", ".join(_AXIS_LETTERS))
+    else:
+        try:
+            axisnum = int(axis)
+        except Exception:
+            axisnum = -1
+        if (axisnum < 0) or (axisnum >= libpyferret.MAX_FERRET_NDIM):
+            raise ValueError("axis must be one of %s" % ", ".join(_AXIS_LETTERS))
+    # check size
+    try:
+        size = int(size)
+    except Exception:
+        raise ValueError("size must be a positive integer")
+    if size < 1:
+        raise ValueError("size must be a positive integer")
+    dtype = _floatdtype(dtype)
+    idxletter = _INDEX_LETTERS[axisnum]
+    # Get the indices along the axis of the variable's grid;
+    # this only retrieves a one-dimensional array of indices
+    idxdict = getdata("%s[%s]" % (idxletter, _gridqualifier(name)), False)
+    if idxdict["axis_types"][axisnum] == libpyferret.AXISTYPE_NORMAL:
+        raise ValueError("%s does not have a %s axis" % (name, _AXIS_LETTERS[axisnum]))
+    indices = idxdict["data"].reshape(-1)
+    if len(indices) == 0:
+        return
+    first = int(indices[0])
+    last = int(indices[-1])
+    del idxdict, indices
+    for lo in range(first, last + 1, size):
+        hi = min(lo + size - 1, last)
+        chunkname = _addqualifiers(name, "%s=%d:%d" % (idxletter, lo, hi))
+        datadict = getdata(chunkname, create_mask, dtype=dtype)
+        yield (datadict["axis_coords"][axisnum], datadict["data"])
+        del datadict
+
+
+def putdata(datavar_dict, axis_pos=None, copy=None, dtype=numpy.float64):
     """
     Creates a Ferret data variable with a copy of the data given in the dictionary
     datavar_dict, reordering the data and axes according to tuple axis_pos.
@@ -360,7 +535,11 @@ def putdata(datavar_dict, axis_pos=None):
             'dset' : the Ferret dataset name or number to associate with this new data
                     variable.  If blank or not given, the current dataset is used.  If
                     None or 'None', no dataset will be associated with the new variable.
-            'data': a NumPy numeric ndarray or masked array.  The data will be saved
+            'data': a NumPy numeric ndarray or masked array, or a SharedData handle
+                    (such as one from getdata with shared=True, or one created by a
+                    multiprocessing worker) to a shared array.  With a SharedData
+                    handle and copy not given, the shared array is given to Ferret
+                    without first making a copy of it.  The data will be saved
                     in Ferret as a 64-bit floating-point values.  Must be given.
             'missing_value': the missing data value.  This will be saved in Ferret as
                     a 64-bit floating-point value.  If not given, Ferret's default
@@ -427,6 +606,22 @@ def putdata(datavar_dict, axis_pos=None):
             will be made the T_AXIS, the second time axis will be made the F_AXIS, and any
             remaining axes are then filled into the remaining unassigned positions.
 
+        copy: if False, and the data array is a contiguous array of type dtype in
+            Fortran order with its axes already in Ferret's axis order, Ferret will
+            keep a reference to the data array itself instead of first making a copy
+            of it.  This only avoids the intermediate copy; Ferret still copies the
+            values into its own memory whenever the variable is loaded, so later
+            changes to the values in the data array may or may not be seen by Ferret
+            and should not be relied upon.  If the data array does not meet these
+            conditions, a copy is made regardless.  If not given (or None), False is
+            used for a SharedData handle and True for any other data.
+
+        dtype: the type of the data kept for Ferret; either numpy.float64 or
+            numpy.float32.  Float32 data (and the missing value) is converted to
+            float64 by Ferret, in a single pass, only when the values are used.
+            Thus float32 data, such as that read from most NetCDF files, can be
+            given to Ferret without first creating a float64 copy of it.
+
     Returns:
         None
 
@@ -495,6 +690,14 @@ def putdata(datavar_dict, axis_pos=None):
     #
     # data array
     datavar = datavar_dict['data']
+    if isinstance(datavar, SharedData):
+        # the shared array is already contiguous in Fortran order, so unless
+        # a copy is requested, hand it to Ferret without an intermediate copy
+        if copy is None:
+            copy = False
+        datavar = datavar.getarray()
+    elif copy is None:
+        copy = True
     #
     # For any axis with data (shape > 1), if AXISTYPE_NORMAL (presumably from not being specified),
     # change to AXISTYPE_ABSTRACT.  Note that a shape == 1 could either be normal or a singleton axis.
@@ -612,8 +815,12 @@ def putdata(datavar_dict, axis_pos=None):
             # expected result
             pass
     #
-    # get the missing data value as a 64-bit float
-    bdfval = numpy.array(missingval, dtype=numpy.float64)
+    # type of the data to give to Ferret
+    dtype = _floatdtype(dtype)
+    #
+    # get the missing data value as a 64-bit float, first rounding it
+    # to dtype so it matches the missing values in the converted data
+    bdfval = numpy.array(missingval, dtype=dtype).astype(numpy.float64)
     #
     # if a masked array, make sure the masked values are set
     # to the missing value, and get the ndarray underneath
@@ -676,8 +883,14 @@ def putdata(datavar_dict, axis_pos=None):
     # would rather not assume X_AXIS == 0, Y_AXIS == 1, Z_AXIS == 2,
     #                         T_AXIS == 3, E_AXIS == 4, F_AXIS == 5
     #
-    # now make a copy of the data as (contiguous) 64-bit floats in Fortran order
-    fdata = numpy.array(data, dtype=numpy.float64, order='F', copy=1)
+    # Data that is already contiguous values of type dtype in Fortran order with the
+    # axes in Ferret's order can be given to Ferret directly if the caller allows it;
+    # otherwise make a copy of the data as (contiguous) dtype values in Fortran order
+    if (not copy) and (data.dtype == dtype) and data.dtype.isnative and \
+       data.flags['F_CONTIGUOUS'] and data.flags['ALIGNED']:
+        fdata = data
+    else:
+        fdata = numpy.array(data, dtype=dtype, order='F', copy=1)
     #
     # libpyferret._put will raise an Exception if there is a problem
     libpyferret._put(codename, titlename, fdata, bdfval, data_unit, dset_str,
@@ -39,10 +39,19 @@ class EOFAnalysis(object):
     analysis, and result-reporting methods allow for the creation of 
     methods to modify the input data prior to analysis, and methods to 
     modify the results prior to reporting.
+
+    For space-time data too large to be held in memory at one time, 
+    create an instance with None for the space-time data, call the 
+    partial_fit method with each chunk of time values, and then call 
+    the finalize method to perform the analysis.  Only the results that 
+    do not require the complete space-time data (EOFs, significances, 
+    and null-space vectors) are then available from this instance;
+    the TAF values for any chunk of time values can be obtained from
+    the chunktafvec method.
     '''
 
 
-    def __init__(self, spacetimedata):
+    def __init__(self, spacetimedata, dtype=numpy.float64):
         '''
         Initializes an EOFAnalysis instance using the given space-time data.
 
@@ -51,44 +60,90 @@ class EOFAnalysis(object):
                     is a time series at a given location.  Thus the shape 
                     of the (row-major) data array should be (NT, NL) where 
                     where NT is the number of time values at each location 
-                    and NL is the number of locations.
+                    and NL is the number of locations.  If None, the data
+                    is given in chunks of time values to partial_fit.
+            dtype - numpy.float64 or numpy.float32; the type used for the
+                    copy of the data and for the analysis.  Using 
+                    numpy.float32 halves the memory used at the cost of 
+                    precision.
 
         Returns:
             an EOFAnalysis instance using the given space-time data.
 
         Raises:
             TypeError of ValueError - if spacetimedata cannot be made into
-                    a (2D) numpy.matrix of numeric values.  See: numpy.matrix
+                    a 2D array of numeric values, or if dtype is not valid.
             UserWarning - if there is one one time value in each time 
                     series.
         '''
-        # matrix of averages of each time series
+        # array of averages of each time series
         self.__tavg = None
-        # F matrix in EOF analysis = (origvals - tavg)
+        # F array in EOF analysis = (origvals - tavg); a copy of the 
+        # original values, adjusted in place when the analysis is done
         self.__fmat = None
-        # R matrix = F.T * F / NT (matrix multiplication)
-        # (matrix of covariance means) - not saved
+        # R matrix = F.T . F / NT (matrix of covariance means) - not saved
         # eigenvalues of R ordered from smallest to largest
         self.__eigvals = None
         # eigenvectors in columns of R corresponding to the eigenvalues
         self.__eigvecs = None
         # fraction significance of the corresponding EOFs
         self.__fracsignifs = None
+        # whether all the eigenvectors (including the null space) are known
+        self.__complete = False
         # minimum fraction ever considered significant; 0.01 == 1%
         self.__minsignif = 0.01
-        # copy of the original space-time values as an matrix
-        self.__origvals = numpy.matrix(spacetimedata, dtype=numpy.float64);
-        if self.__origvals.shape[0] == 1:
+        # number of time values, averages of each time series, and the
+        # matrix NT * R, accumulated from the chunks given to partial_fit
+        self.__chunkcount = 0
+        self.__chunkavg = None
+        self.__chunkcomoms = None
+        # type of the values used in the analysis
+        self.__dtype = numpy.dtype(dtype)
+        if self.__dtype not in (numpy.dtype(numpy.float64), numpy.dtype(numpy.float32)):
+            raise ValueError('dtype must be numpy.float64 or numpy.float32')
+        if spacetimedata is None:
+            return
+        if isinstance(spacetimedata, str):
+            # rows separated by semicolons as in numpy.matrix strings
+            spacetimedata = [ row.replace(',', ' ').split() 
+                              for row in spacetimedata.split(';') ]
+        # copy of the original space-time values as a 2D array
+        self.__fmat = numpy.array(spacetimedata, dtype=self.__dtype, ndmin=2)
+        if self.__fmat.ndim != 2:
+            raise ValueError('spacetimedata is not a 2D array')
+        if self.__fmat.shape[0] == 1:
             raise UserWarning('Only one time value in each time series')
 
 
-    def analyze(self):
+    def analyze(self, method='eigh', neofs=None):
         '''
         Perform the empirical orthogonal function analysis of the
         space-time data contained in this EOFAnalysis instance.
 
+        The default method, 'eigh', diagonalizes the full (NL, NL) matrix
+        of covariance means, giving all the EOFs as well as the null-space
+        vectors.  This requires O(NL^3) time and O(NL^2) memory, so for
+        large numbers of locations one of the other methods, which only
+        compute the most significant EOFs, should be used:
+            'gram' - diagonalizes the smaller of the (NL, NL) matrix of
+                    covariance means or the (NT, NT) matrix of time-time
+                    covariances; the results are exact.
+            'randomized' - randomized truncated singular value decomposition
+                    of the (NT, NL) data matrix using a range finder with
+                    power iterations; the results are accurate approximations
+                    of the neofs most significant EOFs.
+            'svds' - truncated singular value decomposition of the (NT, NL)
+                    data matrix using the Lanczos iterations of
+                    scipy.sparse.linalg.svds.
+        The fraction significances of the EOFs from these methods are
+        still fractions of the total variance of the data.  Null-space
+        vectors are only available from the 'eigh' method.
+
         Arguments:
-            None
+            method - one of 'eigh', 'gram', 'randomized', or 'svds'
+            neofs - the number of most significant EOFs to compute; required
+                    for the 'randomized' and 'svds' methods, optional for
+                    the 'gram' method, and ignored for the 'eigh' method.
 
         Returns:
             None
@@ -96,39 +151,188 @@ class EOFAnalysis(object):
         Raises:
             eofanlysis.InvalidStateError - if the instance has not been 
                     properly initialized with space-time data.
+            ValueError - if method is not recognized, or if neofs is not
+                    valid for the method.
             numpy.linlag.LinAlgError - if there is a problem with the 
                     analysis (diagonalizing the matrix of covariance means).
             UserWarning - if there is no variation found in the time series
      		    (no significant eigenvalues)
         '''
-        if self.__origvals == None:
+        if self.__fmat is None:
             raise InvalidStateError(
                     'instance data has not been properly initialized')
-        # Create a matrix with each row containing the mean value
-        # of each time-series in the original data.
-        self.__tavg = numpy.average(self.__origvals, axis=0)
-        # F is the data adjusted so each time series has a zero mean value.
-        # self.__tavg is automatically repeated in the following 
-        self.__fmat = self.__origvals - self.__tavg
-        # R is the matrix of mean covariances over time = F.T * F / NT
-        # R has shape (NP, NP)
-        # Since fmat is a matrix, this is performing matrix multiplication.
-        rmat = self.__fmat.T * self.__fmat / float(self.__fmat.shape[0])
-        # Compute the eigenvalues and eigenvactors of the R matrix.
-        # The numpy.linalg.eigh function returns eigenvalues from smallest 
-        # to largest, so the significant EOFs are the last eigenvectors.
-        # The eigenvectors are in the columns of the eigvectors matrix.
-        (eigvals, eigvecs) = numpy.linalg.eigh(rmat)
-        # Just making sure eigvals is an array and eigvecs is a matrix.
-        self.__eigvals = numpy.array(eigvals, copy=False)
-        self.__eigvecs = numpy.matrix(eigvecs, copy=False)
+        if method not in ('eigh', 'gram', 'randomized', 'svds'):
+            raise ValueError('unknown analysis method %s' % str(method))
+        (ntime, nlocs) = self.__fmat.shape
+        if method == 'eigh':
+            neofs = nlocs
+        elif neofs is None:
+            if method != 'gram':
+                raise ValueError('neofs must be given for the %s method' % method)
+            neofs = min(ntime, nlocs)
+        else:
+            neofs = int(neofs)
+            if neofs <= 0:
+                raise ValueError('neofs is not a positive integer')
+            neofs = min(neofs, ntime, nlocs)
+            if (method == 'svds') and (neofs >= min(ntime, nlocs)):
+                # svds cannot compute all the singular values; but then
+                # the Gram matrix is no larger than the decomposition
+                method = 'gram'
+        if self.__tavg is None:
+            # Create an array of the mean value of each time-series in the
+            # original data, accumulating the sums in double precision.
+            self.__tavg = numpy.mean(self.__fmat, axis=0, dtype=numpy.float64) \
+                               .astype(self.__dtype)
+            # F is the data adjusted so each time series has a zero mean value.
+            # This is done in place so a second copy of the data is not made.
+            # self.__tavg is automatically repeated in the following 
+            self.__fmat -= self.__tavg
+        fvals = self.__fmat
+        if (method == 'eigh') or ((method == 'gram') and (nlocs <= ntime)):
+            # R is the matrix of mean covariances over time = F.T . F / NT
+            # R has shape (NP, NP)
+            rmat = numpy.dot(fvals.T, fvals) / float(ntime)
+            # Compute the eigenvalues and eigenvactors of the R matrix.
+            # The numpy.linalg.eigh function returns eigenvalues from smallest 
+            # to largest, so the significant EOFs are the last eigenvectors.
+            # The eigenvectors are in the columns of the eigvecs array.
+            (eigvals, eigvecs) = numpy.linalg.eigh(rmat)
+            eigvals = eigvals[nlocs-neofs:]
+            eigvecs = eigvecs[:,nlocs-neofs:]
+        elif method == 'gram':
+            # The nonzero eigenvalues of F * F.T / NT, shape (NT, NT), are
+            # those of R, and F.T maps its eigenvectors to those of R.
+            (eigvals, tvecs) = numpy.linalg.eigh(numpy.dot(fvals, fvals.T) / float(ntime))
+            eigvals = eigvals[ntime-neofs:]
+            tvecs = tvecs[:,ntime-neofs:]
+            # discard the eigenvectors of the null space of F.T
+            keep = ( eigvals > 1.0E-12 * max(eigvals[-1], 1.0E-300) )
+            eigvals = eigvals[keep]
+            eigvecs = numpy.dot(fvals.T, tvecs[:,keep]) \
+                      / numpy.sqrt(eigvals * float(ntime))
+        else:
+            if method == 'randomized':
+                (singvals, singvecs) = self.__randomizedsvd(fvals, neofs)
+            else:
+                import scipy.sparse.linalg
+                (lvecs, singvals, singvecs) = scipy.sparse.linalg.svds(fvals, k=neofs)
+                singvecs = singvecs.T
+            # order from smallest to largest, as from numpy.linalg.eigh
+            order = numpy.argsort(singvals)
+            eigvals = numpy.square(singvals[order]) / float(ntime)
+            eigvecs = singvecs[:,order]
+        # The eigenvectors are in the columns of the eigvecs array.
+        self.__eigvals = numpy.asarray(eigvals, dtype=self.__dtype)
+        self.__eigvecs = numpy.asarray(eigvecs, dtype=self.__dtype)
+        # only the full analysis gives the null-space vectors
+        self.__complete = (method == 'eigh')
         # Compute the fraction significance of each EOF, which is the 
         # fraction each eigenvalue adds to the sum of all the eigenvalues.
         # Because R = R.T, all eigenvalues are non-negative or negligible
-        # real values.
+        # real values.  If only some eigenvalues were computed, the sum
+        # of all the eigenvalues is the trace of R, the total variance.
+        if self.__complete:
+            eigvalsum = numpy.sum(self.__eigvals)
+        else:
+            eigvalsum = numpy.vdot(fvals, fvals) / float(ntime)
+        if eigvalsum >= 1.0E-10:
+            self.__fracsignifs = self.__eigvals / eigvalsum
+        else:
+            # No significant eigenvalues == no significant EOFs
+            self.__fracsignifs = numpy.zeros(self.__eigvals.shape)
+            raise UserWarning(
+     		'No variation in time series (no significant eigenvalues)')
+
+
+    def partial_fit(self, chunkdata):
+        '''
+        Adds a chunk of time values of the space-time data to an EOFAnalysis
+        instance created without data.  Only the (NL, NL) matrix of sums of
+        covariances (updated using the pairwise formulas of Chan, Golub, and
+        LeVeque) and the time series averages are kept, so the memory used
+        does not depend on the number of time values.
+
+        Arguments:
+            chunkdata - matrix-like object of data of shape (NTC, NL) where
+                    NTC is the number of time values in this chunk and NL
+                    is the number of locations, which must be the same for
+                    every chunk.
+
+        Returns:
+            None
+
+        Raises:
+            eofanalysis.InvalidStateError - if the instance was created 
+                    with space-time data, or finalize has been called.
+            TypeError or ValueError - if chunkdata cannot be made into a
+                    2D array of numeric values, or the number of locations
+                    differs from that of earlier chunks.
+        '''
+        if (self.__fmat is not None) or (self.__eigvals is not None):
+            raise InvalidStateError(
+                    'partial_fit is only for instances created without data')
+        chunkvals = numpy.array(chunkdata, dtype=numpy.float64, ndmin=2)
+        if chunkvals.ndim != 2:
+            raise ValueError('chunkdata is not a 2D array')
+        (ntime, nlocs) = chunkvals.shape
+        if ntime == 0:
+            return
+        if (self.__chunkavg is not None) and (nlocs != len(self.__chunkavg)):
+            raise ValueError('number of locations differs from earlier chunks')
+        chunkavg = numpy.average(chunkvals, axis=0)
+        chunkvals -= chunkavg
+        chunkcomoms = numpy.dot(chunkvals.T, chunkvals)
+        if self.__chunkcount == 0:
+            self.__chunkavg = chunkavg
+            self.__chunkcomoms = chunkcomoms
+        else:
+            total = self.__chunkcount + ntime
+            delta = chunkavg - self.__chunkavg
+            self.__chunkcomoms += chunkcomoms
+            self.__chunkcomoms += numpy.outer(delta, delta) \
+                                  * (float(self.__chunkcount) * float(ntime) / float(total))
+            self.__chunkavg += delta * (float(ntime) / float(total))
+        self.__chunkcount += ntime
+
+
+    def finalize(self):
+        '''
+        Perform the empirical orthogonal function analysis of the space-time
+        data given in chunks to partial_fit.  The results are the same as
+        those from the analyze method with all the data, except that the
+        TAFs and data pieces are not available.  See: EOFAnalysis.chunktafvec
+
+        Arguments:
+            None
+
+        Returns:
+            None
+
+        Raises:
+            eofanalysis.InvalidStateError - if no data has been given to
+                    partial_fit.
+            numpy.linlag.LinAlgError - if there is a problem with the 
+                    analysis (diagonalizing the matrix of covariance means).
+            UserWarning - if there is only one time value in each time
+                    series, or if there is no variation found in the
+                    time series (no significant eigenvalues)
+        '''
+        if self.__chunkcount == 0:
+            raise InvalidStateError('partial_fit has not been given any data')
+        if self.__chunkcount == 1:
+            raise UserWarning('Only one time value in each time series')
+        self.__tavg = self.__chunkavg.astype(self.__dtype)
+        (eigvals, eigvecs) = numpy.linalg.eigh(self.__chunkcomoms
+                                               / float(self.__chunkcount))
+        self.__eigvals = numpy.asarray(eigvals, dtype=self.__dtype)
+        self.__eigvecs = numpy.asarray(eigvecs, dtype=self.__dtype)
+        self.__complete = True
+        # the covariance matrix is no longer needed
+        self.__chunkcomoms = None
         eigvalsum = numpy.sum(self.__eigvals)
         if eigvalsum >= 1.0E-10:
-            self.__fracsignifs = self.__eigvals / numpy.sum(self.__eigvals)
+            self.__fracsignifs = self.__eigvals / eigvalsum
         else:
             # No significant eigenvalues == no significant EOFs
             self.__fracsignifs = numpy.zeros(self.__eigvals.shape)
@@ -136,6 +340,30 @@ class EOFAnalysis(object):
      		'No variation in time series (no significant eigenvalues)')
 
 
+    @staticmethod
+    def __randomizedsvd(fvals, neofs, oversamples=10, poweriters=4):
+        '''
+        Returns the neofs largest singular values, and the corresponding
+        right singular vectors in the columns of an array, of the array
+        fvals using a randomized range finder (Halko, Martinsson, and
+        Tropp, 2011) with power iterations.  A fixed seed is used so the
+        results are reproducible.
+        '''
+        (ntime, nlocs) = fvals.shape
+        nsamples = min(neofs + oversamples, ntime, nlocs)
+        randgen = numpy.random.default_rng(8675309)
+        # orthonormal basis approximating the range of fvals
+        basis = numpy.linalg.qr(numpy.dot(fvals,
+                    randgen.standard_normal((nlocs, nsamples)).astype(fvals.dtype)))[0]
+        for k in range(poweriters):
+            basis = numpy.linalg.qr(numpy.dot(fvals.T, basis))[0]
+            basis = numpy.linalg.qr(numpy.dot(fvals, basis))[0]
+        # exact SVD of the small projection of fvals onto this basis
+        (lvecs, singvals, rvecsT) = numpy.linalg.svd(numpy.dot(basis.T, fvals),
+                                                      full_matrices=False)
+        return (singvals[:neofs], rvecsT[:neofs].T)
+
+
     def signiffracs(self):
         '''
         Returns the significances of each of the empirical orthogonal
@@ -149,13 +377,14 @@ class EOFAnalysis(object):
             an array of length NL, the number of locations (and thus,
             the maximum number of EOFs possible), giving the significance
             of the corresponding EOF.  Ordered from most significant to
-            least significant.
+            least significant.  If the analysis only computed the most
+            significant EOFs, the length is the number of EOFs computed.
 
         Raises:
             eofanalysis.InvalidStateError - if the analyze method has not 
                     been called.  See: EOFAnalysis.analyze
         '''
-        if self.__fracsignifs == None:
+        if self.__fracsignifs is None:
             raise InvalidStateError('analyze method has not been called')
         # Return a copy of the computed significance of each EOF
         # ordered from largest to smallest (reversed).
@@ -220,7 +449,7 @@ class EOFAnalysis(object):
             eofanalysis.InvalidStateError - if the analyze method has not 
                     been called.  See: EOFAnalysis.analyze
         '''
-        if self.__fracsignifs == None:
+        if self.__fracsignifs is None:
             raise InvalidStateError('analyze method has not been called')
         # The fracsignifs are ordered from smallest to largest.
         # Optimized for the usual case where most EOFs are insignificant.
@@ -230,6 +459,27 @@ class EOFAnalysis(object):
         return len(self.__fracsignifs)
 
 
+    def avgvec(self):
+        '''
+        Returns the averages of the time series as an array of location
+        values in units of the original data.
+
+        Arguments:
+            None
+
+        Returns:
+            the time-series averages as a 1-D array of location values.
+
+        Raises:
+            eofanalysis.InvalidStateError - if the analysis has not been
+                    performed.  See: EOFAnalysis.analyze and
+                    EOFAnalysis.finalize
+        '''
+        if self.__tavg is None:
+            raise InvalidStateError('analyze method has not been called')
+        return numpy.array(self.__tavg)
+
+
     def eofvec(self, num):
         '''
         Returns an empirical orthogonal function (EOF) as an array of
@@ -253,7 +503,7 @@ class EOFAnalysis(object):
             eofanalysis.InvalidStateError - if the analyze method has 
                     not been called.  See: EOFAnalysis.analyze
         '''
-        if self.__eigvals == None:
+        if self.__eigvals is None:
             raise InvalidStateError('analyze method has not been called')
         eofnum = int(num)
         if eofnum <= 0:
@@ -266,11 +516,10 @@ class EOFAnalysis(object):
         if self.__fracsignifs[eofnum] < self.__minsignif:
             raise ValueError(
                     'num is larger than the number of significant EOFs')
-        # Eigenvectors are in the columns of the eigenvector matrix.
+        # Eigenvectors are in the columns of the eigenvector array.
         # Multiply by the square root of the eigenvector to convert 
         # to units of the original data.
-        eofvector = numpy.array(self.__eigvecs[:,eofnum]).squeeze() \
-                    * math.sqrt(self.__eigvals[eofnum])
+        eofvector = self.__eigvecs[:,eofnum] * math.sqrt(self.__eigvals[eofnum])
         return eofvector
 
 
@@ -297,10 +546,14 @@ class EOFAnalysis(object):
                     than the number of significant EOFs.
                     See: EOFAnalysis.numeofs
             eofanalysis.InvalidStateError - if the analyze method has not 
-                    been called.  See: EOFAnalysis.analyze
+                    been called, or the data was given in chunks to 
+                    partial_fit.  See: EOFAnalysis.analyze
         '''
-        if self.__eigvals == None:
+        if self.__eigvals is None:
             raise InvalidStateError('analyze method has not been called')
+        if self.__fmat is None:
+            raise InvalidStateError(
+                    'space-time data was only given in chunks to partial_fit')
         eofnum = int(num)
         if eofnum <= 0:
             raise ValueError('num is not a positive integer')
@@ -312,13 +565,62 @@ class EOFAnalysis(object):
         if self.__fracsignifs[eofnum] < self.__minsignif:
             raise ValueError(
                     'num is larger than the number of significant EOFs')
-        # Time series are in the columns of the F matrix and eigenvectors are
-        # in the columns of the eigenvector matrix.  Matrix multiplication
-        # is being performed, and then the product is turned into a 1-D array.
-        # Divide by the square root of the eigenvalue to  partially normalize
-        # the vector.
-        tafvector = numpy.array(self.__fmat * self.__eigvecs[:,eofnum]) \
-                         .squeeze() / math.sqrt(self.__eigvals[eofnum])
+        # Time series are in the columns of the F array and eigenvectors are
+        # in the columns of the eigenvector array.  Divide by the square root
+        # of the eigenvalue to partially normalize the vector.
+        tafvector = numpy.dot(self.__fmat, self.__eigvecs[:,eofnum]) \
+                         / math.sqrt(self.__eigvals[eofnum])
+        return tafvector
+
+
+    def chunktafvec(self, chunkdata, num):
+        '''
+        Returns the values of the time-amplitude function (TAF) associated 
+        with an empirical orthogonal function (EOF) for the times in a chunk
+        of space-time data.  For the space-time data analyzed, or any chunk 
+        of time values of it, the values are those in the corresponding 
+        times of the array returned by tafvec.  This is primarily used for 
+        instances analyzed by partial_fit and finalize, which cannot 
+        return the full TAF.
+
+        Arguments:
+            chunkdata - matrix-like object of data of shape (NTC, NL) where
+                    NTC is the number of time values in this chunk and NL
+                    is the number of locations.
+            num -   positive integer giving the number of the TAF to
+                    return.  A value of one gives the TAF associated
+                    with the most influential EOF, two gives the TAF
+                    associated with the second-most influential EOF, etc.
+
+        Returns:
+            the requested TAF values as a 1-D array of unitless values
+            of length NTC.
+
+        Raises:
+            ValueError - if num is not a positive integer or is larger 
+                    than the number of significant EOFs, or if chunkdata
+                    does not have NL locations.  See: EOFAnalysis.numeofs
+            eofanalysis.InvalidStateError - if the analysis has not been
+                    performed.  See: EOFAnalysis.analyze and
+                    EOFAnalysis.finalize
+        '''
+        if self.__eigvals is None:
+            raise InvalidStateError('analyze method has not been called')
+        eofnum = int(num)
+        if eofnum <= 0:
+            raise ValueError('num is not a positive integer')
+        if eofnum > len(self.__eigvals):
+            raise ValueError('num is larger than the number of EOFs')
+        eofnum *= -1
+        if self.__fracsignifs[eofnum] < self.__minsignif:
+            raise ValueError(
+                    'num is larger than the number of significant EOFs')
+        chunkvals = numpy.array(chunkdata, dtype=self.__dtype, ndmin=2)
+        if (chunkvals.ndim != 2) or (chunkvals.shape[1] != self.__eigvecs.shape[0]):
+            raise ValueError('chunkdata does not have the number of locations analyzed')
+        chunkvals -= self.__tavg
+        tafvector = numpy.dot(chunkvals, self.__eigvecs[:,eofnum]) \
+                         / math.sqrt(self.__eigvals[eofnum])
         return tafvector
 
 
@@ -349,8 +651,11 @@ class EOFAnalysis(object):
             eofanalysis.InvalidStateError - if the analyze method has not 
                     been called.  See: EOFAnalysis.analyze
         '''
-        if self.__eigvals == None:
+        if self.__eigvals is None:
             raise InvalidStateError('analyze method has not been called')
+        if not self.__complete:
+            raise InvalidStateError(
+                    'null-space vectors are only computed by the eigh method')
         nullnum = int(num)
         if nullnum <= 0:
             raise ValueError('num is not a positive integer')
@@ -360,7 +665,7 @@ class EOFAnalysis(object):
         if self.__fracsignifs[nullnum] >= self.__minsignif:
             raise ValueError(
                     'num is larger than the number of null-space vectors')
-        nullvector = numpy.array(self.__eigvecs[:,nullnum]).squeeze()
+        nullvector = numpy.array(self.__eigvecs[:,nullnum])
         return nullvector
 
 
@@ -398,14 +703,18 @@ class EOFAnalysis(object):
             ValueError - if num is not a non-negative integer or is larger
                     than the number of EOFs.  See: EOFAnalysis.numeofs
             eofanalysis.InvalidStateError - if the analyze method has not 
-                    been called.  See: EOFAnalysis.analyze
+                    been called, or the data was given in chunks to 
+                    partial_fit.  See: EOFAnalysis.analyze
         '''
-        if self.__eigvals == None:
+        if self.__eigvals is None:
             raise InvalidStateError('analyze method has not been called')
+        if self.__fmat is None:
+            raise InvalidStateError(
+                    'space-time data was only given in chunks to partial_fit')
         eofnum = int(num)
         if eofnum == 0:
-            # return a copy of the matrix with repeated time-series averages
-            return self.__tavg.repeat(self.__origvals.shape[0], axis = 0)
+            # return a new array with repeated time-series averages
+            return numpy.repeat(self.__tavg.reshape((1, -1)), self.__fmat.shape[0], axis=0)
         if eofnum < 0:
             raise ValueError('num is not a non-negative integer')
         if eofnum > len(self.__eigvals):
@@ -413,15 +722,13 @@ class EOFAnalysis(object):
         # Eigenvalues are order from smallest to largest; thus, the
         # most significant EOF is derived from the last eigenvector.
         eofnum *= -1
-        # Get the eofnum most significant eigenvectors as a matrix
-        # vect shape = (np, 1)
+        # Get the eofnum most significant eigenvector; vect shape = (np,)
         vect = self.__eigvecs[:,eofnum]
-        # Project fmat - shape (nt, np) - into the subspace defined by this
-        # eigenvector.  Using matrix multiplication; amat shape (nt, 1)
-        amat = self.__fmat * vect
-        # Bring this projection back into the complete space.
-        # Matrix multiplication; vect.T shape (1, np); datapart shape (nt, np)
-        datapart = amat * vect.T
+        # Project fmat - shape (nt, np) - onto this eigenvector; amat shape (nt,)
+        amat = numpy.dot(self.__fmat, vect)
+        # Bring this projection back into the complete space.  The rank-one
+        # product, of shape (nt, np), is the only array this size created.
+        datapart = numpy.outer(amat, vect)
         return datapart
 
 
@@ -452,14 +759,18 @@ class EOFAnalysis(object):
             ValueError - if num is not a non-negative integer or is larger 
                     than the number of EOFs.  See: EOFAnalysis.numeofs
             eofanalysis.InvalidStateError - if the analyze method has not 
-                    been called.  See: EOFAnalysis.analyze
+                    been called, or the data was given in chunks to 
+                    partial_fit.  See: EOFAnalysis.analyze
         '''
-        if self.__eigvals == None:
+        if self.__eigvals is None:
             raise InvalidStateError('analyze method has not been called')
+        if self.__fmat is None:
+            raise InvalidStateError(
+                    'space-time data was only given in chunks to partial_fit')
         eofnum = int(num)
         if eofnum == 0:
-            # return a copy of the matrix with repeated time-series averages
-            return self.__tavg.repeat(self.__origvals.shape[0], axis = 0)
+            # return a new array with repeated time-series averages
+            return numpy.repeat(self.__tavg.reshape((1, -1)), self.__fmat.shape[0], axis=0)
         if eofnum < 0:
             raise ValueError('num is not a positive integer')
         if eofnum > len(self.__eigvals):
@@ -467,17 +778,18 @@ class EOFAnalysis(object):
         # Eigenvalues are order from smallest to largest; thus, the
         # most significant EOF is derived from the last eigenvector.
         eofnum *= -1
-        # Get the eofnum most significant eigenvectors as a matrix;
+        # Get the eofnum most significant eigenvectors as an array;
         # shape = (np, num)
         vecmat = self.__eigvecs[:,-1:eofnum-1:-1]
         # Project fmat - shape (nt, np) - into the subspace defined by these
-        # eigenvectors.  Using matrix multiplication; amat shape = (nt, num)
-        amat = self.__fmat * vecmat
+        # eigenvectors; amat shape = (nt, num)
+        amat = numpy.dot(self.__fmat, vecmat)
         # Bring this projection back into the complete space and add the
-        # time averages to make the result comparable to the original data
-        # Matrix multiplication; vecmat.T shape (num, np) and expdata shape
-        # (nt, np)
-        expdata = (amat * vecmat.T) + self.__tavg
+        # time averages, in place, to make the result comparable to the 
+        # original data.  The rank-num product, of shape (nt, np), is the
+        # only array this size created.
+        expdata = numpy.dot(amat, vecmat.T)
+        expdata += self.__tavg
         return expdata
 
 
@@ -499,8 +811,8 @@ if __name__ == '__main__':
 
     print()
     print('spacetime = [ cosT, sinT + 1 ]')
-    spacetimedata = numpy.matrix([cosT,
-                                  sinT + 1.0]).T
+    spacetimedata = numpy.array([cosT,
+                                 sinT + 1.0]).T
     eofanal = EOFAnalysis(spacetimedata)
     eofanal.analyze()
     defminsignif = eofanal.minsignif();
@@ -553,10 +865,10 @@ if __name__ == '__main__':
 
     print()
     print('spacetime = [ cosT * cosT, cosT * sinT + 1, cosT * sinT + 2, sinT * sinT + 3 ]')
-    spacetimedata = numpy.matrix([ cosT * cosT,
-                                   cosT * sinT + 1.0,
-                                   cosT * sinT + 2.0,
-                                   sinT * sinT + 3.0 ]).T
+    spacetimedata = numpy.array([ cosT * cosT,
+                                  cosT * sinT + 1.0,
+                                  cosT * sinT + 2.0,
+                                  sinT * sinT + 3.0 ]).T
     eofanal = EOFAnalysis(spacetimedata)
     eofanal.analyze()
     fracsignifs = eofanal.signiffracs()
@@ -611,7 +923,7 @@ if __name__ == '__main__':
         sqnorm = numpy.dot(nullvec, nullvec)
         print('Null-space vector %d has norm^2: %#.4f' % (k, sqnorm))
         print(formatter.pformat(nullvec))
-        tafvec = numpy.array(fmat * numpy.matrix(nullvec).T).squeeze()
+        tafvec = numpy.dot(fmat, nullvec)
         sqnorm = numpy.dot(tafvec, tafvec)
         print('F * NSV %d has norm^2: %#.4f' % (k, sqnorm))
         # print formatter.pformat(tafvec)
@@ -332,6 +332,120 @@ class EOFAnalysisTests(unittest.TestCase):
         self.assertRaises(eofanalysis.InvalidStateError, noanal.dataexplained, 0)
 
 
+    def test12analyzemethods(self):
+        '''
+        Tests of the truncated EOFAnalysis.analyze methods.
+        '''
+        # more locations than times, with three independent time series
+        coeffs = numpy.random.RandomState(42).standard_normal((3, 300))
+        coeffs[1] *= 0.5
+        coeffs[2] *= 0.2
+        wideonly = numpy.matrix([self.cos_t[:40],
+                                 self.sin_t[:40],
+                                 numpy.cos(self.t_steps[:40] * numpy.pi / 2.0)]).T
+        widemat = wideonly * numpy.matrix(coeffs) + 3.0
+        # the two EOFs of ccssmat are equally significant, so only
+        # the space spanned by these EOFs is determined
+        for (datamat, numeofs, distinct) in ((self.ccssmat, 2, False),
+                                             (widemat, 3, True)):
+            fullanal = eofanalysis.EOFAnalysis(datamat)
+            fullanal.analyze()
+            for (method, neofs) in (('gram', None), ('gram', numeofs),
+                                    ('randomized', numeofs), ('svds', numeofs)):
+                anal = eofanalysis.EOFAnalysis(datamat)
+                anal.analyze(method, neofs)
+                self.assertEqual(anal.numeofs(), numeofs)
+                self.assertTrue(numpy.allclose(anal.signiffracs()[:numeofs],
+                                               fullanal.signiffracs()[:numeofs]),
+                                "Not True: %s signiffracs == eigh signiffracs" % method)
+                for k in range(1, numeofs+1):
+                    if not distinct:
+                        break
+                    # EOFs and TAFs are only determined up to a sign
+                    eofvec = anal.eofvec(k)
+                    fulleofvec = fullanal.eofvec(k)
+                    sign = numpy.sign(numpy.dot(eofvec, fulleofvec))
+                    self.assertTrue(numpy.allclose(sign * eofvec, fulleofvec),
+                                    "Not True: %s eofvec(%d) == eigh eofvec(%d)" % \
+                                    (method, k, k))
+                    self.assertTrue(numpy.allclose(sign * anal.tafvec(k), fullanal.tafvec(k)),
+                                    "Not True: %s tafvec(%d) == eigh tafvec(%d)" % \
+                                    (method, k, k))
+                self.assertTrue(numpy.allclose(anal.dataexplained(numeofs), datamat),
+                                "Not True: %s dataexplained(%d) == OriginalData" % \
+                                (method, numeofs))
+                # null-space vectors are only computed by eigh
+                self.assertRaises(eofanalysis.InvalidStateError, anal.nullvec, 1)
+        # check ValueError raised for invalid methods or numbers of EOFs
+        anal = eofanalysis.EOFAnalysis(self.ccssmat)
+        self.assertRaises(ValueError, anal.analyze, 'qr', 2)
+        self.assertRaises(ValueError, anal.analyze, 'randomized')
+        self.assertRaises(ValueError, anal.analyze, 'svds', 0)
+
+
+    def test13partialfit(self):
+        '''
+        Tests of the EOFAnalysis.partial_fit, EOFAnalysis.finalize,
+        and EOFAnalysis.chunktafvec methods.
+        '''
+        ccssanal = eofanalysis.EOFAnalysis(self.ccssmat)
+        ccssanal.analyze()
+        chunkanal = eofanalysis.EOFAnalysis(None)
+        # check InvalidStateError raised if no data has been given
+        self.assertRaises(eofanalysis.InvalidStateError, chunkanal.finalize)
+        for start in range(0, 240, 50):
+            chunkanal.partial_fit(self.ccssmat[start:start+50])
+        # check ValueError raised for a different number of locations
+        self.assertRaises(ValueError, chunkanal.partial_fit, self.csmat)
+        chunkanal.finalize()
+        self.assertTrue(numpy.allclose(chunkanal.signiffracs(), ccssanal.signiffracs()))
+        self.assertEqual(chunkanal.numeofs(), 2)
+        # EOFs are degenerate, so check the TAFs reproduce the data
+        datatotal = numpy.array(ccssanal.datapiece(0))
+        for k in range(1, chunkanal.numeofs()+1):
+            eofvec = chunkanal.eofvec(k)
+            tafvec = numpy.concatenate([ chunkanal.chunktafvec(self.ccssmat[start:start+100], k)
+                                         for start in range(0, 240, 100) ])
+            self.assertAlmostEqual(numpy.dot(tafvec, tafvec), 240.0)
+            datatotal += numpy.outer(tafvec, eofvec)
+        self.assertTrue(numpy.allclose(datatotal, self.ccssmat),
+                        "Not True: Sum[k=0->numeofs](chunk TAF * EOF) == OriginalData")
+        self.assertTrue(numpy.allclose(ccssanal.chunktafvec(self.ccssmat, 1), ccssanal.tafvec(1)))
+        # null-space vectors are still computed
+        nullvec = chunkanal.nullvec(1)
+        self.assertAlmostEqual(numpy.dot(nullvec, nullvec), 1.0)
+        self.assertAlmostEqual(numpy.dot(nullvec, chunkanal.eofvec(1)), 0.0)
+        # check InvalidStateError raised for methods requiring all the data
+        self.assertRaises(eofanalysis.InvalidStateError, chunkanal.tafvec, 1)
+        self.assertRaises(eofanalysis.InvalidStateError, chunkanal.datapiece, 1)
+        self.assertRaises(eofanalysis.InvalidStateError, chunkanal.partial_fit, self.ccssmat)
+        self.assertRaises(eofanalysis.InvalidStateError, ccssanal.partial_fit, self.ccssmat)
+
+
+    def test14dtype(self):
+        '''
+        Tests of EOFAnalysis instances using single-precision values.
+        '''
+        ccssanal = eofanalysis.EOFAnalysis(self.ccssmat)
+        ccssanal.analyze()
+        singleanal = eofanalysis.EOFAnalysis(self.ccssmat, dtype=numpy.float32)
+        singleanal.analyze()
+        # analyzing again does not change the results
+        singleanal.analyze()
+        self.assertEqual(singleanal.numeofs(), 2)
+        self.assertTrue(numpy.allclose(singleanal.signiffracs(),
+                                       ccssanal.signiffracs(), atol=1.0E-5))
+        # the two EOFs are equally significant, so only check the averages
+        # and the data explained by both EOFs
+        for k in (0, singleanal.numeofs()):
+            singlepiece = singleanal.dataexplained(k)
+            self.assertEqual(singlepiece.dtype, numpy.float32)
+            self.assertTrue(numpy.allclose(singlepiece, ccssanal.dataexplained(k), atol=1.0E-5))
+        self.assertEqual(singleanal.tafvec(1).dtype, numpy.float32)
+        # check ValueError raised for an unsupported type
+        self.assertRaises(ValueError, eofanalysis.EOFAnalysis, self.ccssmat, numpy.int32)
+
+
 
 if __name__ == "__main__":
     '''
@@ -0,0 +1,65 @@
+'''
+PyFerret external function providing data partitioned into pieces 
+along the ensemble axis, as eofdatapiece, but with the EOF analysis 
+method given as an additional argument.
+'''
+
+from __future__ import print_function
+
+import pyferret
+import pyferret.eofanal.eofdatapiece as eofdatapiece
+
+def ferret_init(efid):
+    '''
+    Initializes the eofdatapiecemethod function. 
+    '''
+    init_dict = eofdatapiece.ferret_init(efid)
+    init_dict["numargs"] = 4
+    init_dict["descript"] = "Partitions data into EOF * TAF pieces " + \
+        "(parts of data explained) along the ensemble axis using a given method"
+    init_dict["argnames"] += ("Method",)
+    init_dict["argdescripts"] += (
+        "EIGH, GRAM, RANDOMIZED, or SVDS (the last two require MaxEOFs)",)
+    init_dict["argtypes"] += (pyferret.STRING_ONEVAL,)
+    no_influence = [ False ] * pyferret.MAX_FERRET_NDIM
+    init_dict["influences"] += (no_influence,)
+    return init_dict
+
+
+def ferret_result_limits(efid):
+    '''
+    Provides the bounds of the E abstract axis, as eofdatapiece.
+    '''
+    return eofdatapiece.ferret_result_limits(efid)
+
+
+def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
+    '''
+    Assigns result as eofdatapiece using the analysis method (see 
+    EOFAnalysis.analyze) given as a string in inputs[3].
+    '''
+    eofdatapiece.ferret_compute(efid, result, result_bdf, inputs, input_bdfs)
+
+
+if __name__ == "__main__":
+    # Verify ferret_init adds the method argument and that ferret_compute 
+    # gives the same result with the GRAM method as eofdatapiece with EIGH
+    import numpy
+    defdict = ferret_init(0)
+    if defdict["numargs"] != 4:
+        raise ValueError("Unexpected number of arguments: %d" % defdict["numargs"])
+    ydata = numpy.linspace(-80.0, 80.0, 17)
+    tdata = numpy.linspace(0.0, 8760.0, 25)
+    yzdata = numpy.outer(numpy.cos(numpy.deg2rad(ydata)), [ 1.0, 0.5, 0.25 ])
+    yztdata = numpy.outer(yzdata, 1.0 + numpy.sin(tdata / 1000.0)).reshape((1, 17, 3, 25, 1, 1))
+    yzdata = numpy.outer(numpy.sin(numpy.deg2rad(2.0 * ydata)), [ 0.2, 1.0, 0.6 ])
+    yztdata += numpy.outer(yzdata, numpy.cos(tdata / 600.0)).reshape((1, 17, 3, 25, 1, 1))
+    resbdf = numpy.array([1.0E20])
+    inpbdfs = (-1.0E34, -1.0E34, -1.0E34, -1.0E34)
+    expected = numpy.zeros((1, 17, 3, 25, 17*3, 1))
+    eofdatapiece.ferret_compute(0, expected, resbdf, (yztdata, 0.001, -1), inpbdfs[:3])
+    result = numpy.zeros((1, 17, 3, 25, 17*3, 1))
+    ferret_compute(0, result, resbdf, (yztdata, 0.001, -1, "GRAM"), inpbdfs)
+    if not numpy.allclose(result, expected):
+        raise ValueError("Results from the GRAM method differ from those of eofdatapiece")
+    print("Success")
@@ -76,7 +76,11 @@ def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
     by the most significant EOFs) up to the number of significant 
     EOFs.  The X,Y,Z,T data is given in inputs[0], the minimum 
     fraction-of-data-explained considered significant is given as a 
-    single value in inputs[1].
+    single value in inputs[1].  The maximum number of EOFs to consider
+    is given as a single value in inputs[2] (-1 for all significant).
+    The analysis method (see EOFAnalysis.analyze) may be given as a 
+    string in inputs[3] (by eofdatasummethod); the RANDOMIZED and SVDS 
+    methods only compute the MaxEOFs most significant EOFs.
     '''
     # verify no ensemble or forecast axis on the input data
     if inputs[pyferret.ARG1].shape[pyferret.E_AXIS] > 1:
@@ -97,6 +101,18 @@ def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
         maxeofs = int(maxeofs + 0.1)
     else:
         maxeofs = -1
+    # Get the analysis method, if given (as from eofdatasummethod); 
+    # the default is the full analysis
+    if len(inputs) > 3:
+        method = str(inputs[3]).strip().lower()
+    else:
+        method = ""
+    if not method:
+        method = "eigh"
+    if method not in ("eigh", "gram", "randomized", "svds"):
+        raise ValueError("Method must be one of EIGH, GRAM, RANDOMIZED, or SVDS")
+    if (maxeofs < 0) and (method in ("randomized", "svds")):
+        raise ValueError("MaxEOFs must be given for the RANDOMIZED and SVDS methods")
     # Get the mask of where the data is defined
     defined_data = ( numpy.fabs(inputs[pyferret.ARG1] - 
                                 input_bdfs[pyferret.ARG1]) >= 1.0E-5 )
@@ -112,7 +128,10 @@ def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
     # Create the EOFAnalysis object and analyze the data
     eofs = eofanal.EOFAnalysis(timeloc)
     eofs.setminsignif(min_signif)
-    eofs.analyze()
+    if maxeofs > 0:
+        eofs.analyze(method, maxeofs)
+    else:
+        eofs.analyze(method)
     # Initialize the result to all-undefined
     result[:] = result_bdf
     # Remove the E and F singleton axes from the defined mask
@@ -0,0 +1,170 @@
+'''
+PyFerret external function providing the time-series averages and the 
+significant Empirical Orthogonal Functions (EOFs) along the ensemble 
+axis.  The EOF analysis is performed using chunks of time values of 
+the data so the memory used (other than the data itself) only depends 
+on the number of locations.  The Time Amplitude Functions (TAFs) of 
+these EOFs are given by the eoftafs function.
+'''
+
+from __future__ import print_function
+
+import numpy
+import pyferret
+import pyferret.eofanal as eofanal
+
+# Number of time steps of data added to the analysis at a time
+TIME_CHUNK_SIZE = 256
+
+def ferret_init(efid):
+    '''
+    Initializes the eofpatterns function. 
+    '''
+    init_dict = { }
+    init_dict["numargs"] = 3
+    init_dict["descript"] = "Time-series averages (m=1) and EOFs (m>1) " + \
+        "along the ensemble axis, computed from chunks of time values"
+    init_dict["argnames"] = ("Data",
+                             "MinSignif",
+                             "MaxEOFs")
+    init_dict["argdescripts"] = (
+        "Time-location data; defined on T and one or more of X, Y, Z",
+        "Minimum fraction-of-data-explained considered significant",
+        "Maximum number of EOFs to consider (-1 for all signficant EOFS)")
+    init_dict["argtypes"] = (pyferret.FLOAT_ARRAY,
+                             pyferret.FLOAT_ONEVAL,
+                             pyferret.FLOAT_ONEVAL)
+    # X, Y, and Z match input; T removed; E axis added as an abstract axis
+    axes = [ pyferret.AXIS_IMPLIED_BY_ARGS ] * pyferret.MAX_FERRET_NDIM
+    axes[pyferret.T_AXIS] = pyferret.AXIS_DOES_NOT_EXIST
+    axes[pyferret.E_AXIS] = pyferret.AXIS_ABSTRACT
+    axes[pyferret.F_AXIS] = pyferret.AXIS_DOES_NOT_EXIST
+    init_dict["axes"] = axes
+    part_influence = [ True ] * pyferret.MAX_FERRET_NDIM
+    part_influence[pyferret.T_AXIS] = False
+    part_influence[pyferret.E_AXIS] = False
+    part_influence[pyferret.F_AXIS] = False
+    no_influence = [ False ] * pyferret.MAX_FERRET_NDIM
+    init_dict["influences"] = (part_influence,
+                               no_influence,
+                               no_influence)
+    init_dict["piecemeal"] =  [ False ] * pyferret.MAX_FERRET_NDIM
+
+    return init_dict
+
+
+def ferret_result_limits(efid):
+    '''
+    Provides the bounds of the E abstract axis.
+    The maximum number of EOFs is the number of locations. 
+    '''
+    maxeofs = pyferret.get_arg_one_val(efid, pyferret.ARG3)
+    if maxeofs > 0.95:
+        maxeofs = int(maxeofs + 0.1)
+    else:
+        maxeofs = 1
+        for axis in (pyferret.X_AXIS, pyferret.Y_AXIS, pyferret.Z_AXIS):
+            axis_info = pyferret.get_axis_info(efid, pyferret.ARG1, axis);
+            if axis_info:
+                npts = axis_info.get("size", -1)
+                if npts > 0:
+                    maxeofs *= npts
+    result_limits = [ None ] * pyferret.MAX_FERRET_NDIM
+    result_limits[pyferret.E_AXIS] = (1, maxeofs+1)
+    return result_limits
+
+
+def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
+    '''
+    Assign result with the time-series averages (at m=1) and the
+    significant EOFs (at m>1) of the X,Y,Z,T data given in inputs[0].
+    The minimum fraction-of-data-explained considered significant is 
+    given as a single value in inputs[1].  The maximum number of EOFs 
+    to consider is given as a single value in inputs[2] (-1 for all 
+    significant).  Only locations with data defined at every time 
+    step are used in the analysis.
+    '''
+    # verify no ensemble or forecast axis on the input data
+    if inputs[pyferret.ARG1].shape[pyferret.E_AXIS] > 1:
+        raise ValueError("Input data cannot have an ensemble axis")
+    if inputs[pyferret.ARG1].shape[pyferret.F_AXIS] > 1:
+        raise ValueError("Input data cannot have a forecast axis")
+    # number of time steps in the input data
+    ntime = inputs[pyferret.ARG1].shape[pyferret.T_AXIS]
+    if ntime < 2:
+        raise ValueError("Input data time axis does not exist or is a singleton")
+    # Get the minimum fraction-data-explained and verify it is reasonable
+    min_signif = float(inputs[1])
+    if (min_signif < 1.0E-6) or (min_signif > (1.0 - 1.0E-6)):
+        raise ValueError("MinSignif must be in [0.000001, 0.999999]")
+    # Get the maximum number of EOFs to consider
+    maxeofs = float(inputs[2])
+    if maxeofs > 0.95:
+        maxeofs = int(maxeofs + 0.1)
+    else:
+        maxeofs = -1
+    # Get the mask of where the data is defined for every time step
+    data = inputs[pyferret.ARG1][:, :, :, :, 0, 0]
+    defd_mask = numpy.logical_and.reduce(
+                    numpy.fabs(data - input_bdfs[pyferret.ARG1]) >= 1.0E-5,
+                    axis=pyferret.T_AXIS)
+    # Add the time-location data (time as the first axis, eliminating 
+    # locations with missing time steps) a chunk of time steps at a time
+    eofs = eofanal.EOFAnalysis(None)
+    eofs.setminsignif(min_signif)
+    for start in range(0, ntime, TIME_CHUNK_SIZE):
+        eofs.partial_fit(data[:, :, :, start:start+TIME_CHUNK_SIZE][defd_mask].T)
+    eofs.finalize()
+    # Initialize the result to all-undefined
+    result[:] = result_bdf
+    # The values at m=0 are the time-series averages
+    result[:, :, :, 0, 0, 0][defd_mask] = eofs.avgvec()
+    # Assign the significant EOFs
+    numeofs = eofs.numeofs()
+    if (maxeofs > 0) and (numeofs > maxeofs):
+        numeofs = maxeofs
+    for k in range(1, numeofs+1):
+        result[:, :, :, 0, k, 0][defd_mask] = eofs.eofvec(k)
+    # The insignificant EOFs are left as undefined 
+    return
+
+
+if __name__ == "__main__":
+    # Just verify ferret_init does not raise an error
+    defdict = ferret_init(0)
+    # Create some data with a location undefined at one time
+    xdata = numpy.linspace(0.0, 1.0, 7)
+    ydata = numpy.linspace(-1.0, 1.0, 9)
+    tdata = numpy.linspace(0.0, 20.0 * numpy.pi, 700)
+    xytdata = numpy.outer(numpy.outer(xdata, ydata), numpy.cos(tdata)) \
+            + numpy.outer(numpy.outer(xdata * xdata, 1.0 - ydata), numpy.sin(tdata)) \
+            + 3.0
+    xytdata = xytdata.reshape((7, 9, 1, 700, 1, 1))
+    xytdata[6, 8, 0, 345, 0, 0] = -1.0E34
+    # Create the result array and the other ferret_compute arguments
+    result = numpy.zeros((7, 9, 1, 1, 7*9+1, 1))
+    resbdf = numpy.array([1.0E20])
+    inputs = (xytdata, 0.001, -1)
+    inpbdfs = (-1.0E34, -1.0E34, -1.0E34)
+    ferret_compute(0, result, resbdf, inputs, inpbdfs)
+    # Compare to the analysis of all the data at once
+    defd_mask = numpy.ones((7, 9, 1), dtype=bool)
+    defd_mask[6, 8, 0] = False
+    eofs = eofanal.EOFAnalysis(xytdata[:, :, :, :, 0, 0][defd_mask].T)
+    eofs.setminsignif(0.001)
+    eofs.analyze()
+    if not numpy.allclose(result[:, :, :, 0, 0, 0][defd_mask], eofs.avgvec()):
+        raise ValueError("time-series averages differ from those of EOFAnalysis.analyze")
+    numeofs = eofs.numeofs()
+    if numeofs != 2:
+        raise ValueError("number of EOFs: expected 2, found %d" % numeofs)
+    for k in range(1, numeofs+1):
+        eofvec = result[:, :, :, 0, k, 0][defd_mask]
+        expected = eofs.eofvec(k)
+        if not numpy.allclose(numpy.sign(numpy.dot(eofvec, expected)) * eofvec, expected):
+            raise ValueError("EOF %d differs from that of EOFAnalysis.analyze" % k)
+    if not numpy.allclose(result[6, 8, 0, 0, :, 0], resbdf):
+        raise ValueError("location with missing data is not undefined")
+    if not numpy.allclose(result[:, :, :, 0, numeofs+1:, 0], resbdf):
+        raise ValueError("insignificant EOFs are not undefined")
+    print("Success")
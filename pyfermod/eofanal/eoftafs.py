@@ -0,0 +1,142 @@
+'''
+PyFerret external function providing the Time Amplitude Functions 
+(TAFs) along the ensemble axis for the Empirical Orthogonal Functions 
+(EOFs) given by the eofpatterns function.  Each time value of a TAF 
+only depends on the data at that time, so the calculation can be 
+broken up along the time axis and the data never needs to be in 
+memory all at once.
+'''
+
+from __future__ import print_function
+
+import numpy
+import pyferret
+
+def ferret_init(efid):
+    '''
+    Initializes the eoftafs function. 
+    '''
+    init_dict = { }
+    init_dict["numargs"] = 2
+    init_dict["descript"] = "Time Amplitude Functions (TAFs) along the " + \
+        "ensemble axis for the EOFs from eofpatterns"
+    init_dict["argnames"] = ("Data",
+                             "Patterns")
+    init_dict["argdescripts"] = (
+        "Time-location data; defined on T and one or more of X, Y, Z",
+        "Time-series averages and EOFs of Data returned by eofpatterns")
+    init_dict["argtypes"] = (pyferret.FLOAT_ARRAY,
+                             pyferret.FLOAT_ARRAY)
+    # T matches the data; X, Y, and Z removed; E axis added as an abstract axis
+    axes = [ pyferret.AXIS_DOES_NOT_EXIST ] * pyferret.MAX_FERRET_NDIM
+    axes[pyferret.T_AXIS] = pyferret.AXIS_IMPLIED_BY_ARGS
+    axes[pyferret.E_AXIS] = pyferret.AXIS_ABSTRACT
+    init_dict["axes"] = axes
+    time_influence = [ False ] * pyferret.MAX_FERRET_NDIM
+    time_influence[pyferret.T_AXIS] = True
+    no_influence = [ False ] * pyferret.MAX_FERRET_NDIM
+    init_dict["influences"] = (time_influence,
+                               no_influence)
+    # each time step is computed independently of the others
+    piecemeal = [ False ] * pyferret.MAX_FERRET_NDIM
+    piecemeal[pyferret.T_AXIS] = True
+    init_dict["piecemeal"] = piecemeal
+
+    return init_dict
+
+
+def ferret_result_limits(efid):
+    '''
+    Provides the bounds of the E abstract axis, which is one 
+    less than the size of the E axis of the patterns.
+    '''
+    maxeofs = 1
+    axis_info = pyferret.get_axis_info(efid, pyferret.ARG2, pyferret.E_AXIS)
+    if axis_info:
+        npts = axis_info.get("size", -1)
+        if npts > 1:
+            maxeofs = npts - 1
+    result_limits = [ None ] * pyferret.MAX_FERRET_NDIM
+    result_limits[pyferret.E_AXIS] = (1, maxeofs)
+    return result_limits
+
+
+def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
+    '''
+    Assign result with the values of the TAFs for the time steps of 
+    the X,Y,Z,T data given in inputs[0].  The time-series averages 
+    (at m=1) and the EOFs (at m>1) are given as the X,Y,Z,E patterns 
+    in inputs[1].  The TAF values for a time step is undefined if the
+    data is undefined at any location used in the EOF analysis.
+    '''
+    data = inputs[pyferret.ARG1]
+    patterns = inputs[pyferret.ARG2]
+    # verify the axes of the input data and patterns
+    if (data.shape[pyferret.E_AXIS] > 1) or (data.shape[pyferret.F_AXIS] > 1):
+        raise ValueError("Input data cannot have an ensemble or forecast axis")
+    if (patterns.shape[pyferret.T_AXIS] > 1) or (patterns.shape[pyferret.F_AXIS] > 1):
+        raise ValueError("Patterns cannot have a time or forecast axis")
+    if data.shape[:pyferret.T_AXIS] != patterns.shape[:pyferret.T_AXIS]:
+        raise ValueError("Data and patterns are not on the same X, Y, Z grid")
+    # The locations used in the analysis are those with defined averages
+    defd_mask = ( numpy.fabs(patterns[:, :, :, 0, 0, 0] - 
+                             input_bdfs[pyferret.ARG2]) >= 1.0E-5 )
+    tavg = patterns[:, :, :, 0, 0, 0][defd_mask]
+    # Time-location data (a 2-D array) adjusted to zero mean value
+    timeloc = data[:, :, :, :, 0, 0][defd_mask].T - tavg
+    defd_times = numpy.logical_and.reduce(
+                    numpy.fabs(timeloc + tavg - input_bdfs[pyferret.ARG1]) >= 1.0E-5,
+                    axis=1)
+    # Initialize the result to all-undefined
+    result[:] = result_bdf
+    for k in range(1, min(patterns.shape[pyferret.E_AXIS], result.shape[pyferret.E_AXIS] + 1)):
+        eofvec = patterns[:, :, :, 0, k, 0][defd_mask]
+        if numpy.any(numpy.fabs(eofvec - input_bdfs[pyferret.ARG2]) < 1.0E-5):
+            # insignificant EOFs are undefined
+            continue
+        # The square of the norm of an EOF is the eigenvalue; 
+        # so TAF = F * eigvec / sqrt(eigval) = F * EOF / eigval
+        tafvec = numpy.dot(timeloc, eofvec) / numpy.dot(eofvec, eofvec)
+        result[0, 0, 0, :, k-1, 0][defd_times] = tafvec[defd_times]
+    return
+
+
+if __name__ == "__main__":
+    import pyferret.eofanal as eofanal
+    # Just verify ferret_init does not raise an error
+    defdict = ferret_init(0)
+    # Create some data with a location undefined at one time
+    xdata = numpy.linspace(0.0, 1.0, 7)
+    ydata = numpy.linspace(-1.0, 1.0, 9)
+    tdata = numpy.linspace(0.0, 20.0 * numpy.pi, 700)
+    xytdata = numpy.outer(numpy.outer(xdata, ydata), numpy.cos(tdata)) \
+            + numpy.outer(numpy.outer(xdata * xdata, 1.0 - ydata), numpy.sin(tdata)) \
+            + 3.0
+    xytdata = xytdata.reshape((7, 9, 1, 700, 1, 1))
+    defd_mask = numpy.ones((7, 9, 1), dtype=bool)
+    defd_mask[6, 8, 0] = False
+    xytdata[6, 8, 0, 345, 0, 0] = -1.0E34
+    # Create the patterns from an analysis of all the data
+    eofs = eofanal.EOFAnalysis(xytdata[:, :, :, :, 0, 0][defd_mask].T)
+    eofs.analyze()
+    numeofs = eofs.numeofs()
+    patterns = -1.0E34 * numpy.ones((7, 9, 1, 1, 4, 1))
+    patterns[:, :, :, 0, 0, 0][defd_mask] = eofs.avgvec()
+    for k in range(1, numeofs+1):
+        patterns[:, :, :, 0, k, 0][defd_mask] = eofs.eofvec(k)
+    # Compute the TAFs in two time pieces, as Ferret might
+    result = numpy.zeros((1, 1, 1, 700, 3, 1))
+    resbdf = numpy.array([1.0E20])
+    inpbdfs = (-1.0E34, -1.0E34)
+    xytdata[0, 0, 0, 123, 0, 0] = -1.0E34
+    for (start, end) in ((0, 300), (300, 700)):
+        ferret_compute(0, result[:, :, :, start:end, :, :], resbdf,
+                       (xytdata[:, :, :, start:end, :, :], patterns), inpbdfs)
+    for k in range(1, numeofs+1):
+        expected = eofs.tafvec(k)
+        expected[123] = resbdf[0]
+        if not numpy.allclose(result[0, 0, 0, :, k-1, 0], expected):
+            raise ValueError("TAF %d differs from that of EOFAnalysis.analyze" % k)
+    if not numpy.allclose(result[0, 0, 0, :, numeofs:, 0], resbdf):
+        raise ValueError("TAFs of insignificant EOFs are not undefined")
+    print("Success")
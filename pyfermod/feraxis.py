@@ -3,7 +3,7 @@ Represents Ferret axes in Python.
 '''
 
 import numbers
-import time
+import re
 import numpy
 import pyferret
 
@@ -16,21 +16,20 @@ _VALID_AXIS_TYPES = frozenset( (pyferret.AXISTYPE_LONGITUDE,
                                 pyferret.AXISTYPE_ABSTRACT, 
                                 pyferret.AXISTYPE_NORMAL) )
 
-# Supported formats for time.strptime
-_TIME_PARSE_FORMATS = ( 
-    '%d-%b-%Y %H:%M:%S',
-    '%d-%b-%Y %H:%M',
-    '%d-%b-%Y',
-    '%Y-%m-%dT%H:%M:%S',
-    '%Y-%m-%dT%H:%M',
-    '%Y-%m-%d %H:%M:%S',
-    '%Y-%m-%d %H:%M',
-    '%Y-%m-%d', 
-)
-_TIME_NOYEAR_PARSE_FORMATS = (
-    '%d-%b %H:%M:%S',
-    '%d-%b',
-)
+# Single precompiled regular expression for the supported date and time formats:
+#     DD-MON-YYYY, MON-YYYY, DD-MON (no year), or YYYY-MM-DD, optionally
+#     followed by a space or T and then HH:MM or HH:MM:SS
+# (the numeric fields accept the same values as time.strptime)
+_TIME_PARSE_REGEX = re.compile(
+    r'(?:(?P<day>3[01]|[12][0-9]|0[1-9]|[1-9])-(?P<mon>[a-z]{3})(?:-(?P<year>[0-9]{4}))?'
+    r'|(?P<monyr>[a-z]{3})-(?P<yronly>[0-9]{4})'
+    r'|(?P<isoyear>[0-9]{4})-(?P<isomon>1[0-2]|0[1-9]|[1-9])-(?P<isoday>3[01]|[12][0-9]|0[1-9]|[1-9]))'
+    r'(?:(?:T|\s+)(?P<hour>2[0-3]|[01][0-9]|[0-9]):(?P<minute>[0-5][0-9]|[0-9])'
+    r'(?::(?P<second>6[01]|[0-5][0-9]|[0-9]))?)?\Z',
+    re.IGNORECASE)
+
+# Number of days in each month (allowing for leap years)
+_MONTH_DAYS = ( 0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31 )
 
 
 class FerAxis(object):
@@ -341,9 +340,8 @@ class FerAxis(object):
         If val is a level string (unit m when istimestep is False), 
             (pyferret.AXISTYPE_LEVEL, fval) is returned where fval 
             is the floating point level value.
-        If val is a date and, optionally, time string matching one of the formats given
-            in _TIME_PARSE_FORMATS or _TIME_NOYEAR_PARSE_FORMATS, 
-            (pyferret.AXISTYPE_TIME, tval) is returned where
+        If val is a date and, optionally, time string matching one of the formats 
+            described for _TIME_PARSE_REGEX, (pyferret.AXISTYPE_TIME, tval) is returned where
             tval is a list of six numbers ordered by the indices:
                 pyferret.TIMEARRAY_DAYINDEX
                 pyferret.TIMEARRAY_MONTHINDEX
@@ -369,33 +367,10 @@ class FerAxis(object):
         if not isinstance(val, str):
             raise TypeError('not a string: %s' % repr(val))
         if not istimestep:
-            # not a time *step* - first try parsing as a date/time string using the accepted formats
-            for fmt in _TIME_PARSE_FORMATS:
-                try:
-                    tval = time.strptime(val, fmt)
-                    tlist = [ 0, 0, 0, 0, 0, 0 ]
-                    tlist[pyferret.TIMEARRAY_DAYINDEX] = tval.tm_mday
-                    tlist[pyferret.TIMEARRAY_MONTHINDEX] = tval.tm_mon
-                    tlist[pyferret.TIMEARRAY_YEARINDEX] = tval.tm_year
-                    tlist[pyferret.TIMEARRAY_HOURINDEX] = tval.tm_hour
-                    tlist[pyferret.TIMEARRAY_MINUTEINDEX] = tval.tm_min
-                    tlist[pyferret.TIMEARRAY_SECONDINDEX] = tval.tm_sec
-                    return (pyferret.AXISTYPE_TIME, tlist)
-                except ValueError:
-                    pass
-            for fmt in _TIME_NOYEAR_PARSE_FORMATS:
-                try:
-                    tval = time.strptime(val, fmt)
-                    tlist = [ 0, 0, 0, 0, 0, 0 ]
-                    tlist[pyferret.TIMEARRAY_DAYINDEX] = tval.tm_mday
-                    tlist[pyferret.TIMEARRAY_MONTHINDEX] = tval.tm_mon
-                    # leave the year as zero - time.strptime assigns 1900
-                    tlist[pyferret.TIMEARRAY_HOURINDEX] = tval.tm_hour
-                    tlist[pyferret.TIMEARRAY_MINUTEINDEX] = tval.tm_min
-                    tlist[pyferret.TIMEARRAY_SECONDINDEX] = tval.tm_sec
-                    return (pyferret.AXISTYPE_TIME, tlist)
-                except ValueError:
-                    pass
+            # not a time *step* - first try parsing as a date/time string
+            tlist = FerAxis._parsedatestring(val)
+            if tlist is not None:
+                return (pyferret.AXISTYPE_TIME, tlist)
         # not a date/time, so parse as a number with possibly a final letter for the unit
         try:
             lastchar = val[-1].upper()
@@ -450,6 +425,54 @@ class FerAxis(object):
             raise ValueError('unable to parse: %s' % val)
 
 
+    @staticmethod
+    def _parsedatestring(val):
+        '''
+        Parses the string val as a date and, optionally, time using _TIME_PARSE_REGEX.
+        Returns a list of six numbers ordered by the TIMEARRAY indices (with a year 
+        of zero if not given, and a day of one if only the month and year are given), 
+        or None if val is not a valid date string.
+        '''
+        mat = _TIME_PARSE_REGEX.match(val)
+        if mat is None:
+            return None
+        if mat.group('isoyear'):
+            day = int(mat.group('isoday'))
+            month = int(mat.group('isomon'))
+            year = int(mat.group('isoyear'))
+        else:
+            if mat.group('monyr'):
+                day = 1
+                monstr = mat.group('monyr')
+                yearstr = mat.group('yronly')
+            else:
+                day = int(mat.group('day'))
+                monstr = mat.group('mon')
+                yearstr = mat.group('year')
+            month = pyferret.datamethods._LC_MONTH_NUMS.get(monstr.lower())
+            if month is None:
+                return None
+            if yearstr:
+                year = int(yearstr)
+            else:
+                year = 0
+        if day > _MONTH_DAYS[month]:
+            return None
+        if (month == 2) and (day == 29) and (year > 0):
+            if (year % 4 != 0) or ((year % 100 == 0) and (year % 400 != 0)):
+                return None
+        tlist = [ 0, 0, 0, 0, 0, 0 ]
+        tlist[pyferret.TIMEARRAY_DAYINDEX] = day
+        tlist[pyferret.TIMEARRAY_MONTHINDEX] = month
+        tlist[pyferret.TIMEARRAY_YEARINDEX] = year
+        if mat.group('hour'):
+            tlist[pyferret.TIMEARRAY_HOURINDEX] = int(mat.group('hour'))
+            tlist[pyferret.TIMEARRAY_MINUTEINDEX] = int(mat.group('minute'))
+            if mat.group('second'):
+                tlist[pyferret.TIMEARRAY_SECONDINDEX] = int(mat.group('second'))
+        return tlist
+
+
     @staticmethod
     def _makedatestring(timearray):
         '''
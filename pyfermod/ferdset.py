@@ -288,7 +288,8 @@ class FerDSet(object):
                 # remove this variable from Ferret 
                 self._fervars[name]._removefromferret()
             except NotImplementedError:
-                pass
+                # file variable removed when the dataset is canceled
+                pyferret.fervar._bumpversion(name)
         # remove all the FerVar's from _fervars
         self._fervars.clear()
         self._fervarnames = [ ]
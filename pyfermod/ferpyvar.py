@@ -11,7 +11,7 @@ class FerPyVar(pyferret.FerVar):
     FerVar whose data is from an array in Python.
     '''
 
-    def __init__(self, data, grid, missval=numpy.nan, unit=None, title=None):
+    def __init__(self, data, grid, missval=numpy.nan, unit=None, title=None, dtype=numpy.float64):
         '''
         Create as an anonymous FerPyVar.  The PyVar representing this data
         will not be assigned in Ferret until this FerPyVar is assigned a
@@ -21,6 +21,8 @@ class FerPyVar(pyferret.FerVar):
             missval (float or single-element array of float): value used to indicate missing data
             unit (string): unit for the data
             title (string): title (descriptive long name) for the PyVar in Ferret
+            dtype (numpy.float64 or numpy.float32): type of the data kept for the 
+                PyVar; float32 data is converted to float64 by Ferret when used
         '''
         # initialize the FerVar this object is derived from
         super(FerPyVar,self).__init__(title=title)
@@ -32,8 +34,9 @@ class FerPyVar(pyferret.FerVar):
         except (ValueError, TypeError) as ex:
             raise ValueError('grid is invalid: %s' % str(ex))
         # assign a copy of the data
+        dtype = pyferret.datamethods._floatdtype(dtype)
         try:
-            self._dataarray = numpy.array(data, dtype=numpy.float64, order='F', copy=True)
+            self._dataarray = numpy.array(data, dtype=dtype, order='F', copy=True)
         except ValueError:
             raise ValueError('data is not an array or array-like of numbers')
         if self._dataarray.ndim > pyferret.MAX_FERRET_NDIM:
@@ -67,7 +70,8 @@ class FerPyVar(pyferret.FerVar):
                         grid=self._datagrid, 
                         missval=self._missingvalue, 
                         unit=self._dataunit,
-                        title=self._title)
+                        title=self._title,
+                        dtype=self._dataarray.dtype)
 
 
     def __repr__(self):
@@ -144,13 +148,16 @@ class FerPyVar(pyferret.FerVar):
         if self._title:
             datadict['title'] = self._title
         try:
-            pyferret.putdata(datadict)
+            # the data array is a private copy that is never modified,
+            # so Ferret can use it directly if the axes are in Ferret order
+            pyferret.putdata(datadict, copy=False, dtype=self._dataarray.dtype)
         except Exception as ex:
             raise ValueError(str(ex))
         self._varname = varname
         self._dsetname = dsetname
         self._definition = self.fername()
-        # at this point, the data is copied into Ferret, 
+        pyferret.fervar._bumpversion(varname)
+        # at this point, Ferret holds its own reference to the data,
         # so calling clean will not cause any problems
 
 
@@ -169,5 +176,6 @@ class FerPyVar(pyferret.FerVar):
         (errval, errmsg) = pyferret.run(cmdstr)
         if errval != pyferret.FERR_OK:
             raise ValueError('unable to remove PyVar %s from Ferret: %s' % (fername, errmsg))
+        pyferret.fervar._bumpversion(self._varname)
         self._varname = ''
 
@@ -8,7 +8,9 @@ import numpy
 import shapefile
 import os
 import os.path
+import struct
 import pyferret.fershp.mapprj
+import pyferret.quadgeom
 
 
 def createprjfile(shapefile_mapprj, shapefile_name):
@@ -57,36 +59,7 @@ def quadxycentroids(xvals, yvals):
     Raises:
         ValueError if the arguments are invalid
     """
-    xarray = numpy.asarray(xvals, dtype=float)
-    yarray = numpy.asarray(yvals, dtype=float)
-    if len(xarray.shape) < 2:
-        raise ValueError("xvals and yvals must be (at least) two dimensional")
-    if xarray.shape != yarray.shape:
-        raise ValueError("xvals and yvals must have the same dimensions")
-    sixareas  = xarray[:-1,:-1] * yarray[:-1,1:]  - xarray[:-1,1:]  * yarray[:-1,:-1]
-    sixareas += xarray[:-1,1:]  * yarray[1:,1:]   - xarray[1:,1:]   * yarray[:-1,1:]
-    sixareas += xarray[1:,1:]   * yarray[1:,:-1]  - xarray[1:,:-1]  * yarray[1:,1:]
-    sixareas += xarray[1:,:-1]  * yarray[:-1,:-1] - xarray[:-1,:-1] * yarray[1:,:-1]
-    sixareas *= 3.0
-    cenxs  = ( xarray[:-1,:-1] * yarray[:-1,1:]  - xarray[:-1,1:]  * yarray[:-1,:-1] ) \
-             * ( xarray[:-1,:-1] + xarray[:-1,1:]  )
-    cenxs += ( xarray[:-1,1:]  * yarray[1:,1:]   - xarray[1:,1:]   * yarray[:-1,1:] ) \
-             * ( xarray[:-1,1:]  + xarray[1:,1:]   )
-    cenxs += ( xarray[1:,1:]   * yarray[1:,:-1]  - xarray[1:,:-1]  * yarray[1:,1:] ) \
-             * ( xarray[1:,1:]   + xarray[1:,:-1]  )
-    cenxs += ( xarray[1:,:-1]  * yarray[:-1,:-1] - xarray[:-1,:-1] * yarray[1:,:-1] ) \
-             * ( xarray[1:,:-1]  + xarray[:-1,:-1] )
-    cenxs /= sixareas
-    cenys  = ( xarray[:-1,:-1] * yarray[:-1,1:]  - xarray[:-1,1:]  * yarray[:-1,:-1] ) \
-             * ( yarray[:-1,:-1] + yarray[:-1,1:]  )
-    cenys += ( xarray[:-1,1:]  * yarray[1:,1:]   - xarray[1:,1:]   * yarray[:-1,1:] ) \
-             * ( yarray[:-1,1:]  + yarray[1:,1:]   )
-    cenys += ( xarray[1:,1:]   * yarray[1:,:-1]  - xarray[1:,:-1]  * yarray[1:,1:] ) \
-             * ( yarray[1:,1:]   + yarray[1:,:-1]  )
-    cenys += ( xarray[1:,:-1]  * yarray[:-1,:-1] - xarray[:-1,:-1] * yarray[1:,:-1] ) \
-             * ( yarray[1:,:-1]  + yarray[:-1,:-1] )
-    cenys /= sixareas
-    return (cenxs, cenys)
+    return pyferret.quadgeom.planarquadcentroids(xvals, yvals)
 
 
 def quadxycenters(xvals, yvals):
@@ -107,18 +80,10 @@ def quadxycenters(xvals, yvals):
     Raises:
         ValueError if the arguments are invalid
     """
-    xarray = numpy.asarray(xvals, dtype=float)
-    yarray = numpy.asarray(yvals, dtype=float)
-    if len(xarray.shape) < 2:
-        raise ValueError("xvals and yvals must be (at least) two dimensional")
-    if xarray.shape != yarray.shape:
-        raise ValueError("xvals and yvals must have the same dimensions")
-    cenxs  = 0.25 * ( xarray[:-1,:-1] + xarray[:-1,1:] + xarray[1:,1:] + xarray[1:,:-1] )
-    cenys  = 0.25 * ( yarray[:-1,:-1] + yarray[:-1,1:] + yarray[1:,1:] + yarray[1:,:-1] )
-    return (cenxs, cenys)
-
-
-def addquadxyvalues(sfwriter, pt0, pt1, pt2, pt3, zcoord, vals):
+    return pyferret.quadgeom.quadaveragecenters(xvals, yvals)
+
+
+def addquadxyvalues(sfwriter, pt0, pt1, pt2, pt3, zcoord, vals, dqarea=None):
     """
     Adds a quadrilateral shape to sfwriter defined by the X,Y vertices
     pt0 - pt1 - pt2 - pt3 - pt0, and possibly the common Z coordinate
@@ -137,6 +102,10 @@ def addquadxyvalues(sfwriter, pt0, pt1, pt2, pt3, zcoord, vals):
        vals     - the list of values to be associated with this shape.  The
                   fields for these values must already have been created in
                   sfwriter.
+       dqarea   - twice the signed area of the quadrilateral pt0 - pt1 - pt2 -
+                  pt3 - pt0, if already computed (for example, for all the
+                  quadrilaterals at once using pyferret.quadgeom); if None,
+                  it is computed here.
 
     Note: the winding of the quadrilateral is determined only using the X and
           Y coordinates, even when multiple Z coordinates are provided.
@@ -150,11 +119,12 @@ def addquadxyvalues(sfwriter, pt0, pt1, pt2, pt3, zcoord, vals):
     x1 = float(pt1[0]); y1 = float(pt1[1])
     x2 = float(pt2[0]); y2 = float(pt2[1])
     x3 = float(pt3[0]); y3 = float(pt3[1])
-    # Compute 2 * signed area of this simple quadrilateral
-    dqarea  = x0 * y1 - x1 * y0
-    dqarea += x1 * y2 - x2 * y1
-    dqarea += x2 * y3 - x3 * y2
-    dqarea += x3 * y0 - x0 * y3
+    if dqarea is None:
+        # Compute 2 * signed area of this simple quadrilateral
+        dqarea  = x0 * y1 - x1 * y0
+        dqarea += x1 * y2 - x2 * y1
+        dqarea += x2 * y3 - x3 * y2
+        dqarea += x3 * y0 - x0 * y3
     # Create the correctly ordered array of coordinates for this single shape part
     part = [ ]
     if dqarea < 0.0:
@@ -194,6 +164,109 @@ def addquadxyvalues(sfwriter, pt0, pt1, pt2, pt3, zcoord, vals):
     sfwriter.record(*vals)
 
 
+def shapepointcounts(sf):
+    """
+    Returns the number of points in each shape of a shapefile, as a list,
+    using only the record headers of the .shp file; the coordinates of the
+    points are not read.
+
+    Arguments:
+        sf - the shapefile.Reader object for the shapefile
+
+    Raises:
+        ValueError if the .shp file contains an unknown shape type
+    """
+    shp = sf.shp
+    shp.seek(0, 2)
+    shplen = shp.tell()
+    counts = [ ]
+    # Records start after the 100-byte file header.  Each record has an
+    # 8-byte header: the (big-endian) record number and length of the
+    # contents in 16-bit words.  The contents start with the (little-endian)
+    # shape type, which determines where the number of points is given.
+    offset = 100
+    while offset + 12 <= shplen:
+        shp.seek(offset)
+        header = shp.read(52)
+        (contentlen,) = struct.unpack(">i", header[4:8])
+        (shapetype,) = struct.unpack("<i", header[8:12])
+        if shapetype == shapefile.NULL:
+            counts.append(0)
+        elif shapetype in (shapefile.POINT, shapefile.POINTZ, shapefile.POINTM):
+            counts.append(1)
+        elif shapetype in (shapefile.MULTIPOINT, shapefile.MULTIPOINTZ,
+                           shapefile.MULTIPOINTM):
+            # after the shape type and bounding box
+            counts.append(struct.unpack("<i", header[44:48])[0])
+        elif shapetype in (shapefile.POLYLINE, shapefile.POLYLINEZ, shapefile.POLYLINEM,
+                           shapefile.POLYGON, shapefile.POLYGONZ, shapefile.POLYGONM,
+                           shapefile.MULTIPATCH):
+            # after the shape type, bounding box, and number of parts
+            counts.append(struct.unpack("<i", header[48:52])[0])
+        else:
+            raise ValueError("Unknown shape type %d in the shapefile" % shapetype)
+        offset += 8 + 2 * contentlen
+    return counts
+
+
+def shapefilenumpoints(shapefile_name):
+    """
+    Returns the number of points needed to hold all the coordinates
+    of the shapes in a shapefile, including the (missing-value) point
+    following each shape to separate shapes.
+
+    Arguments:
+        shapefile_name - name of the shapefile
+
+    Raises:
+        ValueError if the .shp file contains an unknown shape type
+    """
+    sf = shapefile.Reader(shapefile_name)
+    counts = shapepointcounts(sf)
+    return sum(counts) + len(counts)
+
+
+def assignshapepoints(sf, result, zindex=None):
+    """
+    Assigns the X coordinates of the points of the shapes in a shapefile
+    to result[:,0,0,0,0,0], and the Y coordinates to result[:,1,0,0,0,0].
+    If zindex is not None, the Z coordinates are assigned to
+    result[:,zindex,0,0,0,0].  One point (which is not assigned) is left
+    between the points of consecutive shapes.  Shapes are read one at a
+    time, and the points of a shape are assigned in bulk.  Points that do
+    not fit in result are ignored.
+
+    Arguments:
+        sf     - the shapefile.Reader object for the shapefile
+        result - the array to assign
+        zindex - index in result for the Z coordinates, or None
+
+    Returns:
+        the number of shapes with any points assigned (or that would have
+        had points assigned if they contained any points)
+    """
+    maxpts = result.shape[0]
+    num_shapes = 0
+    pt_index = 0
+    for shp in sf.iterShapes():
+        if pt_index >= maxpts:
+            break
+        num_shapes += 1
+        numpts = min(len(shp.points), maxpts - pt_index)
+        if numpts > 0:
+            end_index = pt_index + numpts
+            # The points may include Z and M values, depending on the version of shapefile
+            pts = numpy.array(shp.points[:numpts], dtype=numpy.float64)
+            result[pt_index:end_index, :2, 0, 0, 0, 0] = pts[:, :2]
+            if zindex is not None:
+                result[pt_index:end_index, zindex, 0, 0, 0, 0] = \
+                        numpy.array(shp.z[:numpts], dtype=numpy.float64)
+            pt_index = end_index
+        # point separating shapes
+        pt_index += 1
+    return num_shapes
+
+
 #
 # The following is only for testing this module from the command line
 #
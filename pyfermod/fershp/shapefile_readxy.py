@@ -8,6 +8,7 @@ from __future__ import print_function
 
 import numpy
 import pyferret
+import pyferret.fershp
 import shapefile
 
 def ferret_init(efid):
@@ -43,10 +44,7 @@ def ferret_result_limits(efid):
     maxpts = int(maxpts)
     if maxpts == -1:
         shapefile_name = pyferret.get_arg_one_val(efid, pyferret.ARG1)
-        sf = shapefile.Reader(shapefile_name)
-        maxpts = 0
-        for shp in sf.shapes():
-            maxpts += len(shp.points) + 1
+        maxpts = pyferret.fershp.shapefilenumpoints(shapefile_name)
     elif maxpts < 1:
         raise ValueError("MAXPTS must be a positive integer or -1")
     return ( (1, maxpts), (1, 2), None, None, None, None, )
@@ -62,17 +60,8 @@ def ferret_compute(efid, result, resbdf, inputs, inpbdfs):
     """
     result[:,:,:,:,:,:] = resbdf
     sf = shapefile.Reader(inputs[0])
-    try:
-        pt_index = 0
-        for shp in sf.shapes():
-            for pt in shp.points:
-                result[pt_index,:2,0,0,0,0] = pt[:2]
-                pt_index += 1
-            # missing value coordinates (already assigned) separating shapes
-            pt_index += 1
-    except IndexError:
-        # hit the maximum number of points
-        pass
+    # missing value coordinates (already assigned) separate shapes
+    pyferret.fershp.assignshapepoints(sf, result)
 
 
 #
@@ -9,6 +9,7 @@ from __future__ import print_function
 
 import numpy
 import pyferret
+import pyferret.fershp
 import shapefile
 
 def ferret_init(efid):
@@ -47,10 +48,7 @@ def ferret_result_limits(efid):
     maxpts = int(maxpts)
     if maxpts == -1:
         shapefile_name = pyferret.get_arg_one_val(efid, pyferret.ARG1)
-        sf = shapefile.Reader(shapefile_name)
-        maxpts = 0
-        for shp in sf.shapes():
-            maxpts += len(shp.points) + 1
+        maxpts = pyferret.fershp.shapefilenumpoints(shapefile_name)
     elif maxpts < 1:
         raise ValueError("MAXPTS must be a positive integer or -1")
     return ( (1, maxpts), (1, 4), None, None, None, None, )
@@ -90,27 +88,15 @@ def ferret_compute(efid, result, resbdf, inputs, inpbdfs):
     else:
         field_index = k
 
-    # Retrieve the coordinates of the shapes
-    num_shapes = 0
-    try:
-        pt_index = 0
-        for shp in sf.shapes():
-            num_shapes += 1
-            for (pt, z) in zip(shp.points, shp.z):
-                result[pt_index,:2,0,0,0,0] = pt[:2]
-                result[pt_index, 2,0,0,0,0] = z
-                pt_index += 1
-            # missing value coordinates (already assigned) separating shapes
-            pt_index += 1
-    except IndexError:
-        # hit the maximum number of points
-        pass
+    # Retrieve the coordinates of the shapes; missing value
+    # coordinates (already assigned) separate shapes
+    num_shapes = pyferret.fershp.assignshapepoints(sf, result, 2)
     if num_shapes < 1:
         raise ValueError("No shapes found")
 
     # Retrieve the field values
     rec_index = 0
-    for rec in sf.records():
+    for rec in sf.iterRecords():
         result[rec_index,3,0,0,0,0] = float(rec[field_index])
         rec_index += 1
         # only get field values for shapes that were read
@@ -15,6 +15,7 @@ from __future__ import print_function
 import shapefile
 import pyferret
 import pyferret.fershp
+import pyferret.quadgeom
 
 def ferret_init(efid):
     """
@@ -105,6 +106,11 @@ def ferret_compute(efid, result, resbdf, inputs, inpbdfs):
     sfwriter = shapefile.Writer(shapefile.POLYGONZ)
     sfwriter.field(field_name, "N", 20, 7)
 
+    # Twice the signed areas of all the quadrilaterals, computed at once; the
+    # vertices below are in the reverse order of that used by pyferret.quadgeom
+    dqareas = -2.0 * pyferret.quadgeom.planarquadareas(grid_xs[:, :, 0, 0, 0, 0],
+                                                       grid_ys[:, :, 0, 0, 0, 0])
+
     # Add the shapes with their values
     shape_written = False
     for j in range(grid_vals.shape[1]):
@@ -120,7 +126,8 @@ def ferret_compute(efid, result, resbdf, inputs, inpbdfs):
                            grid_zs[i,   j+1, 0, 0, 0, 0],
                            grid_zs[i+1, j+1, 0, 0, 0, 0],
                            grid_zs[i+1, j,   0, 0, 0, 0] ),
-                         [ float(grid_vals[i, j, 0, 0, 0, 0]) ])
+                         [ float(grid_vals[i, j, 0, 0, 0, 0]) ],
+                         dqareas[i, j])
     if not shape_written:
         raise ValueError("All values are missing values")
     sfwriter.save(shapefile_name)
@@ -2,9 +2,19 @@
 Represents Ferret variables in Python.
 '''
 
+import collections
+import math
 import numbers
+import numpy
+import os
+import re
+import tempfile
 import pyferret
 
+__all__ = [ 'REGRID_LINEAR', 'REGRID_AVERAGE', 'REGRID_ASSOCIATE', 'REGRID_MEAN',
+            'REGRID_NEAREST', 'REGRID_MIN', 'REGRID_MAX', 'REGRID_EXACT',
+            'FerVar', 'evaluate' ]
+
 # common regridding methods
 REGRID_LINEAR = "@LIN"
 REGRID_AVERAGE = "@AVE"
@@ -17,6 +27,33 @@ REGRID_EXACT = "@XACT"
 
 _ADDED_ATTRIBUTES = ('data', 'grid', 'missval', 'unit')
 
+# Ferret letters for coordinate limits and for index limits, ordered by axis number
+_COORD_LETTERS = ('X', 'Y', 'Z', 'T', 'E', 'F')
+_INDEX_LETTERS = ('I', 'J', 'K', 'L', 'M', 'N')
+
+# Number of seconds in each of Ferret's time axis units (second, minute, hour, 
+# day, week, month, and year, where a year is 365.2425 days)
+_TIME_UNIT_SECONDS = (1.0, 60.0, 3600.0, 86400.0, 604800.0, 2629746.0, 31556952.0)
+
+# Number of days before each month in a year without and with a leap day
+_DAYS_BEFORE_MONTH = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+_LEAP_DAYS_BEFORE_MONTH = (0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335)
+
+# Cache of parsed subset keys for FerVar.__getitem__, least recently used first
+_SUBSET_CACHE = collections.OrderedDict()
+_SUBSET_CACHE_SIZE = 1024
+
+# Version numbers of Ferret variable names (uppercase), changed whenever 
+# a FerVar or FerDSet defines, redefines, or removes a Ferret variable 
+# with that name, and the names of the Ferret variables used by each of 
+# these Ferret variables.  Used to find FerVars with out-of-date data.
+_VERSION_NUMBER = 0
+_VAR_VERSIONS = { }
+_VAR_DEPENDS = { }
+
+# Possible Ferret variable names in a definition
+_DEFN_NAME_REGEX = re.compile(r'[A-Za-z][A-Za-z0-9_$]*')
+
 class FerVar(object):
     '''
     Ferret variable object
@@ -47,12 +84,24 @@ class FerVar(object):
         # in the definition.  This list is not guaranteed to be complete 
         # and is not used in comparisons.
         self._requires = set()
+        # If this anonymous variable is an operation (arithmetic or a function) 
+        # on other FerVars, the operation as a format string with a %s for each 
+        # operand, and the tuple of operand FerVars; _definition is then the 
+        # format string applied to the operand definitions.  These give the 
+        # expression DAG used by evaluate to find common subexpressions.
+        self._operation = ''
+        self._operands = ()
         # Call the unload method to create and set the defaults for 
-        # _datagrid, _dataarray, _dataunit, and _missingvalue.
+        # _datagrid, _dataarray, _dataunit, _missingvalue, _loadversions,
+        # and _loadnumber.
         #     _datagrid is a FerGrid describing the Ferret grid for the variable.
         #     _dataarray is a NumPy ndarray contains the Ferret data for the variable.
         #     _dataunit is a string given the unit of the data
         #     _missingvalue is the missing value used for the data
+        #     _loadversions is a dictionary of the versions of the Ferret 
+        #         variables used by this variable when the data was loaded
+        #     _loadnumber is the latest version number known to not 
+        #         change the data loaded
         self.unload()
 
 
@@ -62,6 +111,8 @@ class FerVar(object):
         '''
         newvar = FerVar(defn=self._definition)
         newvar._requires.update(self._requires)
+        newvar._operation = self._operation
+        newvar._operands = self._operands
         return newvar
 
 
@@ -272,16 +323,9 @@ class FerVar(object):
         If other is not a FerVar or Real, returns NotImplemented
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) + (%s)' % (self._definition, other._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) + (%s)', (self, other))
         if isinstance(other, numbers.Real):
-            newdef = '(%s) + %s' % (self._definition, str(other))
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar('(%s) + ' + str(other), (self,))
         return NotImplemented
 
 
@@ -294,16 +338,9 @@ class FerVar(object):
         If other is not a FerVar or Real, returns NotImplemented
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) + (%s)' % (other._definition, self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) + (%s)', (other, self))
         if isinstance(other, numbers.Real):
-            newdef = '%s + (%s)' % (str(other), self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar(str(other) + ' + (%s)', (self,))
         return NotImplemented
 
 
@@ -316,16 +353,9 @@ class FerVar(object):
         If other is not a FerVar or Real, returns NotImplemented
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) - (%s)' % (self._definition, other._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) - (%s)', (self, other))
         if isinstance(other, numbers.Real):
-            newdef = '(%s) - %s' % (self._definition, str(other))
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar('(%s) - ' + str(other), (self,))
         return NotImplemented
 
 
@@ -338,16 +368,9 @@ class FerVar(object):
         If other is not a FerVar or Real, returns NotImplemented
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) - (%s)' % (other._definition, self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) - (%s)', (other, self))
         if isinstance(other, numbers.Real):
-            newdef = '%s - (%s)' % (str(other), self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar(str(other) + ' - (%s)', (self,))
         return NotImplemented
 
 
@@ -360,16 +383,9 @@ class FerVar(object):
         If other is not a FerVar or Real, returns NotImplemented
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) * (%s)' % (self._definition, other._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) * (%s)', (self, other))
         if isinstance(other, numbers.Real):
-            newdef = '(%s) * %s' % (self._definition, str(other))
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar('(%s) * ' + str(other), (self,))
         return NotImplemented
 
 
@@ -382,16 +398,9 @@ class FerVar(object):
         If other is not a FerVar or Real, returns NotImplemented
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) * (%s)' % (other._definition, self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) * (%s)', (other, self))
         if isinstance(other, numbers.Real):
-            newdef = '%s * (%s)' % (str(other), self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar(str(other) + ' * (%s)', (self,))
         return NotImplemented
 
 
@@ -405,16 +414,9 @@ class FerVar(object):
         (For Python3.x)
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) / (%s)' % (self._definition, other._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) / (%s)', (self, other))
         if isinstance(other, numbers.Real):
-            newdef = '(%s) / %s' % (self._definition, str(other))
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar('(%s) / ' + str(other), (self,))
         return NotImplemented
 
 
@@ -428,16 +430,9 @@ class FerVar(object):
         (For Python3.x)
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) / (%s)' % (other._definition, self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) / (%s)', (other, self))
         if isinstance(other, numbers.Real):
-            newdef = '%s / (%s)' % (str(other), self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar(str(other) + ' / (%s)', (self,))
         return NotImplemented
 
 
@@ -474,16 +469,9 @@ class FerVar(object):
         If other is not a FerVar or Real, returns NotImplemented
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) ^ (%s)' % (self._definition, other._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) ^ (%s)', (self, other))
         if isinstance(other, numbers.Real):
-            newdef = '(%s) ^ %s' % (self._definition, str(other))
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar('(%s) ^ ' + str(other), (self,))
         return NotImplemented
 
 
@@ -496,16 +484,9 @@ class FerVar(object):
         If other is not a FerVar or Real, returns NotImplemented
         '''
         if isinstance(other, FerVar):
-            newdef = '(%s) ^ (%s)' % (other._definition, self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            newvar._requires.update(other._requires)
-            return newvar
+            return _operationvar('(%s) ^ (%s)', (other, self))
         if isinstance(other, numbers.Real):
-            newdef = '%s ^ (%s)' % (str(other), self._definition)
-            newvar = FerVar(defn=newdef)
-            newvar._requires.update(self._requires)
-            return newvar
+            return _operationvar(str(other) + ' ^ (%s)', (self,))
         return NotImplemented
 
 
@@ -514,10 +495,7 @@ class FerVar(object):
         Returns an anonymous FerVar whose definition is 
         the product of -1.0 and this FerVar definition.
         '''
-        newdef = '-1.0 * (%s)' % self._definition
-        newvar = FerVar(defn=newdef)
-        newvar._requires.update(self._requires)
-        return newvar
+        return _operationvar('-1.0 * (%s)', (self,))
 
 
     def __pos__(self):
@@ -525,9 +503,7 @@ class FerVar(object):
         Returns an anonymous FerVar whose definition is 
         the same as this FerVar definition.
         '''
-        newvar = FerVar(defn=self._definition)
-        newvar._requires.update(self._requires)
-        return newvar
+        return self.copy()
 
 
     def __abs__(self):
@@ -535,10 +511,7 @@ class FerVar(object):
         Returns an anonymous FerVar whose definition is 
         the absolute value of this FerVar definition.
         '''
-        newdef = 'abs(%s)' % self._definition
-        newvar = FerVar(defn=newdef)
-        newvar._requires.update(self._requires)
-        return newvar
+        return _operationvar('abs(%s)', (self,))
 
 
     def __getitem__(self, key):
@@ -565,7 +538,16 @@ class FerVar(object):
         within the given tuple (or zero if not a tuple) specifies the axis.
         For example ['20N':'50N'] will always be a latitude subset.
 
-        TODO: handle step values
+        Slice steps are passed to Ferret as the delta of the limits, so 
+        [::4] gives I=1:<size>:4, and ['10E':'50E':5] gives X=10E:50E:5 
+        (which Ferret interprets as regridding to a 5 degree spacing).  
+        A time step, such as ['1-JAN-2000':'31-DEC-2010':'1d'], must have 
+        a unit of y, d, h, m, or s, and is converted to the units of the 
+        time axis.  Missing limits of a slice are obtained from the axis 
+        of this FerVar.
+
+        Parsed keys are cached, so repeatedly using the same key 
+        (such as when creating subsets in a loop) is inexpensive.
         '''
         if key is None:
             raise KeyError('None is not a valid key')
@@ -580,178 +562,8 @@ class FerVar(object):
         if key == 'unit':
            return self.getunit()
 
-        coordlimits = [ None ] * pyferret.MAX_FERRET_NDIM
-        indexlimits = [ None ] * pyferret.MAX_FERRET_NDIM
-        changed = False
-        # TODO: handle step values, try to condense code
-        if isinstance(key, tuple):
-            for k in range(len(key)):
-                piece = key[k]
-                if piece is None:
-                    continue
-                if isinstance(piece, slice):
-                    try:
-                        (axtype, start, stop, step) = pyferret.FerAxis._parsegeoslice(piece)
-                    except Exception as ex:
-                        raise KeyError('%s is not valid: %s' % (str(piece), str(ex)))
-                    if step is not None:
-                        raise KeyError('step values in slices are not supported at this time')
-                    if axtype == pyferret.AXISTYPE_LONGITUDE:
-                        if coordlimits[pyferret.X_AXIS] or indexlimits[pyferret.X_AXIS]:
-                            raise KeyError('two longitude slices given')
-                        coordlimits[pyferret.X_AXIS] = '%s:%s' % (str(start), str(stop))
-                        changed = True
-                    elif axtype == pyferret.AXISTYPE_LATITUDE:
-                        if coordlimits[pyferret.Y_AXIS] or indexlimits[pyferret.Y_AXIS]:
-                            raise KeyError('two latitude slices given')
-                        coordlimits[pyferret.Y_AXIS] = '%s:%s' % (str(start), str(stop))
-                        changed = True
-                    elif axtype == pyferret.AXISTYPE_LEVEL:
-                        if coordlimits[pyferret.Z_AXIS] or indexlimits[pyferret.Z_AXIS]:
-                            raise KeyError('two level slices given')
-                        coordlimits[pyferret.Z_AXIS] = '%s:%s' % (str(start), str(stop))
-                        changed = True
-                    elif axtype == pyferret.AXISTYPE_TIME:
-                        if coordlimits[pyferret.T_AXIS] or indexlimits[pyferret.T_AXIS]:
-                            raise KeyError('two time slices given')
-                        starttime = pyferret.FerAxis._makedatestring(start)
-                        stoptime = pyferret.FerAxis._makedatestring(stop)
-                        coordlimits[pyferret.T_AXIS] = '%s:%s' % (starttime, stoptime)
-                        changed = True
-                    elif isinstance(start,int) and isinstance(stop,int):
-                        if coordlimits[k] or indexlimits[k]:
-                            raise KeyError('two slices for axis index %d given' % k)
-                        # do not know the axis length at this time
-                        if (start < 0) or (stop < 0):
-                            raise KeyError('negative indices not supported at this time')
-                        # Ferret indices start at 1
-                        start += 1
-                        stop += 1
-                        indexlimits[k] = '%d:%d' % (start, stop)
-                        changed = True
-                    elif isinstance(start,numbers.Real) and isinstance(stop,numbers.Real):
-                        if coordlimits[k] or indexlimits[k]:
-                            raise KeyError('two slices for axis index %d given' % k)
-                        coordlimits[k] = '%s:%s' % (str(start), str(stop))
-                        changed = True
-                    elif (start is None) and (stop is None):
-                        # full range on this axis 
-                        if coordlimits[k] or indexlimits[k]:
-                            raise KeyError('two slices for axis index %d given' % k)
-                        continue
-                    else:
-                        raise KeyError('%s in not valid' % str(piece))
-                else:
-                    try:
-                        (axtype, val) = pyferret.FerAxis._parsegeoval(piece)
-                    except Exception as ex:
-                        raise KeyError('%s is not valid: %s' % (str(piece), str(ex)))
-                    if axtype == pyferret.AXISTYPE_LONGITUDE:
-                        if coordlimits[pyferret.X_AXIS] or indexlimits[pyferret.X_AXIS]:
-                            raise KeyError('two longitude slices given')
-                        coordlimits[pyferret.X_AXIS] = '%s' % str(val)
-                        changed = True
-                    elif axtype == pyferret.AXISTYPE_LATITUDE:
-                        if coordlimits[pyferret.Y_AXIS] or indexlimits[pyferret.Y_AXIS]:
-                            raise KeyError('two latitude slices given')
-                        coordlimits[pyferret.Y_AXIS] = '%s' % str(val)
-                        changed = True
-                    elif axtype == pyferret.AXISTYPE_LEVEL:
-                        if coordlimits[pyferret.Z_AXIS] or indexlimits[pyferret.Z_AXIS]:
-                            raise KeyError('two level slices given')
-                        coordlimits[pyferret.Z_AXIS] = '%s' % str(val)
-                        changed = True
-                    elif axtype == pyferret.AXISTYPE_TIME:
-                        if coordlimits[pyferret.T_AXIS] or indexlimits[pyferret.T_AXIS]:
-                            raise KeyError('two time slices given')
-                        coordlimits[pyferret.T_AXIS] = pyferret.FerAxis._makedatestring(val)
-                        changed = True
-                    elif isinstance(val,int):
-                        if coordlimits[k] or indexlimits[k]:
-                            raise KeyError('two slices for axis index %d given' % k)
-                        # do not know the axis length at this time
-                        if val < 0: 
-                            raise KeyError('negative indices not supported at this time')
-                        # Ferret indices start at 1
-                        val += 1
-                        indexlimits[k] = '%d' % val
-                        changed = True
-                    elif isinstance(val,numbers.Real):
-                        if coordlimits[k] or indexlimits[k]:
-                            raise KeyError('two slices for axis index %d given' % k)
-                        coordlimits[k] = '%s' % str(val)
-                        changed = True
-                    else:
-                        raise KeyError('%s in not valid' % str(piece))
-        elif isinstance(key, slice):
-            try:
-                (axtype, start, stop, step) = pyferret.FerAxis._parsegeoslice(key)
-            except Exception as ex:
-                raise KeyError('%s is not valid: %s' % (str(key), str(ex)))
-            if step is not None:
-                raise KeyError('step values in slices are not supported at this time')
-            if axtype == pyferret.AXISTYPE_LONGITUDE:
-                coordlimits[pyferret.X_AXIS] = '%s:%s' % (str(start), str(stop))
-                changed = True
-            elif axtype == pyferret.AXISTYPE_LATITUDE:
-                coordlimits[pyferret.Y_AXIS] = '%s:%s' % (str(start), str(stop))
-                changed = True
-            elif axtype == pyferret.AXISTYPE_LEVEL:
-                coordlimits[pyferret.Z_AXIS] = '%s:%s' % (str(start), str(stop))
-                changed = True
-            elif axtype == pyferret.AXISTYPE_TIME:
-                starttime = pyferret.FerAxis._makedatestring(start)
-                stoptime = pyferret.FerAxis._makedatestring(stop)
-                coordlimits[pyferret.T_AXIS] = '%s:%s' % (starttime, stoptime)
-                changed = True
-            elif isinstance(start,int) and isinstance(stop,int):
-                # do not know the axis length at this time
-                if (start < 0) or (stop < 0):
-                    raise KeyError('negative indices not supported at this time')
-                # Ferret indices start at 1
-                start += 1
-                stop += 1
-                indexlimits[0] = '%d:%d' % (start, stop)
-                changed = True
-            elif isinstance(start,numbers.Real) and isinstance(stop,numbers.Real):
-                coordlimits[0] = '%s:%s' % (str(start), str(stop))
-                changed = True
-            elif (start is None) and (stop is None):
-                # full range - standard way of generating a duplicate
-                pass
-            else:
-                raise KeyError('%s in not valid' % str(key))
-        else:
-            try:
-                (axtype, val) = pyferret.FerAxis._parsegeoval(key)
-            except Exception as ex:
-                raise KeyError('%s is not valid: %s' % (str(key), str(ex)))
-            if axtype == pyferret.AXISTYPE_LONGITUDE:
-                coordlimits[pyferret.X_AXIS] = '%s' % str(val)
-                changed = True
-            elif axtype == pyferret.AXISTYPE_LATITUDE:
-                coordlimits[pyferret.Y_AXIS] = '%s' % str(val)
-                changed = True
-            elif axtype == pyferret.AXISTYPE_LEVEL:
-                coordlimits[pyferret.Z_AXIS] = '%s' % str(val)
-                changed = True
-            elif axtype == pyferret.AXISTYPE_TIME:
-                coordlimits[pyferret.T_AXIS] = pyferret.FerAxis._makedatestring(val)
-                changed = True
-            elif isinstance(val,int):
-                # do not know the axis length at this time
-                if val < 0: 
-                    raise KeyError('negative indices not supported at this time')
-                # Ferret indices start at 1
-                val += 1
-                indexlimits[k] = '%d' % val
-                changed = True
-            elif isinstance(start,numbers.Real):
-                coordlimits[k] = '%s' % str(val)
-                changed = True
-            else:
-                raise KeyError('%s in not valid' % str(key))
-        if not changed:
+        limits = _parsesubsetkey(key)
+        if not any(limits):
             # the whole thing - definition is just this variable
             newvar = FerVar(defn=self.fername())
             newvar._requires.update(self._requires)
@@ -761,30 +573,10 @@ class FerVar(object):
             newdef = '%s[d=%s,' % (self._varname, self._dsetname)
         else:
             newdef = '%s[' % self._varname
-        if coordlimits[pyferret.X_AXIS]:
-            newdef += 'X=%s,' % coordlimits[pyferret.X_AXIS]
-        if indexlimits[pyferret.X_AXIS]:
-            newdef += 'I=%s,' % indexlimits[pyferret.X_AXIS]
-        if coordlimits[pyferret.Y_AXIS]:
-            newdef += 'Y=%s,' % coordlimits[pyferret.Y_AXIS]
-        if indexlimits[pyferret.Y_AXIS]:
-            newdef += 'J=%s,' % indexlimits[pyferret.Y_AXIS]
-        if coordlimits[pyferret.Z_AXIS]:
-            newdef += 'Z=%s,' % coordlimits[pyferret.Z_AXIS]
-        if indexlimits[pyferret.Z_AXIS]:
-            newdef += 'K=%s,' % indexlimits[pyferret.Z_AXIS]
-        if coordlimits[pyferret.T_AXIS]:
-            newdef += 'T=%s,' % coordlimits[pyferret.T_AXIS]
-        if indexlimits[pyferret.T_AXIS]:
-            newdef += 'L=%s,' % indexlimits[pyferret.T_AXIS]
-        if coordlimits[pyferret.E_AXIS]:
-            newdef += 'E=%s,' % coordlimits[pyferret.E_AXIS]
-        if indexlimits[pyferret.E_AXIS]:
-            newdef += 'M=%s,' % indexlimits[pyferret.E_AXIS]
-        if coordlimits[pyferret.F_AXIS]:
-            newdef += 'F=%s,' % coordlimits[pyferret.F_AXIS]
-        if indexlimits[pyferret.F_AXIS]:
-            newdef += 'N=%s,' % indexlimits[pyferret.F_AXIS]
+        axisinfo = { }
+        for axis in range(pyferret.MAX_FERRET_NDIM):
+            if limits[axis]:
+                newdef += self._subsetqualifier(axis, limits[axis], axisinfo) + ','
         # replace the final , with ]
         newdef = newdef[:-1] + ']'
         newvar = FerVar(defn=newdef)
@@ -792,6 +584,76 @@ class FerVar(object):
         return newvar
 
 
+    def _subsetqualifier(self, axis, limit, axisinfo):
+        '''
+        Returns the Ferret qualifier string, such as 'X=10E:50E' or 'L=1:120:4', 
+        for the parsed subset limit (as created by _parsesubsetkey) along axis.  
+        Missing slice limits are obtained, and time steps are converted, using 
+        the axis of this variable, retrieved from Ferret (and saved in the dict 
+        axisinfo to be reused by other calls for this same subset).
+        Raises a KeyError if a problem occurs.
+        '''
+        (isindex, single, start, stop, step, stepsecs) = limit
+        if isindex:
+            letter = _INDEX_LETTERS[axis]
+        else:
+            letter = _COORD_LETTERS[axis]
+        if single:
+            return '%s=%s' % (letter, start)
+        if (start is None) or (stop is None):
+            # get the full range of indices or coordinates of the axis
+            values = self._subsetaxisvalues(letter, axisinfo)[0]
+            if start is None:
+                if isindex:
+                    start = '%d' % int(values[0])
+                else:
+                    start = str(values[0])
+            if stop is None:
+                if isindex:
+                    stop = '%d' % int(values[-1])
+                else:
+                    stop = str(values[-1])
+        if stepsecs is not None:
+            # convert the time step to the units of the time axis
+            (values, coords, calendar) = self._subsetaxisvalues(letter, axisinfo)
+            unitsecs = _timeunitseconds(values, coords, calendar)
+            if unitsecs is None:
+                raise KeyError('unable to determine the units of the time axis for a time step')
+            step = str(stepsecs / unitsecs)
+        if step is None:
+            return '%s=%s:%s' % (letter, start, stop)
+        return '%s=%s:%s:%s' % (letter, start, stop, step)
+
+
+    def _subsetaxisvalues(self, letter, axisinfo):
+        '''
+        Returns the tuple (values, coords, unit) of the values of the Ferret pseudo-variable
+        given by letter (such as 'I' or 'X') on the grid of this variable, the coordinates
+        of the axis of those values (time 6-tuples for time axes), and the unit of the axis
+        (the CALTYPE_ calendar name for time axes).
+        The tuple is saved in the dict axisinfo, keyed by letter, for reuse.
+        Raises a KeyError if a problem occurs.
+        '''
+        try:
+            return axisinfo[letter]
+        except KeyError:
+            pass
+        axis = (_INDEX_LETTERS + _COORD_LETTERS).index(letter) % pyferret.MAX_FERRET_NDIM
+        try:
+            if self._dsetname:
+                gridqual = 'G=%s,D=%s' % (self._varname, self._dsetname)
+            else:
+                gridqual = 'G=%s' % self._varname
+            datadict = pyferret.getdata('%s[%s]' % (letter, gridqual), False)
+        except Exception as ex:
+            raise KeyError('unable to obtain the %s axis values: %s' % (_COORD_LETTERS[axis], str(ex)))
+        values = datadict['data'].reshape(-1)
+        if len(values) < 1:
+            raise KeyError('no %s axis values' % _COORD_LETTERS[axis])
+        axisinfo[letter] = (values, datadict['axis_coords'][axis], datadict['axis_units'][axis])
+        return axisinfo[letter]
+
+
     def __getattr__(self, name):
         '''
         Return the data array (if name='data'), data grid (if name='grid'), 
@@ -817,9 +679,11 @@ class FerVar(object):
         return mydir
 
 
-    def _markasknownvar(self, varname, dsetname, isfilevar):
+    def _markasknownvar(self, varname, dsetname, isfilevar, depends=()):
         '''
         Marks this variable as a variable already defined in Ferret.
+            depends (iterable of string): uppercase names of the Ferret 
+                variables used in the definition of this variable
         '''
         if not varname:
             raise ValueError('varname is not given')
@@ -834,7 +698,10 @@ class FerVar(object):
             self._dsetname = ''
         self._isfilevar = bool(isfilevar)
         self._definition = self.fername()
+        self._operation = ''
+        self._operands = ()
         self._requires.add(varname.upper())
+        _bumpversion(varname, depends)
         self.unload()
 
 
@@ -862,8 +729,13 @@ class FerVar(object):
         (errval, errmsg) = pyferret.run(cmdstr)
         if errval != pyferret.FERR_OK:
             raise ValueError('problems defining %s (%s) in Ferret: %s' % (varname, cmdstr, errmsg))
+        # Record all possible Ferret variables used in the definition, since 
+        # _requires may be incomplete, so FerVars using this variable can 
+        # tell when their data is out of date
+        depends = set(self._requires)
+        depends.update( _definitionnames(self._definition) )
         # Revise the fields in this FerVar to reflect this assignment
-        self._markasknownvar(varname, dsetname, False)
+        self._markasknownvar(varname, dsetname, False, depends)
 
 
     def _removefromferret(self):
@@ -884,6 +756,7 @@ class FerVar(object):
         (errval, errmsg) = pyferret.run(cmdstr)
         if errval != pyferret.FERR_OK:
             raise ValueError('unable to remove variable %s from Ferret: %s' % (fername, errmsg))
+        _bumpversion(self._varname)
         self._varname = ''
         self.unload()
 
@@ -892,27 +765,50 @@ class FerVar(object):
         '''
         Clears the grid and data stored in this FerVar.  After this call, any 
         request for the grid or data will automatically load the latest values 
-        from Ferret.  This method should be called anytime there is a change 
-        in the definition of this variable, or a variable this variable uses.
+        from Ferret.  Changes in the definition of this variable, or of a 
+        variable this variable uses, made through FerVar or FerDSet objects 
+        are detected and the data reloaded automatically when next requested; 
+        this method only needs to be called after such changes made directly 
+        with Ferret commands.
         '''
         self._datagrid = None
         self._dataarray = None
         self._dataunit = ''
         self._missingvalue = None
+        self._loadversions = None
+        self._loadnumber = 0
+
+
+    def _needsload(self):
+        '''
+        Returns True if the grid and data of this FerVar need to be loaded; 
+        that is, if they have not been loaded, or if the definition of this 
+        variable, or of a variable this variable uses, has changed since they 
+        were loaded.  Only the Ferret variables used by this variable are 
+        checked, and only when some Ferret variable has changed since the 
+        last check.
+        '''
+        if (self._datagrid is None) or (self._dataarray is None):
+            return True
+        if (self._loadversions is None) or (self._loadnumber == _VERSION_NUMBER):
+            return False
+        if _dependversions(self._requires) != self._loadversions:
+            return True
+        self._loadnumber = _VERSION_NUMBER
+        return False
 
 
     def load(self):
         '''
         Retrieves the grid and data for this Ferret variable from Ferret.
         This method is automatically called before returning the grid or data 
-        for the first time for this variable.  This can be called to update
-        the grid or data in this FerVar after any change in the definition 
-        of the variable.  Alternatively, cleardata can be called to clear any
-        stored grid and data, delaying the update from Ferret until the grid
-        or data is requested.
+        for the first time for this variable, or for the first time after a 
+        change in the definition of this variable, or of a variable this 
+        variable uses, made through FerVar or FerDSet objects.
         Raises a ValueEror if problems occur.
         '''
         fername = self.fername()
+        loadversions = _dependversions(self._requires)
         datadict = pyferret.getdata(fername, False)
         feraxes = [ ]
         for (axistype,axcoords,axunit,axname) in zip(
@@ -924,17 +820,53 @@ class FerVar(object):
         self._dataarray = datadict["data"]
         self._dataunit = datadict["data_unit"]
         self._missingvalue = datadict["missing_value"]
+        self._loadversions = loadversions
+        self._loadnumber = _VERSION_NUMBER
 
 
-    def getdata(self):
+    def getdata(self, view=False, dtype=numpy.float64):
         '''
         Returns a copy of the data array for this Ferret variable,
         first loading this variable if necessary.
+            view (bool): if True, instead return a read-only view of 
+                the data in Ferret's memory without loading or copying 
+                the data.  Ferret does not free this memory while the 
+                view exists; if this variable (or a variable it uses) is 
+                canceled or redefined, the view keeps its original values.
+            dtype (numpy.float64 or numpy.float32): type of the returned 
+                data array.  If float32 and the data for this variable has 
+                not been loaded, the float32 data is retrieved directly from 
+                Ferret without loading the float64 data (a view is not 
+                possible for float32 data).
         Raises a ValueError is a problem occurs.
         '''
-        if (self._datagrid is None) or (self._dataarray is None):
+        single = (pyferret.datamethods._floatdtype(dtype) == numpy.float32)
+        if single and self._needsload():
+            datadict = pyferret.getdata(self.fername(), False, dtype=numpy.float32)
+            return datadict["data"]
+        if view and not single:
+            datadict = pyferret.getdata(self.fername(), False, copy=False)
+            return datadict["data"]
+        if self._needsload():
             self.load()
-        return self._dataarray.copy('A')
+        return self._dataarray.astype(dtype, order='A', copy=True)
+
+
+    def iterchunks(self, axis='T', size=1):
+        '''
+        Generator returning the data of this Ferret variable in chunks
+        along one axis without loading the full variable, so variables
+        larger than Ferret's memory can be processed a piece at a time.
+        The data stored in this FerVar, if any, is not used or changed.
+            axis (string or int): the axis to iterate over; one of 'X',
+                'Y', 'Z', 'T', 'E', 'F', or pyferret.X_AXIS, etc.
+            size (int): the (maximum) number of points along axis
+                in each chunk
+        Yields (coords, data) tuples, where coords is the ndarray of
+        coordinates along axis and data is the data array of the chunk.
+        Raises a ValueError is a problem occurs.
+        '''
+        return pyferret.iterdata(self.fername(), axis=axis, size=size, create_mask=False)
 
 
     def getgrid(self):
@@ -943,7 +875,7 @@ class FerVar(object):
         first loading this variable if necessary.
         Raises a ValueError is a problem occurs.
         '''
-        if (self._datagrid is None) or (self._dataarray is None):
+        if self._needsload():
             self.load()
         return self._datagrid.copy()
 
@@ -954,7 +886,7 @@ class FerVar(object):
         variable, first loading this variable if necessary.  
         Raises a ValueError is a problem occurs.
         '''
-        if (self._datagrid is None) or (self._dataarray is None):
+        if self._needsload():
             self.load()
         # The missing value is a single-element ndarray
         return self._missingvalue[0]
@@ -966,7 +898,7 @@ class FerVar(object):
         variable, first loading this variable if necessary.
         Raises a ValueError is a problem occurs.
         '''
-        if (self._datagrid is None) or (self._dataarray is None):
+        if self._needsload():
             self.load()
         return self._dataunit
 
@@ -1036,3 +968,395 @@ class FerVar(object):
         newvar._requires.update(self._requires)
         return newvar
 
+
+def evaluate(fervars, dtype=numpy.float64):
+    '''
+    Returns a list of the data arrays of the given FerVars, evaluated 
+    together so subexpressions common to these variables need only be 
+    computed once.  Each subexpression (from FerVar arithmetic) that occurs 
+    more than once among the given FerVars is defined once in Ferret as 
+    a temporary variable, and the given FerVars are redefined in terms 
+    of these temporary variables.  The data arrays are still retrieved 
+    from Ferret one variable at a time, so the result of a shared 
+    subexpression is only reused for later variables while it remains 
+    in Ferret's memory cache; otherwise Ferret recomputes it.  The 
+    temporary variables are given names not used by any 
+    user-defined Ferret variable or in any of the expressions, and 
+    are removed before returning.
+        fervars (sequence of FerVar): variables to evaluate; each must 
+            be assigned in Ferret or be an anonymous FerVar (such as the 
+            result of FerVar arithmetic) with a definition
+        dtype (numpy.float64 or numpy.float32): type of the data arrays
+    Raises a ValueError if a problem occurs.
+    '''
+    if isinstance(fervars, FerVar):
+        raise ValueError('fervars must be a sequence of FerVar')
+    fervars = list(fervars)
+    for var in fervars:
+        if not isinstance(var, FerVar):
+            raise ValueError('fervars must be a sequence of FerVar')
+        if not var._definition:
+            raise ValueError('FerVar %s does not contain a definition' % repr(var))
+    # Walk the expression DAG (without recursion, since long chains of 
+    # arithmetic give deep DAGs) to get the distinct subexpressions, keyed 
+    # by definition, in an order where operands precede operations, and 
+    # count the number of places each subexpression is used.
+    exprvars = { }
+    exprorder = [ ]
+    numuses = { }
+    for var in fervars:
+        numuses[var._definition] = numuses.get(var._definition, 0) + 1
+    pending = [ (var, False) for var in reversed(fervars) ]
+    while pending:
+        (var, expanded) = pending.pop()
+        if expanded:
+            exprorder.append(var._definition)
+            continue
+        if var._definition in exprvars:
+            continue
+        exprvars[var._definition] = var
+        pending.append((var, True))
+        for operand in reversed(var._operands):
+            numuses[operand._definition] = numuses.get(operand._definition, 0) + 1
+            if not operand._definition in exprvars:
+                pending.append((operand, False))
+    # Build the Ferret expression for each subexpression, defining 
+    # the shared subexpressions as temporary variables in Ferret
+    exprstrs = { }
+    tempnames = [ ]
+    usednames = None
+    try:
+        for defn in exprorder:
+            var = exprvars[defn]
+            if var._operands:
+                exprstr = var._operation % \
+                          tuple([ exprstrs[operand._definition] for operand in var._operands ])
+            else:
+                exprstr = defn
+            if (numuses[defn] > 1) and not var._varname:
+                if usednames is None:
+                    usednames = _usernames()
+                    for exprdefn in exprorder:
+                        usednames.update(_definitionnames(exprdefn))
+                tempnum = len(tempnames) + 1
+                tempname = 'PYFEV_%d' % tempnum
+                while tempname in usednames:
+                    tempnum += 1
+                    tempname = 'PYFEV_%d' % tempnum
+                cmdstr = 'DEFINE VAR %s = %s' % (tempname, exprstr)
+                (errval, errmsg) = pyferret.run(cmdstr)
+                if errval != pyferret.FERR_OK:
+                    raise ValueError('problems defining %s (%s) in Ferret: %s' % (tempname, cmdstr, errmsg))
+                tempnames.append(tempname)
+                usednames.add(tempname)
+                exprstr = tempname
+            exprstrs[defn] = exprstr
+        results = [ ]
+        for var in fervars:
+            datadict = pyferret.getdata(exprstrs[var._definition], False, dtype=dtype)
+            results.append(datadict["data"])
+    finally:
+        # Remove the temporary variables (only those defined here), 
+        # most recent first, ignoring errors
+        for tempname in reversed(tempnames):
+            pyferret.run('CANCEL VAR %s' % tempname)
+    return results
+
+
+def _usernames():
+    '''
+    Returns a set of uppercase words from the Ferret SHOW VAR/USER report, 
+    which includes the names of all user-defined variables in Ferret.
+    Raises a ValueError if a problem occurs.
+    '''
+    showfile = tempfile.NamedTemporaryFile(mode='w', delete=False, 
+                                           prefix='pyfev_', suffix='_vars.txt')
+    showfilename = showfile.name
+    showfile.close()
+    try:
+        cmdstr = 'SHOW VAR/USER/OUTFILE="%s"/CLOBBER' % showfilename
+        (errval, errmsg) = pyferret.run(cmdstr)
+        if errval != pyferret.FERR_OK:
+            raise ValueError('problems listing the Ferret variables: %s' % errmsg)
+        with open(showfilename, 'r') as showfile:
+            report = showfile.read()
+    finally:
+        os.unlink(showfilename)
+    return set( [ name.upper() for name in _DEFN_NAME_REGEX.findall(report) ] )
+
+
+def _bumpversion(varname, depends=()):
+    '''
+    Records that the Ferret variable varname has been defined, redefined, 
+    or removed, using the Ferret variables whose (uppercase) names are given 
+    in depends, so any FerVar using this variable will reload its data.
+    '''
+    global _VERSION_NUMBER
+    _VERSION_NUMBER += 1
+    uppername = varname.upper()
+    _VAR_VERSIONS[uppername] = _VERSION_NUMBER
+    _VAR_DEPENDS[uppername] = frozenset(depends).difference((uppername,))
+
+
+def _dependversions(names):
+    '''
+    Returns a dictionary of the current versions of the Ferret variables 
+    with the given uppercase names, and of all the Ferret variables they 
+    use (directly or indirectly), keyed by uppercase name.
+    '''
+    versions = { }
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in versions:
+            continue
+        versions[name] = _VAR_VERSIONS.get(name, 0)
+        pending.extend(_VAR_DEPENDS.get(name, ()))
+    return versions
+
+
+def _definitionnames(defn):
+    '''
+    Returns the set of uppercase words in the Ferret definition defn that 
+    could be Ferret variable names.  This includes function names, axis 
+    letters, etc., which only means a change to a Ferret variable with one 
+    of these names will also (unnecessarily) cause a reload.
+    '''
+    return set( [ name.upper() for name in _DEFN_NAME_REGEX.findall(defn) ] )
+
+
+def _operationvar(operation, operands):
+    '''
+    Returns an anonymous FerVar for an operation on FerVars.
+        operation (string): Ferret expression for the operation with 
+            a %s for each operand, such as '(%s) + (%s)'; any numbers 
+            are already part of this string
+        operands (tuple of FerVar): the operands of the operation
+    '''
+    newdef = operation % tuple([ operand._definition for operand in operands ])
+    newvar = FerVar(defn=newdef)
+    for operand in operands:
+        newvar._requires.update(operand._requires)
+    newvar._operation = operation
+    newvar._operands = tuple(operands)
+    return newvar
+
+
+def _subsetcachekey(key):
+    '''
+    Returns a hashable representation of the subset key (as given to 
+    FerVar.__getitem__) for use in _SUBSET_CACHE, or None if key cannot 
+    be cached.  The type of each value is included since, for example, 
+    5 (an index) and 5.0 (a coordinate) are interpreted differently.
+    '''
+    def itemkey(item):
+        if isinstance(item, slice):
+            return (slice, itemkey(item.start), itemkey(item.stop), itemkey(item.step))
+        return (type(item), item)
+    try:
+        if isinstance(key, tuple):
+            cachekey = tuple( [ itemkey(piece) for piece in key ] )
+        else:
+            cachekey = itemkey(key)
+        hash(cachekey)
+    except TypeError:
+        return None
+    return cachekey
+
+
+def _parsesubsetkey(key):
+    '''
+    Parses the subset key (as given to FerVar.__getitem__) and returns a tuple, 
+    ordered by axis number, of the limits for each axis.  Each item is None if 
+    there are no limits on that axis; otherwise it is the tuple
+        (isindex, single, start, stop, step, stepsecs)
+    where isindex is True for index limits and False for coordinate limits, 
+    single is True for a single value (given in start), start, stop and step 
+    are strings for Ferret (start or stop is None if not given), and stepsecs 
+    is the number of seconds in a time step (to be converted to time axis 
+    units), or None.  The results are kept in _SUBSET_CACHE.
+    Raises a KeyError if key is not valid.
+    '''
+    cachekey = _subsetcachekey(key)
+    if cachekey is not None:
+        try:
+            limits = _SUBSET_CACHE.pop(cachekey)
+            # put back as the most recently used
+            _SUBSET_CACHE[cachekey] = limits
+            return limits
+        except KeyError:
+            pass
+    limits = [ None ] * pyferret.MAX_FERRET_NDIM
+    if isinstance(key, tuple):
+        pieces = key
+    else:
+        pieces = (key,)
+    for k in range(len(pieces)):
+        if pieces[k] is None:
+            continue
+        parsed = _parsesubsetpiece(pieces[k], k)
+        if parsed is None:
+            continue
+        (axis, limit, descript) = parsed
+        if limits[axis] is not None:
+            raise KeyError('two %s given' % descript)
+        limits[axis] = limit
+    limits = tuple(limits)
+    if cachekey is not None:
+        _SUBSET_CACHE[cachekey] = limits
+        if len(_SUBSET_CACHE) > _SUBSET_CACHE_SIZE:
+            _SUBSET_CACHE.popitem(last=False)
+    return limits
+
+
+def _parsesubsetpiece(piece, k):
+    '''
+    Parses a single item, at position k in the subset key tuple, of a subset key.
+    Returns None if piece is a full-range slice of an axis; otherwise returns the 
+    tuple (axis, limit, descript) where axis is the axis number, limit is the tuple 
+    described in _parsesubsetkey, and descript describes the axis for messages.
+    Raises a KeyError if piece is not valid.
+    '''
+    if isinstance(piece, slice):
+        try:
+            (axtype, start, stop, step) = pyferret.FerAxis._parsegeoslice(piece)
+        except Exception as ex:
+            raise KeyError('%s is not valid: %s' % (str(piece), str(ex)))
+        single = False
+    else:
+        try:
+            (axtype, start) = pyferret.FerAxis._parsegeoval(piece)
+        except Exception as ex:
+            raise KeyError('%s is not valid: %s' % (str(piece), str(ex)))
+        stop = None
+        step = None
+        single = True
+    stepsecs = None
+    if axtype == pyferret.AXISTYPE_LONGITUDE:
+        (axis, isindex, descript) = (pyferret.X_AXIS, False, 'longitude slices')
+    elif axtype == pyferret.AXISTYPE_LATITUDE:
+        (axis, isindex, descript) = (pyferret.Y_AXIS, False, 'latitude slices')
+    elif axtype == pyferret.AXISTYPE_LEVEL:
+        (axis, isindex, descript) = (pyferret.Z_AXIS, False, 'level slices')
+    elif axtype == pyferret.AXISTYPE_TIME:
+        (axis, isindex, descript) = (pyferret.T_AXIS, False, 'time slices')
+        start = pyferret.FerAxis._makedatestring(start)
+        if stop is not None:
+            stop = pyferret.FerAxis._makedatestring(stop)
+        if step is not None:
+            stepsecs = _timestepseconds(step)
+            if stepsecs <= 0:
+                raise KeyError('%s is not valid: step values must be positive' % str(piece))
+            step = None
+    else:
+        if (start is None) and (stop is None) and (step is None):
+            # full range on this axis 
+            return None
+        if k >= pyferret.MAX_FERRET_NDIM:
+            raise KeyError('%s is not valid: too many axes' % str(piece))
+        (axis, descript) = (k, 'slices for axis index %d' % k)
+        values = [ val for val in (start, stop, step) if val is not None ]
+        isindex = True
+        for val in values:
+            if not isinstance(val, numbers.Real):
+                raise KeyError('%s in not valid' % str(piece))
+            if not isinstance(val, int):
+                isindex = False
+        if isindex:
+            if ((start is not None) and (start < 0)) or ((stop is not None) and (stop < 0)):
+                raise KeyError('negative indices not supported at this time')
+            # Ferret indices start at 1
+            if start is not None:
+                start = '%d' % (start + 1)
+            if stop is not None:
+                stop = '%d' % (stop + 1)
+            if step is not None:
+                step = '%d' % step
+    if not isindex:
+        if start is not None:
+            start = str(start)
+        if stop is not None:
+            stop = str(stop)
+    if (step is not None) and (not isindex):
+        # remove any unit from the step; Ferret expects a number in axis units
+        try:
+            if isinstance(step, str):
+                step = float(step[:-1])
+            step = float(step)
+        except ValueError:
+            raise KeyError('%s is not valid: invalid step value' % str(piece))
+        if step <= 0:
+            raise KeyError('%s is not valid: step values must be positive' % str(piece))
+        step = str(step)
+    elif (step is not None) and (int(step) <= 0):
+        raise KeyError('%s is not valid: step values must be positive' % str(piece))
+    return (axis, (isindex, single, start, stop, step, stepsecs), descript)
+
+
+def _timestepseconds(tlist):
+    '''
+    Returns the number of seconds of a time step given as a list of six 
+    numbers ordered by the TIMEARRAY indices (as from FerAxis._parsegeoval 
+    with istimestep=True), where a year is 365.2425 days.
+    '''
+    return tlist[pyferret.TIMEARRAY_YEARINDEX] * _TIME_UNIT_SECONDS[-1] + \
+           tlist[pyferret.TIMEARRAY_DAYINDEX] * 86400.0 + \
+           tlist[pyferret.TIMEARRAY_HOURINDEX] * 3600.0 + \
+           tlist[pyferret.TIMEARRAY_MINUTEINDEX] * 60.0 + \
+           tlist[pyferret.TIMEARRAY_SECONDINDEX]
+
+
+def _calendardays(coord, calendar):
+    '''
+    Returns the number of days, including the fraction of the day, from an 
+    arbitrary fixed date to the time coord (a 6-tuple of integers ordered by 
+    the TIMEARRAY indices) in the given CALTYPE_ calendar.  Gregorian dates 
+    before 15 October 1582 are taken to be Julian dates, as in Ferret.
+    '''
+    year = int(coord[pyferret.TIMEARRAY_YEARINDEX])
+    month = int(coord[pyferret.TIMEARRAY_MONTHINDEX])
+    day = int(coord[pyferret.TIMEARRAY_DAYINDEX])
+    if not (1 <= month <= 12):
+        raise ValueError('invalid month %d' % month)
+    dayfrac = (int(coord[pyferret.TIMEARRAY_HOURINDEX]) * 3600.0 + 
+               int(coord[pyferret.TIMEARRAY_MINUTEINDEX]) * 60.0 + 
+               int(coord[pyferret.TIMEARRAY_SECONDINDEX])) / 86400.0
+    if calendar == pyferret.CALTYPE_360DAY:
+        days = year * 360 + (month - 1) * 30 + day
+    elif calendar == pyferret.CALTYPE_NOLEAP:
+        days = year * 365 + _DAYS_BEFORE_MONTH[month - 1] + day
+    elif calendar == pyferret.CALTYPE_ALLLEAP:
+        days = year * 366 + _LEAP_DAYS_BEFORE_MONTH[month - 1] + day
+    else:
+        # Julian day number, from the Julian or the Gregorian calendar
+        shift = (14 - month) // 12
+        shiftyear = year + 4800 - shift
+        shiftmonth = month + 12 * shift - 3
+        days = day + (153 * shiftmonth + 2) // 5 + 365 * shiftyear + shiftyear // 4
+        if (calendar == pyferret.CALTYPE_JULIAN) or ((year, month, day) < (1582, 10, 15)):
+            days -= 32083
+        else:
+            days += shiftyear // 400 - shiftyear // 100 - 32045
+    return days + dayfrac
+
+
+def _timeunitseconds(values, coords, calendar):
+    '''
+    Returns the number of seconds in the unit of a time axis, determined from 
+    the first two time values (in axis units) and their coordinates (as 6-tuples 
+    of integers ordered by the TIMEARRAY indices) in the given CALTYPE_ calendar, 
+    and rounded to the nearest of Ferret's time units.  Returns None if this 
+    cannot be determined.
+    '''
+    if (len(values) < 2) or (coords is None) or (len(coords) < 2):
+        return None
+    try:
+        days = _calendardays(coords[1], calendar) - _calendardays(coords[0], calendar)
+    except (ValueError, TypeError, IndexError):
+        return None
+    seconds = days * 86400.0
+    units = float(values[1] - values[0])
+    if (seconds <= 0.0) or (units <= 0.0):
+        return None
+    ratio = seconds / units
+    return min(_TIME_UNIT_SECONDS, key=lambda unitsecs: abs(math.log(ratio / unitsecs)))
@@ -38,6 +38,7 @@
 #include <numpy/arrayobject.h>
 
 #include <ctype.h>
+#include <math.h>
 #include <signal.h>
 #include <stdio.h>
 #include <stdlib.h>
@@ -661,6 +662,140 @@ static PyObject *pyferretRunCommand(PyObject *self, PyObject *args, PyObject *kw
 }
 
 
+/*
+ * Copies the values in the array of doubles src, described by the given shape
+ * and strides (in units of doubles), to the contiguous Fortran-ordered array
+ * dest.  If single is zero, dest is an array of doubles; otherwise dest is an
+ * array of floats and the values are converted as they are copied.  If dest
+ * is NULL, no values are copied.  Leading axes across which src is contiguous
+ * are merged into a single run of values.  Runs of doubles are copied using
+ * memcpy unless a mask is requested; other runs are copied value by value.
+ *
+ * If mask_ndarray is not NULL, the values are also compared to badval (or are
+ * checked for NaN if badval is NaN) as they are copied.  When the first missing
+ * value is found, *mask_ndarray is assigned a new Fortran-ordered NumPy boolean
+ * ndarray of the given shape, and the elements of this mask corresponding to
+ * missing values are set to True.  If there are no missing values, *mask_ndarray
+ * is left unchanged (NULL) so a full-sized all-False mask is never created.
+ *
+ * Returns zero if successful; returns -1, with a Python exception raised,
+ * if the mask could not be created.
+ * Note: if MAX_FERRET_NDIM changes, this may need editing.
+ */
+static int pyferretCopyStridedData(void *dest, int single, double *src,
+                                   npy_intp shape[MAX_FERRET_NDIM], npy_intp strides[MAX_FERRET_NDIM],
+                                   double badval, PyArrayObject **mask_ndarray)
+{
+    npy_intp  index[MAX_FERRET_NDIM];
+    npy_intp  runlen, numruns, r, i, outpos;
+    double   *srcrun;
+    double   *ddest;
+    float    *fdest;
+    npy_bool *mask;
+    double    val;
+    int       k, firstouter, badisnan;
+
+    for (k = 0; k < MAX_FERRET_NDIM; k++) {
+        if ( shape[k] < 1 )
+            return 0;
+    }
+
+    /* Find the length of the runs of values to be copied at one time */
+    runlen = shape[0];
+    firstouter = 1;
+    if ( strides[0] == 1 ) {
+        while ( firstouter < MAX_FERRET_NDIM ) {
+            if ( (shape[firstouter] > 1) && (strides[firstouter] != runlen) )
+                break;
+            runlen *= shape[firstouter];
+            firstouter++;
+        }
+    }
+
+    /* Loop over the remaining (outer) axes, copying a run for each */
+    numruns = 1;
+    for (k = firstouter; k < MAX_FERRET_NDIM; k++) {
+        numruns *= shape[k];
+        index[k] = 0;
+    }
+    ddest = (double *) dest;
+    fdest = (float *) dest;
+    mask = NULL;
+    badisnan = isnan(badval);
+    srcrun = src;
+    outpos = 0;
+    for (r = 0; r < numruns; r++) {
+        if ( mask_ndarray != NULL ) {
+            /* Copy and check each value in a single pass */
+            for (i = 0; i < runlen; i++) {
+                val = srcrun[i * strides[0]];
+                if ( dest != NULL ) {
+                    if ( single )
+                        fdest[outpos + i] = (float) val;
+                    else
+                        ddest[outpos + i] = val;
+                }
+                if ( (val == badval) || (badisnan && isnan(val)) ) {
+                    if ( mask == NULL ) {
+                        *mask_ndarray = (PyArrayObject *) PyArray_ZEROS(MAX_FERRET_NDIM, shape, NPY_BOOL, 1);
+                        if ( *mask_ndarray == NULL )
+                            return -1;
+                        mask = (npy_bool *) PyArray_DATA(*mask_ndarray);
+                    }
+                    mask[outpos + i] = NPY_TRUE;
+                }
+            }
+        }
+        else if ( dest == NULL ) {
+            /* Nothing to do */
+            ;
+        }
+        else if ( single ) {
+            for (i = 0; i < runlen; i++)
+                fdest[outpos + i] = (float) srcrun[i * strides[0]];
+        }
+        else if ( strides[0] == 1 ) {
+            memcpy(&(ddest[outpos]), srcrun, (size_t) runlen * sizeof(double));
+        }
+        else {
+            for (i = 0; i < runlen; i++)
+                ddest[outpos + i] = srcrun[i * strides[0]];
+        }
+        outpos += runlen;
+        /* Advance to the start of the next run in src */
+        for (k = firstouter; k < MAX_FERRET_NDIM; k++) {
+            index[k]++;
+            srcrun += strides[k];
+            if ( index[k] < shape[k] )
+                break;
+            srcrun -= shape[k] * strides[k];
+            index[k] = 0;
+        }
+    }
+    return 0;
+}
+
+/* Name of the capsule attached as the base object of views of Ferret memory */
+static char pyferretDataViewHoldName[] = "pyferret.DataViewHold";
+
+/*
+ * Destructor for the capsule that is the base object of a view of Ferret memory.
+ * Releases the hold on the storage of the memory-resident variable; if Ferret
+ * has already freed that storage (for example, the variable was canceled),
+ * the storage is actually freed now.
+ */
+static void pyferretReleaseDataViewHold(PyObject *capsule)
+{
+    double *mvar;
+
+    mvar = (double *) PyCapsule_GetPointer(capsule, pyferretDataViewHoldName);
+    if ( mvar == NULL ) {
+        PyErr_Clear();
+        return;
+    }
+    release_dyn_mem(mvar);
+}
+
 static char pyferretGetDataDocstring[] =
     "Returns the numeric data array described in the argument. \n"
     "\n"
@@ -668,12 +803,21 @@ static char pyferretGetDataDocstring[] =
     "    name = <string>: the name of the numeric data array to return \n"
     "\n"
     "Optional arguments: \n"
-    "    (none) \n"
+    "    copy = <bool>: if True (default), return a copy of the data; \n"
+    "                   if False, return a read-only view of the data in Ferret's \n"
+    "                   memory.  That memory is not freed while the view exists, \n"
+    "                   even if Ferret cancels, redefines, or purges the variable; \n"
+    "                   the view then keeps the values it had when it was created. \n"
+    "    single = <bool>: if True, return a copy of the data converted to float32 \n"
+    "                     (regardless of the value of copy); if False (default), \n"
+    "                     return the data as float64 \n"
+    "    mask = <bool>: if True, also return a mask of the missing values, determined \n"
+    "                   while copying the data; if False (default), no mask is returned \n"
     "\n"
     "Returns: \n"
     "    A tuple containing: \n"
-    "        a NumPy float64 ndarray containing a copy of the numeric data requested, \n"
-    "        a NumPy float64 ndarray containing the bad-data-flag value for the data, \n"
+    "        a NumPy float64 (or float32) ndarray containing a copy (or view) of the numeric data requested, \n"
+    "        a NumPy float64 (or float32) ndarray containing the bad-data-flag value for the data, \n"
     "        a string giving the units for the data \n"
     "        a tuple of six integers giving the AXISTYPE codes of the axes, \n"
     "        a tuple of six strings giving the names of the axes, \n"
@@ -683,6 +827,8 @@ static char pyferretGetDataDocstring[] =
     "            (ndarray of N doubles for non-calendar-time, non-normal axes, \n"
     "             ndarray of (N,6) integers for calendar-time axes, or \n"
     "             None for normal axes) \n"
+    "        a NumPy boolean ndarray, in Fortran order, that is True where the data is missing; \n"
+    "            or None if mask is False or if none of the data is missing \n"
     "\n"
     "Raises: \n"
     "    ValueError if the data name is invalid \n"
@@ -690,8 +836,12 @@ static char pyferretGetDataDocstring[] =
 
 static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
 {
-    static char   *argNames[] = {"name", NULL};
+    static char   *argNames[] = {"name", "copy", "single", "mask", NULL};
     char          *name;
+    int            copydata = 1;
+    int            single = 0;
+    int            wantmask = 0;
+    int            npytype;
     int            lendataname;
     char           dataname[1024];
     double        *arraystart;
@@ -703,11 +853,15 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
     char           errmsg[2112];
     int            lenerrmsg;
     double         badval;
-    int            i, j, k, l, m, n, q;
+    double        *mvar;
+    int            j, k, q;
     npy_intp       shape[MAX_FERRET_NDIM];
     npy_intp       new_shape[2];
-    int            strides[MAX_FERRET_NDIM];
+    npy_intp       strides[MAX_FERRET_NDIM];
+    npy_intp       view_strides[MAX_FERRET_NDIM];
+    PyObject      *hold_capsule;
     PyArrayObject *data_ndarray;
+    PyArrayObject *mask_ndarray;
     double        *npydata;
     PyArrayObject *badval_ndarray;
     PyArrayObject *axis_coords[MAX_FERRET_NDIM];
@@ -722,9 +876,17 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
     }
 
     /* Parse the arguments, checking if an Exception was raised */
-    if ( ! PyArg_ParseTupleAndKeywords(args, kwds, "s", argNames, &name) )
+    if ( ! PyArg_ParseTupleAndKeywords(args, kwds, "s|iii", argNames, &name, &copydata, &single, &wantmask) )
         return NULL;
 
+    /* Ferret memory is always doubles, so float32 data is always a copy */
+    if ( single ) {
+        copydata = 1;
+        npytype = NPY_FLOAT;
+    }
+    else
+        npytype = NPY_DOUBLE;
+
     /* Make a copy of dataname just to be sure it isn't altered */
     lendataname = strlen(name);
     if ( lendataname > 1020 ) {
@@ -756,9 +918,10 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
     /* Get the strides through the memory (as a double *) */
     strides[0] = 1;
     for (k = 1; k < MAX_FERRET_NDIM; k++)
-        strides[k] = strides[k-1] * (memhi[k-1] - memlo[k-1] + 1);
+        strides[k] = strides[k-1] * (npy_intp) (memhi[k-1] - memlo[k-1] + 1);
 
-    /* Get the actual starting point in the array */
+    /* Get the actual starting point in the array (mvar is the start of the storage) */
+    mvar = arraystart;
     for (k = 0; k < MAX_FERRET_NDIM; k++)
         arraystart += (strides[k]) * (steplo[k] - memlo[k]);
 
@@ -766,47 +929,72 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
     for (k = 0; k < MAX_FERRET_NDIM; k++)
         strides[k] *= incr[k];
 
-    /* Create a new NumPy double ndarray (Fortran ordering) with the same shape */
-    data_ndarray = (PyArrayObject *) PyArray_EMPTY(MAX_FERRET_NDIM, shape, NPY_DOUBLE, 1);
-    if ( data_ndarray == NULL ) {
-        return NULL;
+    if ( (! copydata) && (mvar != NULL) ) {
+        /*
+         * Create a read-only NumPy double ndarray referencing the data in Ferret memory.
+         * The base object of the ndarray holds the storage so Ferret does not free it.
+         */
+        for (k = 0; k < MAX_FERRET_NDIM; k++)
+            view_strides[k] = strides[k] * (npy_intp) sizeof(double);
+        if ( hold_dyn_mem(mvar) != 0 )
+            return PyErr_NoMemory();
+        hold_capsule = PyCapsule_New(mvar, pyferretDataViewHoldName, pyferretReleaseDataViewHold);
+        if ( hold_capsule == NULL ) {
+            release_dyn_mem(mvar);
+            return NULL;
+        }
+        data_ndarray = (PyArrayObject *) PyArray_New(&PyArray_Type, MAX_FERRET_NDIM, shape, NPY_DOUBLE,
+                                                     view_strides, arraystart, 0, NPY_ARRAY_ALIGNED, NULL);
+        if ( data_ndarray == NULL ) {
+            /* the capsule destructor releases the hold */
+            Py_DECREF(hold_capsule);
+            return NULL;
+        }
+        /* PyArray_SetBaseObject steals the reference to hold_capsule, even on failure */
+        if ( PyArray_SetBaseObject(data_ndarray, hold_capsule) < 0 ) {
+            Py_DECREF(data_ndarray);
+            return NULL;
+        }
+        /* If requested, create the mask from the data in Ferret memory (without copying) */
+        mask_ndarray = NULL;
+        if ( wantmask ) {
+            if ( pyferretCopyStridedData(NULL, 0, arraystart, shape, strides, badval, &mask_ndarray) != 0 ) {
+                Py_DECREF(data_ndarray);
+                return NULL;
+            }
+        }
     }
+    else {
+        /* Create a new NumPy double or float ndarray (Fortran ordering) with the same shape */
+        data_ndarray = (PyArrayObject *) PyArray_EMPTY(MAX_FERRET_NDIM, shape, npytype, 1);
+        if ( data_ndarray == NULL ) {
+            return NULL;
+        }
 
-    /*
-     * Assign the data in the new ndarray.
-     * Note: if MAX_FERRET_NDIM changes, this needs editing.
-     */
-    npydata = (double *)PyArray_DATA(data_ndarray);
-    q = 0;
-    for (n = 0; n < (int)(shape[5]); n++) {
-      for (m = 0; m < (int)(shape[4]); m++) {
-        for (l = 0; l < (int)(shape[3]); l++) {
-          for (k = 0; k < (int)(shape[2]); k++) {
-            for (j = 0; j < (int)(shape[1]); j++) {
-              for (i = 0; i < (int)(shape[0]); i++) {
-                npydata[q] = arraystart[ i * strides[0] + 
-                                         j * strides[1] + 
-                                         k * strides[2] + 
-                                         l * strides[3] +
-                                         m * strides[4] +
-                                         n * strides[5] ];
-                q++;
-              }
-            }
-          }
+        /* Assign (and convert, if float) the data in the new ndarray, and create the mask if requested, in one pass */
+        mask_ndarray = NULL;
+        if ( pyferretCopyStridedData(PyArray_DATA(data_ndarray), single, arraystart, shape, strides,
+                                     badval, wantmask ? &mask_ndarray : NULL) != 0 ) {
+            Py_DECREF(data_ndarray);
+            return NULL;
         }
-      }
     }
 
-    /* Create a new NumPy float ndarray with the bad-data-flag value(s) */
+    /* Create a new NumPy double or float ndarray with the bad-data-flag value(s) */
     new_shape[0] = 1;
-    badval_ndarray = (PyArrayObject *) PyArray_SimpleNew(1, new_shape, NPY_DOUBLE);
+    badval_ndarray = (PyArrayObject *) PyArray_SimpleNew(1, new_shape, npytype);
     if ( badval_ndarray == NULL ) {
        Py_DECREF(data_ndarray);
+       Py_XDECREF(mask_ndarray);
        return NULL;
     }
-    npydata = (double *)PyArray_DATA(badval_ndarray);
-    npydata[0] = badval;
+    if ( single ) {
+        ((float *)PyArray_DATA(badval_ndarray))[0] = (float) badval;
+    }
+    else {
+        npydata = (double *)PyArray_DATA(badval_ndarray);
+        npydata[0] = badval;
+    }
 
     /* Create the axis coordinates array objects */
     for (k = 0; k < MAX_FERRET_NDIM; k++) {
@@ -825,6 +1013,7 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
                 }
                 Py_DECREF(badval_ndarray);
                 Py_DECREF(data_ndarray);
+                Py_XDECREF(mask_ndarray);
                 return NULL;
             }
             /* get the coordinates and the units string */
@@ -842,6 +1031,7 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
                 }
                 Py_DECREF(badval_ndarray);
                 Py_DECREF(data_ndarray);
+                Py_XDECREF(mask_ndarray);
                 return NULL;
             }
             break;
@@ -857,6 +1047,7 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
                 }
                 Py_DECREF(badval_ndarray);
                 Py_DECREF(data_ndarray);
+                Py_XDECREF(mask_ndarray);
                 return NULL;
             }
             /* get the time coordinate integers */
@@ -874,6 +1065,7 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
                 }
                 Py_DECREF(badval_ndarray);
                 Py_DECREF(data_ndarray);
+                Py_XDECREF(mask_ndarray);
                 return NULL;
             }
             /* set the axis units to the name of the calendar */
@@ -906,6 +1098,7 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
                 }
                 Py_DECREF(badval_ndarray);
                 Py_DECREF(data_ndarray);
+                Py_XDECREF(mask_ndarray);
                 return NULL;
             }
             break;
@@ -925,20 +1118,28 @@ static PyObject *pyferretGetData(PyObject *self, PyObject *args, PyObject *kwds)
             }
             Py_DECREF(badval_ndarray);
             Py_DECREF(data_ndarray);
+            Py_XDECREF(mask_ndarray);
             return NULL;
         }
     }
 
+    /* None for the mask if not requested or if no data is missing */
+    if ( mask_ndarray == NULL ) {
+        Py_INCREF(Py_None);
+        mask_ndarray = (PyArrayObject *) Py_None;
+    }
+
     /*
-     * Return a tuple (stealing references for PyObjects) of data_ndarray,
-     * badval_ndarray, dataunit, axis_types, axis_names, axis_units, and axis_coords.
+     * Return a tuple (stealing references for PyObjects) of data_ndarray, badval_ndarray,
+     * dataunit, axis_types, axis_names, axis_units, axis_coords, and mask_ndarray.
      * Note: if MAX_FERRET_NDIM changes, this needs editing.
      */
-    return Py_BuildValue("NNs(iiiiii)(ssssss)(ssssss)(NNNNNN)", data_ndarray, badval_ndarray, dataunit,
+    return Py_BuildValue("NNs(iiiiii)(ssssss)(ssssss)(NNNNNN)N", data_ndarray, badval_ndarray, dataunit,
               axis_types[0], axis_types[1], axis_types[2], axis_types[3], axis_types[4], axis_types[5],
               axis_names[0], axis_names[1], axis_names[2], axis_names[3], axis_names[4], axis_names[5],
               axis_units[0], axis_units[1], axis_units[2], axis_units[3], axis_units[4], axis_units[5],
-              axis_coords[0], axis_coords[1], axis_coords[2], axis_coords[3], axis_coords[4], axis_coords[5]);
+              axis_coords[0], axis_coords[1], axis_coords[2], axis_coords[3], axis_coords[4], axis_coords[5],
+              mask_ndarray);
 }
 
 
@@ -948,7 +1149,9 @@ static char pyferretPutDataDocstring[] =
     "Required arguments: \n"
     "    codename = <string>: the code name of the Ferret data variable to create (eg, \"SST\") \n"
     "    title = <string>: the title of the Ferret data variable to create (eg, \"Sea Surface Temperature\") \n"
-    "    data = <ndarray>: the array containing the numeric data \n"
+    "    data = <ndarray>: the Fortran-contiguous float64 or float32 array containing the \n"
+    "                      numeric data; Ferret keeps a reference to (not a copy of) this \n"
+    "                      array, converting float32 values to float64 when they are used \n"
     "    bdfval = <ndarray>: the bad-data-flag value for the data \n"
     "    units = <string>: the units for the data \n"
     "    dset = <string>: the dataset name or number to be associates with this variable; \n"
@@ -1021,9 +1224,14 @@ static PyObject *pyferretPutData(PyObject *self, PyObject *args, PyObject *kwds)
 
     /* PyArray_Size returns 0 if the object is not an appropriate type */
     /* ISFARRAY_RO checks if it is F-contiguous, aligned, and in machine byte-order */
-    if ( (PyArray_Size((PyObject *) data_ndarray) < 1) || (PyArray_TYPE(data_ndarray) != NPY_DOUBLE) ||
-         (! PyArray_ISFARRAY_RO(data_ndarray)) || (! PyArray_CHKFLAGS(data_ndarray, NPY_ARRAY_OWNDATA)) ) {
-        PyErr_SetString(PyExc_ValueError, "data is not an appropriate ndarray of type float64");
+    /*
+     * The data does not need to own its memory; a view of a larger array is fine
+     * since the reference held on the view keeps the underlying memory around.
+     */
+    if ( (PyArray_Size((PyObject *) data_ndarray) < 1) ||
+         ((PyArray_TYPE(data_ndarray) != NPY_DOUBLE) && (PyArray_TYPE(data_ndarray) != NPY_FLOAT)) ||
+         (! PyArray_ISFARRAY_RO(data_ndarray)) ) {
+        PyErr_SetString(PyExc_ValueError, "data is not an appropriate ndarray of type float64 or float32");
         return NULL;
     }
 
@@ -1635,6 +1843,9 @@ static PyObject *pyferretStop(PyObject *self)
     /* Clear/reset Ferret's state and free memory allocated inside Ferret */
     FORTRAN(finalize_ferret)();
 
+    /* Release the modules of Python-backed external functions; the IDs are no longer valid */
+    pyefcn_clear_registry();
+
     /* Free memory allocated for PPLUS */
     FerMem_Free(pplMemory, __FILE__, __LINE__);
     pplMemory = NULL;
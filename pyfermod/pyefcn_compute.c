@@ -65,6 +65,53 @@
 #define NPY_ARRAY_FARRAY_RO NPY_FARRAY_RO
 #endif
 
+/*
+ * Returns a new read-only NumPy boolean ndarray, of the same shape as values
+ * (a six-dimensional float64 ndarray), which is True where the value is defined;
+ * that is, where the value is not NaN and does not match badval.  The mask is
+ * assigned in a single pass over the data.  Returns NULL, with a Python
+ * exception set, if the ndarray could not be created.
+ */
+static PyObject *pyefcn_defined_mask(PyArrayObject *values, double badval)
+{
+    PyArrayObject *mask;
+    npy_intp      *shape;
+    npy_intp      *strides;
+    char          *dataptr;
+    npy_bool      *maskptr;
+    double         val;
+    npy_intp       d0, d1, d2, d3, d4, d5;
+
+    shape = PyArray_DIMS(values);
+    strides = PyArray_STRIDES(values);
+    mask = (PyArrayObject *) PyArray_New(&PyArray_Type, MAX_FERRET_NDIM, shape, NPY_BOOL,
+                                         NULL, NULL, 0, NPY_ARRAY_FARRAY, NULL);
+    if ( mask == NULL )
+        return NULL;
+    dataptr = (char *) PyArray_DATA(values);
+    /* The mask is Fortran contiguous, so just step through it in order */
+    maskptr = (npy_bool *) PyArray_DATA(mask);
+    /* This needs to be modified if MAX_FERRET_NDIM changes */
+    for (d5 = 0; d5 < shape[5] * strides[5]; d5 += strides[5]) {
+      for (d4 = 0; d4 < shape[4] * strides[4]; d4 += strides[4]) {
+        for (d3 = 0; d3 < shape[3] * strides[3]; d3 += strides[3]) {
+          for (d2 = 0; d2 < shape[2] * strides[2]; d2 += strides[2]) {
+            for (d1 = 0; d1 < shape[1] * strides[1]; d1 += strides[1]) {
+              for (d0 = 0; d0 < shape[0] * strides[0]; d0 += strides[0]) {
+                val = *((double *) (dataptr + d0 + d1 + d2 + d3 + d4 + d5));
+                /* Same test for bad values as used by the pyferret.stats functions */
+                *maskptr = ! ( isnan(val) || (fabs(val - badval) < 1.0E-5) );
+                maskptr++;
+              }
+            }
+          }
+        }
+      }
+    }
+    PyArray_CLEARFLAGS(mask, NPY_ARRAY_WRITEABLE);
+    return (PyObject *) mask;
+}
+
 /*
  * See pyferret.h for information on this function
  */
@@ -73,11 +120,12 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
                     int steplo[][MAX_FERRET_NDIM], int stephi[][MAX_FERRET_NDIM],
                     int incr[][MAX_FERRET_NDIM], double badvals[], char errmsg[])
 {
-    PyObject      *nameobj;
-    PyObject      *usermod;
-    PyObject      *initdict;
-    PyObject      *typetuple;
-    PyObject      *typeobj;
+    PyEFcnInfo    *info;
+    PyObject      *computefunc;
+    PyObject      *parallel;
+    PyObject      *piecemeal;
+    PyObject      *influences;
+    PyObject      *helpermod;
     int            j, k;
     int            datatypes[EF_MAX_COMPUTE_ARGS+1];
     int            resstrlen;
@@ -96,6 +144,8 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
     PyArrayObject *resbadval_ndarray;
     PyObject      *idobj;
     PyObject      *inpobj;
+    PyObject      *maskobj;
+    PyObject      *maskarray;
     PyObject      *result;
     char          *strptr;
 
@@ -105,78 +155,39 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
         return;
     }
 
-    /* Import the user's Python module */
-#if PY_MAJOR_VERSION > 2
-    nameobj = PyUnicode_FromString(modname);
-#else
-    nameobj = PyString_FromString(modname);
-#endif
-    if ( nameobj == NULL ) {
-        PyErr_Clear();
-        sprintf(errmsg, "Problems creating a Python string from the module name: %s", modname);
+    /* Get the user's Python module and its ferret_init information from the registry */
+    info = pyefcn_lookup(id, modname, errmsg);
+    if ( info == NULL )
         return;
-    }
-    usermod = PyImport_Import(nameobj);
-    Py_DECREF(nameobj);
-    if ( usermod == NULL ) {
-        PyErr_Clear();
-        sprintf(errmsg, "Unable to import module: %s", modname);
+    /* Hold a reference to the ferret_compute method in case the registry changes during the call */
+    computefunc = info->computefunc;
+    if ( computefunc == NULL ) {
+        sprintf(errmsg, "Error when calling %s in %s: no such method", COMPUTE_METHOD_NAME, modname);
         return;
     }
-
-    /* Call the initialization method to find out the data types */
-    initdict = PyObject_CallMethod(usermod, INIT_METHOD_NAME, "i", id);
-    if ( initdict == NULL ) {
-        Py_DECREF(usermod);
-        sprintf(errmsg, "Error when calling %s in %s: %s", INIT_METHOD_NAME, modname, pyefcn_get_error());
-        return;
+    Py_INCREF(computefunc);
+    /* Pieces of a float result can be computed in parallel if requested */
+    if ( info->parallel && (info->restype == FLOAT_ARRAY) && (pyferret_module_pyobject != NULL) ) {
+        parallel = PyDict_GetItemString(info->initdict, "parallel"); /* borrowed reference */
+        piecemeal = PyDict_GetItemString(info->initdict, "piecemeal"); /* borrowed reference */
+        if ( piecemeal == NULL )
+            piecemeal = Py_None;
+        Py_INCREF(parallel);
+        Py_INCREF(piecemeal);
     }
-    /* Get the result type - default FLOAT_ARRAY */
-    typeobj = PyDict_GetItemString(initdict, "restype"); /* borrowed reference */
-    if ( typeobj != NULL ) {
-#if PY_MAJOR_VERSION > 2
-        datatypes[0] = (int) PyLong_AsLong(typeobj);
-#else
-        datatypes[0] = (int) PyInt_AsLong(typeobj);
-#endif
-    }
-    else
-        datatypes[0] = FLOAT_ARRAY;
-    /* Get the (maximum) length of strings in a string result array - default 128 */
-    typeobj = PyDict_GetItemString(initdict, "resstrlen"); /* borrowed reference */
-    if ( typeobj != NULL ) {
-#if PY_MAJOR_VERSION > 2
-        resstrlen = (int) PyLong_AsLong(typeobj);
-#else
-        resstrlen = (int) PyInt_AsLong(typeobj);
-#endif
+    else {
+        parallel = NULL;
+        piecemeal = NULL;
     }
-    else
-        resstrlen = 128;
-    /* Find out the argument types */
-    typetuple = PyDict_GetItemString(initdict, "argtypes"); /* borrowed reference */
-    /* If typetuple is NULL, the key is not present but no error was raised */
-    j = 1;
-    if ( typetuple != NULL ) {
-        for ( ; j < numarrays; j++) {
-            /* Get the type of this argument */
-            typeobj = PySequence_GetItem(typetuple, (Py_ssize_t) (j-1));
-            if ( typeobj == NULL ) {
-                PyErr_Clear();
-                break;
-            }
-#if PY_MAJOR_VERSION > 2
-            datatypes[j] = (int) PyLong_AsLong(typeobj);
-#else
-            datatypes[j] = (int) PyInt_AsLong(typeobj);
-#endif
-            Py_DECREF(typeobj);
-        }
+    /* The result and argument types */
+    datatypes[0] = info->restype;
+    resstrlen = info->resstrlen;
+    for (j = 1; j < numarrays; j++) {
+        if ( j <= PYEFCN_MAX_ARGS )
+            datatypes[j] = info->argtypes[j-1];
+        else
+            datatypes[j] = FLOAT_ARRAY;
     }
-    /* Assign the default FLOAT_ARRAY for any unspecified types */
-    for ( ; j < numarrays; j++)
-        datatypes[j] = FLOAT_ARRAY;
-    Py_DECREF(initdict);
 
     /* Create the Python objects for the inputs and result. */
     for (j = 0; j < numarrays; j++) {
@@ -219,7 +230,9 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
                         j--;
                         Py_DECREF(ndarrays[j]);
                     }
-                    Py_DECREF(usermod);
+                    Py_DECREF(computefunc);
+                    Py_XDECREF(parallel);
+                    Py_XDECREF(piecemeal);
                     return;
                 }
                 break;
@@ -235,7 +248,9 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
                         j--;
                         Py_DECREF(ndarrays[j]);
                     }
-                    Py_DECREF(usermod);
+                    Py_DECREF(computefunc);
+                    Py_XDECREF(parallel);
+                    Py_XDECREF(piecemeal);
                     return;
                 }
                 break;
@@ -257,7 +272,9 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
                         PyErr_Clear();
                         sprintf(errmsg, "Unable to create ndarray[%d]", j);
                         /* First array creation attempt  - no other ndarray element */
-                        Py_DECREF(usermod);
+                        Py_DECREF(computefunc);
+                        Py_XDECREF(parallel);
+                        Py_XDECREF(piecemeal);
                         return;
                     }
                 }
@@ -304,7 +321,9 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
                             j--;
                             Py_DECREF(ndarrays[j]);
                         }
-                        Py_DECREF(usermod);
+                        Py_DECREF(computefunc);
+                        Py_XDECREF(parallel);
+                        Py_XDECREF(piecemeal);
                         return;
                     }
                     /* Assign all the strings in the array */
@@ -355,7 +374,9 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
                         j--;
                         Py_DECREF(ndarrays[j]);
                     }
-                    Py_DECREF(usermod);
+                    Py_DECREF(computefunc);
+                    Py_XDECREF(parallel);
+                    Py_XDECREF(piecemeal);
                     return;
                 }
                 break;
@@ -367,7 +388,9 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
                     j--;
                     Py_DECREF(ndarrays[j]);
                 }
-                Py_DECREF(usermod);
+                Py_DECREF(computefunc);
+                Py_XDECREF(parallel);
+                Py_XDECREF(piecemeal);
                 return;
         }
     }
@@ -390,7 +413,9 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
         PyErr_Clear();
         Py_DECREF(inpobj);
         Py_DECREF(ndarrays[0]);
-        Py_DECREF(usermod);
+        Py_DECREF(computefunc);
+        Py_XDECREF(parallel);
+        Py_XDECREF(piecemeal);
         strcpy(errmsg, "Unable to create input badvals ndarray");
         return;
     }
@@ -403,11 +428,48 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
         Py_DECREF(inpbadvals_ndarray);
         Py_DECREF(inpobj);
         Py_DECREF(ndarrays[0]);
-        Py_DECREF(usermod);
+        Py_DECREF(computefunc);
+        Py_XDECREF(parallel);
+        Py_XDECREF(piecemeal);
         strcpy(errmsg, "Unable to create result badvals ndarray");
         return;
     }
 
+    /* Create a tuple of masks of the defined input values if requested in ferret_init */
+    if ( info->anyargmasks ) {
+        maskobj = PyTuple_New((Py_ssize_t) (numarrays-1));
+        for (j = 1; (maskobj != NULL) && (j < numarrays); j++) {
+            if ( (j <= PYEFCN_MAX_ARGS) && info->argmasks[j-1] && (datatypes[j] == FLOAT_ARRAY) ) {
+                maskarray = pyefcn_defined_mask(ndarrays[j], badvals[j]);
+                if ( maskarray == NULL ) {
+                    Py_DECREF(maskobj);
+                    maskobj = NULL;
+                    break;
+                }
+            }
+            else {
+                Py_INCREF(Py_None);
+                maskarray = Py_None;
+            }
+            PyTuple_SET_ITEM(maskobj, (Py_ssize_t)(j-1), maskarray); /* Steals a reference to maskarray */
+        }
+        if ( maskobj == NULL ) {
+            /* Problem - release references to the previous PyArray objects, assign errmsg, and return */
+            PyErr_Clear();
+            Py_DECREF(resbadval_ndarray);
+            Py_DECREF(inpbadvals_ndarray);
+            Py_DECREF(inpobj);
+            Py_DECREF(ndarrays[0]);
+            Py_DECREF(computefunc);
+            Py_XDECREF(parallel);
+            Py_XDECREF(piecemeal);
+            strcpy(errmsg, "Unable to create input masks ndarrays");
+            return;
+        }
+    }
+    else
+        maskobj = NULL;
+
     /* ferret ID argument */
 #if PY_MAJOR_VERSION > 2
     idobj = PyLong_FromLong((long)id);
@@ -415,23 +477,46 @@ void pyefcn_compute(int id, char modname[], double *data[], int numarrays,
     idobj = PyInt_FromLong((long)id);
 #endif
 
-    /* Call the ferret_compute function in the module */
-#if PY_MAJOR_VERSION > 2
-    nameobj = PyUnicode_FromString(COMPUTE_METHOD_NAME);
-#else
-    nameobj = PyString_FromString(COMPUTE_METHOD_NAME);
-#endif
-    result = PyObject_CallMethodObjArgs(usermod, nameobj, idobj, ndarrays[0], resbadval_ndarray,
-                                                                 inpobj, inpbadvals_ndarray, NULL);
+    if ( parallel != NULL ) {
+        /*
+         * Call the ferret_compute function in the module on pieces of the
+         * result using a pool of threads (see pyferret.pyefmethods)
+         */
+        influences = PyDict_GetItemString(info->initdict, "influences"); /* borrowed reference */
+        if ( influences == NULL )
+            influences = Py_None;
+        helpermod = PyObject_GetAttrString(pyferret_module_pyobject, "pyefmethods");
+        if ( helpermod != NULL ) {
+            result = PyObject_CallMethod(helpermod, PARALLEL_COMPUTE_METHOD_NAME, "OOOOOOOOOO",
+                                         computefunc, parallel, piecemeal, idobj, ndarrays[0],
+                                         resbadval_ndarray, inpobj, inpbadvals_ndarray,
+                                         (maskobj != NULL) ? maskobj : Py_None, influences);
+            Py_DECREF(helpermod);
+        }
+        else
+            result = NULL;
+        Py_DECREF(piecemeal);
+        Py_DECREF(parallel);
+    }
+    else if ( maskobj != NULL ) {
+        /* Call the ferret_compute function in the module with the input masks */
+        result = PyObject_CallFunctionObjArgs(computefunc, idobj, ndarrays[0], resbadval_ndarray,
+                                                           inpobj, inpbadvals_ndarray, maskobj, NULL);
+    }
+    else {
+        /* Call the ferret_compute function in the module */
+        result = PyObject_CallFunctionObjArgs(computefunc, idobj, ndarrays[0], resbadval_ndarray,
+                                                           inpobj, inpbadvals_ndarray, NULL);
+    }
 
     /* Release all the PyObjects no longer needed */
     Py_XDECREF(result);
-    Py_DECREF(nameobj);
+    Py_XDECREF(maskobj);
     Py_DECREF(idobj);
     Py_DECREF(resbadval_ndarray);
     Py_DECREF(inpbadvals_ndarray);
     Py_DECREF(inpobj);
-    Py_DECREF(usermod);
+    Py_DECREF(computefunc);
 
     /* If the ferret_compute call was unsuccessful (raised an exception), assign errmsg from its message */
     if ( result == NULL ) {
@@ -49,7 +49,7 @@ static const char *AXIS_NAMES[MAX_FERRET_NDIM] = { "X", "Y", "Z", "T", "E", "F"
 void pyefcn_custom_axes(int id, char modname[], char errmsg[])
 {
     PyObject  *valobj;
-    PyObject  *usermod;
+    PyEFcnInfo *info;
     PyObject  *seqobj;
     int        seqlen;
     int        k, q;
@@ -63,34 +63,16 @@ void pyefcn_custom_axes(int id, char modname[], char errmsg[])
     int        is_modulo;
 
     /*
-     * Import the user's Python module
+     * Get the user's Python module from the registry
      */
-#if PY_MAJOR_VERSION > 2
-    valobj = PyUnicode_FromString(modname);
-#else
-    valobj = PyString_FromString(modname);
-#endif
-    if ( valobj == NULL ) {
-        PyErr_Clear();
-        sprintf(errmsg, "Problems creating a Python string from the module name: %s", modname);
+    info = pyefcn_lookup(id, modname, errmsg);
+    if ( info == NULL )
         return;
-    }
-    usermod = PyImport_Import(valobj);
-    /* valobj no longer needed */
-    Py_DECREF(valobj);
-    /* check for errors */
-    if ( usermod == NULL ) {
-        PyErr_Clear();
-        sprintf(errmsg, "Unable to import module: %s", modname);
-        return;
-    }
 
     /*
      * Call the ferret_custom_axes method in the user's python module with the ferret function ID as the sole argument
      */
-    valobj = PyObject_CallMethod(usermod, CUSTOM_AXES_METHOD_NAME, "i", id);
-    /* usermod no longer needed */
-    Py_DECREF(usermod);
+    valobj = PyObject_CallMethod(info->usermod, CUSTOM_AXES_METHOD_NAME, "i", id);
     /* check for errors */
     if ( valobj == NULL ) {
         sprintf(errmsg, "Error when calling %s in %s: %s", CUSTOM_AXES_METHOD_NAME, modname, pyefcn_get_error());
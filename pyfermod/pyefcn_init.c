@@ -101,10 +101,9 @@ void pyefcn_init(int id, char modname[], char errmsg[])
      * with the ferret function ID as the sole argument
      */
     initdict = PyObject_CallMethod(usermod, INIT_METHOD_NAME, "i", id);
-    /* usermod no longer needed */
-    Py_DECREF(usermod);
     /* check for errors */
     if ( initdict == NULL ) {
+        Py_DECREF(usermod);
         sprintf(errmsg, "Error when calling %s in %s: %s", INIT_METHOD_NAME, modname, pyefcn_get_error());
         return;
     }
@@ -114,11 +113,27 @@ void pyefcn_init(int id, char modname[], char errmsg[])
      */
     if ( ! PyDict_Check(initdict) ) {
         Py_DECREF(initdict);
+        Py_DECREF(usermod);
         sprintf(errmsg, "Invalid return value (not a dictionary) from %s in %s",
                         INIT_METHOD_NAME, modname);
         return;
     }
 
+    /*
+     * Record the module and dictionary for this function ID, replacing 
+     * any from a previous definition, so the module does not have to be 
+     * imported and ferret_init called for each of the other pyefcn calls.
+     * If an error is found in the dictionary, the caller unregisters the ID.
+     */
+    if ( pyefcn_register(id, modname, usermod, initdict) == NULL ) {
+        Py_DECREF(initdict);
+        Py_DECREF(usermod);
+        sprintf(errmsg, "Unable to record the information for module: %s", modname);
+        return;
+    }
+    /* usermod no longer needed */
+    Py_DECREF(usermod);
+
     /*
      * "numargs": number of input arguments [1 - 9, required]
      */
@@ -341,6 +356,59 @@ void pyefcn_init(int id, char modname[], char errmsg[])
     FORTRAN(ef_set_piecemeal_ok_6d)(&id, &(axisvals[0]), &(axisvals[1]), &(axisvals[2]), 
                                  &(axisvals[3]), &(axisvals[4]), &(axisvals[5]));
 
+    /*
+     * "parallel": True, False, or the number of threads for computing pieces 
+     *         of the result in parallel [optional, default: False]
+     */
+    valobj = PyDict_GetItemString(initdict, "parallel"); /* borrowed reference */
+    if ( (valobj != NULL) && (valobj != Py_True) && (valobj != Py_False) ) {
+#if PY_MAJOR_VERSION > 2
+        val = (int) PyLong_AsLong(valobj);
+#else
+        val = (int) PyInt_AsLong(valobj);
+#endif
+        if ( PyErr_Occurred() || (val < 1) ) {
+            PyErr_Clear();
+            Py_DECREF(initdict);
+            strcpy(errmsg, "Invalid \"parallel\" value (not True, False, or a positive int)");
+            return;
+        }
+    }
+
+    /*
+     * "argmasks": True, False, or N-tuple of True or False indicating whether a mask
+     *             of the defined values of the input argument is given to ferret_compute
+     *             [optional, default: False]
+     */
+    valobj = PyDict_GetItemString(initdict, "argmasks"); /* borrowed reference */
+    if ( (valobj != NULL) && (valobj != Py_True) && (valobj != Py_False) ) {
+        seqobj = PySequence_Fast(valobj, "argmasks value");
+        if ( seqobj == NULL ) {
+            PyErr_Clear();
+            Py_DECREF(initdict);
+            strcpy(errmsg, "Invalid \"argmasks\" value (not True, False, or a tuple or list)");
+            return;
+        }
+        seqlen = (int) PySequence_Fast_GET_SIZE(seqobj);
+        if ( seqlen > num_args ) {
+            Py_DECREF(seqobj);
+            Py_DECREF(initdict);
+            strcpy(errmsg, "Invalid \"argmasks\" value (tuple or list with too many items)");
+            return;
+        }
+        for (k = 0; k < seqlen; k++) {
+            itemobj = PySequence_Fast_GET_ITEM(seqobj, (Py_ssize_t) k); /* borrowed reference */
+            /* Must be one of the singleton objects Py_True or Py_False to be accepted */
+            if ( (itemobj != Py_True) && (itemobj != Py_False) ) {
+                Py_DECREF(seqobj);
+                Py_DECREF(initdict);
+                strcpy(errmsg, "Invalid \"argmasks\" value (item not True or False)");
+                return;
+            }
+        }
+        Py_DECREF(seqobj);
+    }
+
     /*
      * "argnames": N-tuple of names for the input arguments [optional, default: (A, B, ...)]
      */
@@ -731,7 +799,8 @@ void pyefcn_init(int id, char modname[], char errmsg[])
              (strcmp(strptr, "axes") != 0) && (strcmp(strptr, "argnames") != 0) &&
              (strcmp(strptr, "argdescripts") != 0) && (strcmp(strptr, "argtypes") != 0) &&
              (strcmp(strptr, "influences") != 0) && (strcmp(strptr, "extends") != 0) &&
-             (strcmp(strptr, "piecemeal") != 0) ) {
+             (strcmp(strptr, "piecemeal") != 0) && (strcmp(strptr, "parallel") != 0) &&
+             (strcmp(strptr, "argmasks") != 0) ) {
             sprintf(errmsg, "Invalid key \"%s\" in the dictionary returned from %s in %s",
                             strptr, INIT_METHOD_NAME, modname);
             Py_DECREF(seqobj);
@@ -0,0 +1,274 @@
+/*
+ *  This software was developed by the Thermal Modeling and Analysis
+ *  Project(TMAP) of the National Oceanographic and Atmospheric
+ *  Administration's (NOAA) Pacific Marine Environmental Lab(PMEL),
+ *  hereafter referred to as NOAA/PMEL/TMAP.
+ *
+ *  Access and use of this software shall impose the following
+ *  obligations and understandings on the user. The user is granted the
+ *  right, without any fee or cost, to use, copy, modify, alter, enhance
+ *  and distribute this software, and any derivative works thereof, and
+ *  its supporting documentation for any purpose whatsoever, provided
+ *  that this entire notice appears in all copies of the software,
+ *  derivative works and supporting documentation.  Further, the user
+ *  agrees to credit NOAA/PMEL/TMAP in any publications that result from
+ *  the use of this software or in any product that includes this
+ *  software. The names TMAP, NOAA and/or PMEL, however, may not be used
+ *  in any advertising or publicity to endorse or promote any products
+ *  or commercial entity unless specific written permission is obtained
+ *  from NOAA/PMEL/TMAP. The user also understands that NOAA/PMEL/TMAP
+ *  is not obligated to provide the user with any support, consulting,
+ *  training or assistance of any kind with regard to the use, operation
+ *  and performance of this software nor to provide the user with any
+ *  updates, revisions, new versions or "bug fixes".
+ *
+ *  THIS SOFTWARE IS PROVIDED BY NOAA/PMEL/TMAP "AS IS" AND ANY EXPRESS
+ *  OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+ *  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+ *  ARE DISCLAIMED. IN NO EVENT SHALL NOAA/PMEL/TMAP BE LIABLE FOR ANY
+ *  SPECIAL, INDIRECT OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER
+ *  RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF
+ *  CONTRACT, NEGLIGENCE OR OTHER TORTUOUS ACTION, ARISING OUT OF OR IN
+ *  CONNECTION WITH THE ACCESS, USE OR PERFORMANCE OF THIS SOFTWARE.
+ */
+
+#include <Python.h>
+#include <stdio.h>
+#include <string.h>
+#include "ferret.h"
+#include "pyferret.h"
+
+/*
+ * The registry of information cached for each Python-backed external
+ * function, so the module does not have to be imported, and ferret_init
+ * called, every time Ferret calls one of the other functions in the module.
+ * Entries are individually allocated so pointers to them remain valid
+ * until the entry is replaced or removed.
+ */
+static PyEFcnInfo *pyefcnRegistry = NULL;
+
+/*
+ * Releases the references held by, and the memory of, the given entry.
+ */
+static void pyefcn_free_info(PyEFcnInfo *info)
+{
+    Py_XDECREF(info->computefunc);
+    Py_DECREF(info->initdict);
+    Py_DECREF(info->usermod);
+    PyMem_Free(info);
+}
+
+/*
+ * Returns the int value of key in initdict, or defval if key is not present.
+ */
+static int pyefcn_dict_int(PyObject *initdict, const char *key, int defval)
+{
+    PyObject *valobj;
+    long      val;
+
+    valobj = PyDict_GetItemString(initdict, key); /* borrowed reference */
+    if ( valobj == NULL )
+        return defval;
+#if PY_MAJOR_VERSION > 2
+    val = PyLong_AsLong(valobj);
+#else
+    val = PyInt_AsLong(valobj);
+#endif
+    if ( PyErr_Occurred() ) {
+        PyErr_Clear();
+        return defval;
+    }
+    return (int) val;
+}
+
+/*
+ * See pyferret.h for information on this function
+ */
+PyEFcnInfo *pyefcn_register(int id, char modname[], PyObject *usermod, PyObject *initdict)
+{
+    PyEFcnInfo *info;
+    PyObject   *typetuple;
+    PyObject   *typeobj;
+    int         j;
+
+    if ( strlen(modname) >= PYEFCN_MAX_MODNAME_LENGTH )
+        return NULL;
+    info = (PyEFcnInfo *) PyMem_Malloc(sizeof(PyEFcnInfo));
+    if ( info == NULL )
+        return NULL;
+    info->id = id;
+    strcpy(info->modname, modname);
+    Py_INCREF(usermod);
+    info->usermod = usermod;
+    Py_INCREF(initdict);
+    info->initdict = initdict;
+    /* If not found, an error is reported when ferret_compute is called */
+    info->computefunc = PyObject_GetAttrString(usermod, COMPUTE_METHOD_NAME);
+    if ( info->computefunc == NULL )
+        PyErr_Clear();
+
+    /* Parse the values used when calling ferret_compute */
+    typeobj = PyDict_GetItemString(initdict, "parallel"); /* borrowed reference */
+    if ( typeobj == Py_True )
+        info->parallel = 1;
+    else if ( (typeobj == NULL) || (typeobj == Py_False) )
+        info->parallel = 0;
+    else
+        info->parallel = ( pyefcn_dict_int(initdict, "parallel", 1) > 1 );
+    info->restype = pyefcn_dict_int(initdict, "restype", FLOAT_ARRAY);
+    info->resstrlen = pyefcn_dict_int(initdict, "resstrlen", 128);
+    j = 0;
+    typetuple = PyDict_GetItemString(initdict, "argtypes"); /* borrowed reference */
+    if ( typetuple != NULL ) {
+        for ( ; j < PYEFCN_MAX_ARGS; j++) {
+            typeobj = PySequence_GetItem(typetuple, (Py_ssize_t) j);
+            if ( typeobj == NULL ) {
+                PyErr_Clear();
+                break;
+            }
+#if PY_MAJOR_VERSION > 2
+            info->argtypes[j] = (int) PyLong_AsLong(typeobj);
+#else
+            info->argtypes[j] = (int) PyInt_AsLong(typeobj);
+#endif
+            Py_DECREF(typeobj);
+        }
+    }
+    /* Assign the default FLOAT_ARRAY for any unspecified types */
+    for ( ; j < PYEFCN_MAX_ARGS; j++)
+        info->argtypes[j] = FLOAT_ARRAY;
+    /* Masks of defined values can only be given for FLOAT_ARRAY arguments */
+    typetuple = PyDict_GetItemString(initdict, "argmasks"); /* borrowed reference */
+    info->anyargmasks = 0;
+    for (j = 0; j < PYEFCN_MAX_ARGS; j++) {
+        if ( (typetuple == NULL) || (typetuple == Py_False) )
+            info->argmasks[j] = 0;
+        else if ( typetuple == Py_True )
+            info->argmasks[j] = 1;
+        else {
+            typeobj = PySequence_GetItem(typetuple, (Py_ssize_t) j);
+            if ( typeobj == NULL ) {
+                PyErr_Clear();
+                info->argmasks[j] = 0;
+            }
+            else {
+                info->argmasks[j] = ( typeobj == Py_True );
+                Py_DECREF(typeobj);
+            }
+        }
+        if ( info->argtypes[j] != FLOAT_ARRAY )
+            info->argmasks[j] = 0;
+        if ( info->argmasks[j] )
+            info->anyargmasks = 1;
+    }
+
+    /* Replace any existing entry for this ID (the function was redefined) */
+    pyefcn_unregister(id);
+    info->next = pyefcnRegistry;
+    pyefcnRegistry = info;
+    return info;
+}
+
+/*
+ * See pyferret.h for information on this function
+ */
+PyEFcnInfo *pyefcn_lookup(int id, char modname[], char errmsg[])
+{
+    PyEFcnInfo *info;
+    PyEFcnInfo *prev;
+    PyObject   *nameobj;
+    PyObject   *usermod;
+    PyObject   *initdict;
+
+    prev = NULL;
+    for (info = pyefcnRegistry; info != NULL; info = info->next) {
+        if ( info->id == id ) {
+            if ( strcmp(info->modname, modname) != 0 )
+                break;
+            /* Move to the front since the same function is usually called repeatedly */
+            if ( prev != NULL ) {
+                prev->next = info->next;
+                info->next = pyefcnRegistry;
+                pyefcnRegistry = info;
+            }
+            return info;
+        }
+        prev = info;
+    }
+
+    /* Not registered (or registered for a different module), so import the module and call ferret_init */
+#if PY_MAJOR_VERSION > 2
+    nameobj = PyUnicode_FromString(modname);
+#else
+    nameobj = PyString_FromString(modname);
+#endif
+    if ( nameobj == NULL ) {
+        PyErr_Clear();
+        sprintf(errmsg, "Problems creating a Python string from the module name: %s", modname);
+        return NULL;
+    }
+    usermod = PyImport_Import(nameobj);
+    Py_DECREF(nameobj);
+    if ( usermod == NULL ) {
+        PyErr_Clear();
+        sprintf(errmsg, "Unable to import module: %s", modname);
+        return NULL;
+    }
+    initdict = PyObject_CallMethod(usermod, INIT_METHOD_NAME, "i", id);
+    if ( initdict == NULL ) {
+        Py_DECREF(usermod);
+        sprintf(errmsg, "Error when calling %s in %s: %s", INIT_METHOD_NAME, modname, pyefcn_get_error());
+        return NULL;
+    }
+    if ( ! PyDict_Check(initdict) ) {
+        Py_DECREF(initdict);
+        Py_DECREF(usermod);
+        sprintf(errmsg, "Invalid return value (not a dictionary) from %s in %s", INIT_METHOD_NAME, modname);
+        return NULL;
+    }
+    info = pyefcn_register(id, modname, usermod, initdict);
+    Py_DECREF(initdict);
+    Py_DECREF(usermod);
+    if ( info == NULL ) {
+        sprintf(errmsg, "Unable to record the information for module: %s", modname);
+        return NULL;
+    }
+    return info;
+}
+
+/*
+ * See pyferret.h for information on this function
+ */
+void pyefcn_unregister(int id)
+{
+    PyEFcnInfo *info;
+    PyEFcnInfo *prev;
+
+    prev = NULL;
+    for (info = pyefcnRegistry; info != NULL; info = info->next) {
+        if ( info->id == id ) {
+            if ( prev != NULL )
+                prev->next = info->next;
+            else
+                pyefcnRegistry = info->next;
+            pyefcn_free_info(info);
+            return;
+        }
+        prev = info;
+    }
+}
+
+/*
+ * See pyferret.h for information on this function
+ */
+void pyefcn_clear_registry(void)
+{
+    PyEFcnInfo *info;
+
+    while ( pyefcnRegistry != NULL ) {
+        info = pyefcnRegistry;
+        pyefcnRegistry = info->next;
+        pyefcn_free_info(info);
+    }
+}
+
@@ -3,8 +3,14 @@ Methods in pyferret to assist in the writing of Ferret external functions
 written in Python.
 """
 
+import multiprocessing
+import multiprocessing.pool
+import numpy
 from pyferret import libpyferret
 
+# Thread pools, by number of threads, used by _parallel_compute
+_PARALLEL_POOLS = { }
+
 def ferret_pyfunc():
     """
     A dummy function (which just returns this help message) used to document the
@@ -41,6 +47,29 @@ def ferret_pyfunc():
             "piecemeal":    6-tuple (X,Y,Z,T,E,F) of True or False indicating if it is
                             acceptable to break up the calculation, if needed, along the
                             corresponding axis [optional; default: False for each axis]
+            "parallel":     True, False, or the number of threads to use.  If not False,
+                            each call to ferret_compute is split into pieces along the
+                            piecemeal axis with the most result points, and the pieces
+                            are computed concurrently by a pool of threads (one per CPU
+                            if True).  Input arrays whose axis influences this axis of
+                            the result (see "influences") are split with the result;
+                            other input arrays, and those with a single point along this
+                            axis, are given whole for each piece.  If an influencing input
+                            array is extended along this axis, the result is not split.
+                            This should only be used if the computation for each point
+                            along the piecemeal axes only uses the given arrays, and is
+                            only useful if ferret_compute does most of its work in NumPy
+                            or SciPy calls that release the GIL.
+                            [optional; default: False]
+            "argmasks":     True, False, or an N-tuple of True or False indicating
+                            whether ferret_compute should be given a mask of the defined
+                            values of the corresponding (FLOAT_ARRAY) input argument.
+                            True gives masks for every FLOAT_ARRAY argument.  If any
+                            mask is requested, ferret_compute is called with the
+                            additional argument input_masks (see below).  The masks
+                            are built by Ferret in a single pass over the data, which
+                            is much faster than computing them using NumPy calls.
+                            [optional; default: False]
             "argnames":     N-tuple of names for the input arguments
                             [optional; default: (A, B, ...)]
             "argdescripts": N-tuple of descriptions for the input arguments
@@ -95,6 +124,15 @@ def ferret_pyfunc():
             input_bdfs   - a NumPy ndarray of one dimension containing
                            the bad-data-flag values for each of the input arrays.
 
+    ferret_compute(efid, result_array, result_bdf, input_arrays, input_bdfs, input_masks)
+        (if "argmasks" was given in the ferret_init dictionary)
+        Additional argument:
+            input_masks  - tuple, with an item for each input argument, of either a
+                           read-only NumPy boolean ndarray, with the same shape as the
+                           input array, which is True where the input value is defined
+                           (not NaN and not the bad-data-flag value), or None if a mask
+                           was not requested for that argument.
+
         Any return value is ignored.
 
         If an exception is raised, Ferret is notified that an error occurred using
@@ -344,3 +382,109 @@ def get_arg_one_val(efid, arg):
     # make the actual call
     return libpyferret._get_arg_one_val(int_id, int_arg)
 
+
+def _compute_piece(pieceargs):
+    """
+    Calls the ferret_compute method given as the first item of the tuple
+    pieceargs with the remaining items as its arguments.  Used by
+    _parallel_compute to compute each piece of the result in a thread pool.
+    """
+    pieceargs[0](*pieceargs[1:])
+
+
+def _influences_axis(influences, argnum, axis):
+    """
+    Returns whether the "influences" value from a ferret_init dictionary
+    (or None if not given) has axis of input argument argnum influencing
+    the same axis of the result.
+    """
+    if (influences is None) or (argnum >= len(influences)):
+        return True
+    arginfl = influences[argnum]
+    if (arginfl is None) or (axis >= len(arginfl)):
+        return True
+    return bool(arginfl[axis])
+
+
+def _parallel_compute(computefunc, parallel, piecemeal, efid, result, result_bdf, inputs, input_bdfs,
+                      input_masks=None, influences=None):
+    """
+    Calls computefunc, the ferret_compute method of an external function whose
+    ferret_init dictionary gave "parallel", concurrently on pieces of the result
+    array.  Called by Ferret in place of calling computefunc directly.
+
+    Arguments:
+        computefunc: the ferret_compute method of the external function
+        parallel: the "parallel" value; True or the number of threads to use
+        piecemeal: the "piecemeal" value, or None if not given
+        efid, result, result_bdf, inputs, input_bdfs: the arguments for computefunc
+        input_masks: the input masks argument for computefunc, or None if not given
+        influences: the "influences" value, or None if not given
+    Returns:
+        None
+    Raises:
+        any exception raised by computefunc on any piece
+    """
+    if parallel is True:
+        numthreads = multiprocessing.cpu_count()
+    else:
+        numthreads = int(parallel)
+    # Split along the piecemeal axis of the result with the most points
+    axis = -1
+    if piecemeal:
+        for k in range(min(len(piecemeal), result.ndim)):
+            if piecemeal[k] and ((axis < 0) or (result.shape[k] > result.shape[axis])):
+                axis = k
+    if axis >= 0:
+        numpieces = min(numthreads, result.shape[axis])
+    else:
+        numpieces = 1
+    # Input arrays whose axis influences this axis of the result are split 
+    # with the result; others (and those with a single point along this axis) 
+    # are given whole to every piece.  If an influencing input does not match 
+    # the result along this axis (such as an extended axis), do not split.
+    splitargs = [ ]
+    if numpieces > 1:
+        for (argnum, inparray) in enumerate(inputs):
+            if isinstance(inparray, numpy.ndarray) and (inparray.ndim == result.ndim) and \
+               _influences_axis(influences, argnum, axis) and (inparray.shape[axis] != 1):
+                if inparray.shape[axis] != result.shape[axis]:
+                    numpieces = 1
+                    break
+                splitargs.append(argnum)
+    if numpieces < 2:
+        if input_masks is None:
+            computefunc(efid, result, result_bdf, inputs, input_bdfs)
+        else:
+            computefunc(efid, result, result_bdf, inputs, input_bdfs, input_masks)
+        return None
+    # The pieces are disjoint views of the result array (and of the split 
+    # input arrays and their masks) so the results are assigned in place
+    bounds = numpy.linspace(0, result.shape[axis], numpieces + 1).astype(int)
+    pieceargs = [ ]
+    for (lo, hi) in zip(bounds[:-1], bounds[1:]):
+        piece = [ slice(None) ] * result.ndim
+        piece[axis] = slice(lo, hi)
+        piece = tuple(piece)
+        pieceinputs = list(inputs)
+        for argnum in splitargs:
+            pieceinputs[argnum] = inputs[argnum][piece]
+        if input_masks is None:
+            pieceargs.append( (computefunc, efid, result[piece], result_bdf, 
+                               tuple(pieceinputs), input_bdfs) )
+            continue
+        # masks have the same shape as their input arrays, so are split the same way
+        piecemasks = list(input_masks)
+        for argnum in splitargs:
+            if piecemasks[argnum] is not None:
+                piecemasks[argnum] = input_masks[argnum][piece]
+        pieceargs.append( (computefunc, efid, result[piece], result_bdf, 
+                           tuple(pieceinputs), input_bdfs, tuple(piecemasks)) )
+    try:
+        pool = _PARALLEL_POOLS[numthreads]
+    except KeyError:
+        pool = multiprocessing.pool.ThreadPool(numthreads)
+        _PARALLEL_POOLS[numthreads] = pool
+    # map raises the first exception raised by computefunc, if any
+    pool.map(_compute_piece, pieceargs, chunksize=1)
+    return None
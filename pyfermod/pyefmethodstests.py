@@ -0,0 +1,173 @@
+'''
+Unit tests for the concurrent computation of Python external
+functions (pyefmethods._parallel_compute)
+'''
+
+import threading
+import unittest
+import numpy
+import pyefmethods
+
+
+class ParallelComputeTests(unittest.TestCase):
+    '''
+    Tests of pyefmethods._parallel_compute
+    '''
+
+    def setUp(self):
+        '''
+        Create the record of the calls to computefunc
+        '''
+        self.calls = [ ]
+        self.lock = threading.Lock()
+
+
+    def computefunc(self, efid, result, result_bdf, inputs, input_bdfs, input_masks=None):
+        '''
+        A ferret_compute method that records the shapes of the arrays it is
+        given and assigns result with the (broadcast) sum of the float inputs,
+        or with the result bad-data flag where the first input is masked
+        '''
+        with self.lock:
+            self.calls.append( (result.shape,
+                                tuple([ numpy.shape(inp) for inp in inputs ]),
+                                None if input_masks is None else \
+                                tuple([ numpy.shape(mask) for mask in input_masks ])) )
+        total = numpy.zeros(result.shape)
+        for inp in inputs:
+            if isinstance(inp, numpy.ndarray):
+                total = total + inp
+        if input_masks is not None:
+            total = numpy.where(input_masks[0], total, result_bdf[0])
+        result[:] = total
+
+
+    def test01SplitAlongLargestAxis(self):
+        '''
+        Tests the result and inputs are split into pieces along the
+        piecemeal axis of the result with the most points
+        '''
+        data = numpy.arange(4.0 * 10.0).reshape((4, 10, 1, 1, 1, 1), order='F')
+        result = numpy.zeros(data.shape, order='F')
+        piecemeal = (True, True, False, False, False, False)
+        pyefmethods._parallel_compute(self.computefunc, 2, piecemeal, 0, result,
+                                      numpy.array([-1.0]), (data,), numpy.array([-2.0]))
+        self.assertTrue(numpy.array_equal(result, data))
+        self.assertEqual(len(self.calls), 2)
+        for (resshape, inpshapes, maskshapes) in self.calls:
+            self.assertEqual(resshape, (4, 5, 1, 1, 1, 1))
+            self.assertEqual(inpshapes, ((4, 5, 1, 1, 1, 1),))
+            self.assertIsNone(maskshapes)
+        # no more pieces than points along the axis
+        self.calls = [ ]
+        result = numpy.zeros(data.shape, order='F')
+        pyefmethods._parallel_compute(self.computefunc, 16, piecemeal, 0, result,
+                                      numpy.array([-1.0]), (data,), numpy.array([-2.0]))
+        self.assertTrue(numpy.array_equal(result, data))
+        self.assertEqual(len(self.calls), 10)
+
+
+    def test02InputsNotSplit(self):
+        '''
+        Tests inputs that do not influence the split axis, that have
+        a single point along the split axis, or that are not arrays,
+        are given whole to every piece
+        '''
+        data = numpy.arange(3.0 * 8.0).reshape((3, 8, 1, 1, 1, 1), order='F')
+        # does not influence Y of the result, so may have any length along Y
+        coeffs = numpy.ones((3, 5, 1, 1, 1, 1), order='F')
+        # a single point along Y
+        offsets = numpy.array([1.0, 2.0, 3.0]).reshape((3, 1, 1, 1, 1, 1), order='F')
+        influences = ( ( True, ) * 6,
+                       ( True, False, True, True, True, True ),
+                       ( True, ) * 6,
+                       ( True, ) * 6, )
+        result = numpy.zeros(data.shape, order='F')
+        pyefmethods._parallel_compute(self.computefunc, 4, (False, True) + (False,) * 4, 0,
+                                      result, numpy.array([-1.0]),
+                                      (data, coeffs[:, :1], offsets, "NAME"),
+                                      numpy.array([-2.0, -3.0, -4.0, -5.0]),
+                                      influences=influences)
+        self.assertTrue(numpy.array_equal(result, data + 1.0 + offsets))
+        self.assertEqual(len(self.calls), 4)
+        for (resshape, inpshapes, maskshapes) in self.calls:
+            self.assertEqual(resshape, (3, 2, 1, 1, 1, 1))
+            self.assertEqual(inpshapes, ((3, 2, 1, 1, 1, 1), (3, 1, 1, 1, 1, 1),
+                                         (3, 1, 1, 1, 1, 1), ()))
+        # an input without influence on the split axis may have a different length
+        self.calls = [ ]
+        result = numpy.zeros(data.shape, order='F')
+        pyefmethods._parallel_compute(lambda efid, res, bdf, inps, bdfs: \
+                                          self.computefunc(efid, res, bdf, inps[:1], bdfs),
+                                      4, (False, True) + (False,) * 4, 0,
+                                      result, numpy.array([-1.0]), (data, coeffs),
+                                      numpy.array([-2.0, -3.0]), influences=influences)
+        self.assertTrue(numpy.array_equal(result, data))
+        self.assertEqual(len(self.calls), 4)
+
+
+    def test03ExtendedInputNotSplit(self):
+        '''
+        Tests the result is computed in one call when an input
+        influencing the split axis is extended along that axis
+        '''
+        data = numpy.arange(12.0).reshape((1, 12, 1, 1, 1, 1), order='F')
+        result = numpy.zeros((1, 10, 1, 1, 1, 1), order='F')
+        pyefmethods._parallel_compute(lambda efid, res, bdf, inps, bdfs: \
+                                          self.computefunc(efid, res, bdf, (inps[0][:, 1:11],), bdfs),
+                                      4, (True,) * 6, 0, result, numpy.array([-1.0]),
+                                      (data,), numpy.array([-2.0]))
+        self.assertTrue(numpy.array_equal(result, data[:, 1:11]))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0][0], (1, 10, 1, 1, 1, 1))
+        # no piecemeal axes, so also not split
+        self.calls = [ ]
+        result = numpy.zeros(data.shape, order='F')
+        pyefmethods._parallel_compute(self.computefunc, 4, None, 0, result,
+                                      numpy.array([-1.0]), (data,), numpy.array([-2.0]))
+        self.assertTrue(numpy.array_equal(result, data))
+        self.assertEqual(len(self.calls), 1)
+
+
+    def test04MasksSplit(self):
+        '''
+        Tests the masks of the inputs are split along with their inputs
+        '''
+        data = numpy.arange(6.0 * 4.0).reshape((6, 1, 1, 4, 1, 1), order='F')
+        mask = ( (numpy.arange(24) % 5) != 2 ).reshape(data.shape, order='F')
+        result = numpy.zeros(data.shape, order='F')
+        pyefmethods._parallel_compute(self.computefunc, 3, (False, False, False, True, False, False),
+                                      0, result, numpy.array([-1.0]), (data,),
+                                      numpy.array([-2.0]), input_masks=(mask,))
+        self.assertTrue(numpy.array_equal(result, numpy.where(mask, data, -1.0)))
+        self.assertEqual(len(self.calls), 3)
+        shapes = sorted([ call[0][3] for call in self.calls ])
+        self.assertEqual(shapes, [1, 1, 2])
+        for (resshape, inpshapes, maskshapes) in self.calls:
+            self.assertEqual(inpshapes, (resshape,))
+            self.assertEqual(maskshapes, (resshape,))
+
+
+    def test05PieceException(self):
+        '''
+        Tests an exception raised by computefunc for one piece is
+        raised by _parallel_compute
+        '''
+        def failingfunc(efid, result, result_bdf, inputs, input_bdfs):
+            if numpy.any(inputs[0] == 7.0):
+                raise ValueError("failed piece")
+            result[:] = inputs[0]
+        data = numpy.arange(10.0).reshape((10, 1, 1, 1, 1, 1), order='F')
+        result = numpy.zeros(data.shape, order='F')
+        self.assertRaises(ValueError, pyefmethods._parallel_compute, failingfunc, 5,
+                          (True,) * 6, 0, result, numpy.array([-1.0]), (data,),
+                          numpy.array([-2.0]))
+        # the other pieces were still computed
+        self.assertTrue(numpy.array_equal(result[:6], data[:6]))
+
+
+if __name__ == "__main__":
+    '''
+    Run the unit tests in this module.
+    '''
+    unittest.main()
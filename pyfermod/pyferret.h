@@ -104,6 +104,34 @@ void FORTRAN(window_killed)(void **deadwinobj);
 #define COMPUTE_METHOD_NAME "ferret_compute"
 #define CUSTOM_AXES_METHOD_NAME "ferret_custom_axes"
 #define RESULT_LIMITS_METHOD_NAME "ferret_result_limits"
+/* Method in pyferret.pyefmethods for computing pieces of a result in parallel */
+#define PARALLEL_COMPUTE_METHOD_NAME "_parallel_compute"
+
+/* Same values as EF_MAX_ARGS and EF_MAX_DESCRIPTION_LENGTH in EF_Util.h */
+#define PYEFCN_MAX_ARGS 9
+#define PYEFCN_MAX_MODNAME_LENGTH 128
+
+/*
+ * Information cached in the registry for a Python-backed external function.
+ * The references to the module, the ferret_compute method (NULL if not
+ * found), and the dictionary returned from ferret_init are held by the
+ * registry.  The values used by pyefcn_compute are parsed from the
+ * dictionary, with defaults assigned for any values not given.
+ */
+typedef struct PyEFcnInfo_ {
+    struct PyEFcnInfo_ *next;
+    int       id;
+    char      modname[PYEFCN_MAX_MODNAME_LENGTH];
+    PyObject *usermod;
+    PyObject *computefunc;
+    PyObject *initdict;
+    int       restype;
+    int       resstrlen;
+    int       argtypes[PYEFCN_MAX_ARGS];
+    int       argmasks[PYEFCN_MAX_ARGS];
+    int       anyargmasks;
+    int       parallel;
+} PyEFcnInfo;
 
 /* My external function argument types */
 #define FLOAT_ARRAY 9
@@ -139,6 +167,13 @@ void FORTRAN(window_killed)(void **deadwinobj);
  *     "piecemeal": 6-tuple (X,Y,Z,T,E,F) of True or False indicating if it is
  *                  acceptable to break up the calculation, if needed, along the
  *                  corresponding axis [optional; default: False for each axis]
+ *     "parallel": True, False, or the number of threads; if not False, pieces of each
+ *                 computation are split along a piecemeal axis and computed concurrently
+ *                 by a pool of threads (of the number of CPUs if True)
+ *                 [optional; default: False]
+ *     "argmasks": True, False, or N-tuple of True or False indicating whether ferret_compute
+ *                 is given a mask of the defined values of the corresponding FLOAT_ARRAY input
+ *                 argument (True for every FLOAT_ARRAY argument) [optional; default: False]
  *     "argnames": N-tuple of names for the input arguments [optional, default: (A, B, ...)]
  *     "argdescripts": N-tuple of descriptions for the input arguments
  *                     [optional, default: no descriptions]
@@ -270,6 +305,19 @@ void pyefcn_custom_axes(int id, char modname[], char errmsg[]);
  *     input_badvals - a NumPy ndarray of one dimension containing
  *         the bad-data-flag values for each of the input arrays.
  *
+ * If "argmasks" was given in the ferret_init dictionary, the signature is instead:
+ *
+ *     ferret_compute(id, result_array, result_badval, input_arrays, input_badvals, input_masks)
+ *
+ * where input_masks is a tuple, with an item for each input argument, of either None
+ * or a read-only NumPy boolean ndarray, of the same shape as the input array, which
+ * is True where the input value is defined (neither NaN nor the bad-data-flag value).
+ * These masks are built in a single pass over the data in pyefcn_compute.
+ *
+ * If "parallel" was given in the ferret_init dictionary, pieces of result_array
+ * (and the corresponding pieces of the input arrays) are passed to concurrent calls
+ * to ferret_compute using the _parallel_compute method in pyferret.pyefmethods.
+ *
  * Any return value from ferret_compute is ignored.
  * If an exception is raised, Ferret is notified that an error occurred using
  * the message of the exception.
@@ -308,6 +356,40 @@ void pyefcn_compute(int id, char modname[], double *arrays[], int numarrays,
                     int steplo[][MAX_FERRET_NDIM], int stephi[][MAX_FERRET_NDIM],
                     int incr[][MAX_FERRET_NDIM], double badvals[], char errmsg[]);
 
+/*
+ * Records, in the registry of Python-backed external functions, the module
+ * usermod (named modname) and the dictionary initdict returned by its
+ * ferret_init method for the function with Ferret's ID id, replacing any
+ * previous information for this ID.  New references to usermod and initdict
+ * are held by the registry.  Called by pyefcn_init whenever a function is
+ * defined (or redefined) so the other pyefcn functions do not need to
+ * import the module and call ferret_init.  Returns the registered
+ * information, or NULL if out of memory or modname is too long.
+ */
+PyEFcnInfo *pyefcn_register(int id, char modname[], PyObject *usermod, PyObject *initdict);
+
+/*
+ * Returns the registered information for the Python-backed external function
+ * with Ferret's ID id and module name modname.  If not registered, the module
+ * is imported, its ferret_init method is called, and the results registered.
+ * The returned pointer is only valid until the function is unregistered or
+ * registered again.  If an error occurs, NULL is returned and an error
+ * message is assigned to errmsg.
+ */
+PyEFcnInfo *pyefcn_lookup(int id, char modname[], char errmsg[]);
+
+/*
+ * Removes any information in the registry for the Python-backed external 
+ * function with Ferret's ID id.
+ */
+void pyefcn_unregister(int id);
+
+/*
+ * Removes all information in the registry of Python-backed external functions.
+ * Called when Ferret is stopped since the function IDs are no longer valid.
+ */
+void pyefcn_clear_registry(void);
+
 /*
  * Returns the message from a Python exception, and clear the exception.
  * If an exception was raised with no message, a default error message
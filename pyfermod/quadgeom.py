@@ -0,0 +1,441 @@
+'''
+Vectorized geometry of the quadrilaterals of curvilinear grids: planar
+and spherical centroids and areas, and conversion of the 3D formats of
+corner coordinates to the 2D format.  The results of the spherical
+functions and of the conversion are memoized, keyed by a hash of the
+coordinate arrays, since the same (large) grids are commonly used over
+and over again.  Memoized results are returned as read-only arrays; copy
+them if they need to be modified.  The planar functions are cheaper to
+compute than to hash their arguments, so they are not memoized.
+
+Unless noted otherwise, quadrilateral [i,j] is formed by the 2D corner
+point arrays ptx and pty (longitudes and latitudes, in degrees, for the
+spherical functions) by joining the consecutive points
+    ( ptx[i,   j],   pty[i,   j] ) ,
+    ( ptx[i+1, j],   pty[i+1, j] ) ,
+    ( ptx[i+1, j+1], pty[i+1, j+1] ) ,
+    ( ptx[i,   j+1], pty[i,   j+1] ) ,
+    ( ptx[i,   j],   pty[i,   j] )
+so the arrays returned have a shape one smaller in the first two
+dimensions compared to ptx and pty.  Any further dimensions are
+carried through.  The edges of the quadrilaterals are straight lines
+for the planar functions, and great circle arcs for the spherical
+functions.
+'''
+
+import collections
+import hashlib
+import numpy
+
+# Maximum total number of bytes of the arrays kept by the memoization;
+# results larger than this are not saved
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Memoized results, keyed by function name and hash of the arguments
+_CACHE = collections.OrderedDict()
+
+# Total number of bytes of the arrays in _CACHE
+_CACHE_BYTES = 0
+
+
+def arrayskey(*arrays):
+    '''
+    Returns a key (a string of hexadecimal digits) from a hash of the
+    given arrays.  The shape and the type of each array, as well as the
+    values, are part of the hash.  Any value may be None or a string.
+    '''
+    hasher = hashlib.sha1()
+    for arr in arrays:
+        if arr is None:
+            hasher.update(b'None')
+            continue
+        if isinstance(arr, str):
+            hasher.update(('str%d:%s' % (len(arr), arr)).encode('utf-8'))
+            continue
+        arr = numpy.ascontiguousarray(arr)
+        hasher.update(('%s%s' % (arr.dtype.str, str(arr.shape))).encode('utf-8'))
+        hasher.update(arr.view(numpy.uint8).reshape(-1))
+    return hasher.hexdigest()
+
+
+def clearcache():
+    '''
+    Removes all memoized results.
+    '''
+    global _CACHE_BYTES
+    _CACHE.clear()
+    _CACHE_BYTES = 0
+
+
+def _memoized(funcname, compute, *arrays):
+    '''
+    Returns the memoized result of compute(*arrays), a tuple of arrays,
+    computing and saving the (read-only) result if not already present.
+    The least recently used results are removed to keep the total size
+    of the saved arrays within CACHE_MAX_BYTES.
+    '''
+    global _CACHE_BYTES
+    key = funcname + ':' + arrayskey(*arrays)
+    result = _CACHE.get(key)
+    if result is not None:
+        _CACHE.move_to_end(key)
+        return result
+    result = compute(*arrays)
+    for arr in result:
+        arr.setflags(write=False)
+    nbytes = sum(arr.nbytes for arr in result)
+    if nbytes > CACHE_MAX_BYTES:
+        return result
+    while _CACHE and (_CACHE_BYTES + nbytes > CACHE_MAX_BYTES):
+        (_, oldresult) = _CACHE.popitem(last=False)
+        _CACHE_BYTES -= sum(arr.nbytes for arr in oldresult)
+    _CACHE[key] = result
+    _CACHE_BYTES += nbytes
+    return result
+
+
+def _cornerarrays(ptx, pty, funcname):
+    '''
+    Returns ptx and pty as float64 arrays, checking they are valid
+    '''
+    xarray = numpy.asarray(ptx, dtype=numpy.float64)
+    yarray = numpy.asarray(pty, dtype=numpy.float64)
+    if len(xarray.shape) < 2:
+        raise ValueError("ptx and pty in %s must be (at least) two dimensional" % funcname)
+    if xarray.shape != yarray.shape:
+        raise ValueError("ptx and pty in %s must have the same shape" % funcname)
+    return (xarray, yarray)
+
+
+def _quadcorners(arr):
+    '''
+    Returns the four corners of the quadrilaterals from the 2D corner array arr
+    '''
+    return (arr[:-1, :-1], arr[1:, :-1], arr[1:, 1:], arr[:-1, 1:])
+
+
+def _computeplanarareas(ptx, pty):
+    '''
+    Computes the signed planar areas; see planarquadareas
+    '''
+    (x0, x1, x2, x3) = _quadcorners(ptx)
+    (y0, y1, y2, y3) = _quadcorners(pty)
+    areas = 0.5 * ((x0 * y1 - x1 * y0) + (x1 * y2 - x2 * y1) +
+                   (x2 * y3 - x3 * y2) + (x3 * y0 - x0 * y3))
+    return (areas,)
+
+
+def planarquadareas(ptx, pty):
+    '''
+    Returns the signed areas of planar quadrilaterals using the Surveyor's
+    formula; positive areas are for counterclockwise vertex sequences.
+    Raises a ValueError if ptx and pty are not valid.
+    '''
+    (xarray, yarray) = _cornerarrays(ptx, pty, "planarquadareas")
+    return _computeplanarareas(xarray, yarray)[0]
+
+
+def _computeplanarcentroids(ptx, pty):
+    '''
+    Computes the planar centroids; see planarquadcentroids
+    '''
+    (x0, x1, x2, x3) = _quadcorners(ptx)
+    (y0, y1, y2, y3) = _quadcorners(pty)
+    side01 = x0 * y1 - x1 * y0
+    side12 = x1 * y2 - x2 * y1
+    side23 = x2 * y3 - x3 * y2
+    side30 = x3 * y0 - x0 * y3
+    sixareas = 3.0 * (side01 + side12 + side23 + side30)
+    ctrx  = (x0 + x1) * side01
+    ctrx += (x1 + x2) * side12
+    ctrx += (x2 + x3) * side23
+    ctrx += (x3 + x0) * side30
+    ctrx /= sixareas
+    ctry  = (y0 + y1) * side01
+    ctry += (y1 + y2) * side12
+    ctry += (y2 + y3) * side23
+    ctry += (y3 + y0) * side30
+    ctry /= sixareas
+    return (ctrx, ctry)
+
+
+def planarquadcentroids(ptx, pty):
+    '''
+    Returns the centroids (ctrx, ctry) of planar quadrilaterals using
+    the Surveyor's formula.  Raises a ValueError if ptx and pty are not
+    valid.
+    '''
+    (xarray, yarray) = _cornerarrays(ptx, pty, "planarquadcentroids")
+    return _computeplanarcentroids(xarray, yarray)
+
+
+def _computeaveragecenters(ptx, pty):
+    '''
+    Computes the average of the corners; see quadaveragecenters
+    '''
+    (x0, x1, x2, x3) = _quadcorners(ptx)
+    (y0, y1, y2, y3) = _quadcorners(pty)
+    return (0.25 * (x0 + x1 + x2 + x3), 0.25 * (y0 + y1 + y2 + y3))
+
+
+def quadaveragecenters(ptx, pty):
+    '''
+    Returns the averages (ctrx, ctry) of the corners of quadrilaterals.
+    Raises a ValueError if ptx and pty are not valid.
+    '''
+    (xarray, yarray) = _cornerarrays(ptx, pty, "quadaveragecenters")
+    return _computeaveragecenters(xarray, yarray)
+
+
+def _unitvectors(lons, lats):
+    '''
+    Returns the unit vectors, with the components along a new last axis,
+    of the points on the sphere at the longitudes and latitudes in degrees
+    '''
+    lonrads = numpy.deg2rad(lons)
+    latrads = numpy.deg2rad(lats)
+    coslats = numpy.cos(latrads)
+    return numpy.stack((coslats * numpy.cos(lonrads),
+                        coslats * numpy.sin(lonrads),
+                        numpy.sin(latrads)), axis=-1)
+
+
+def _dot(avecs, bvecs):
+    '''
+    Returns the dot products of the vectors along the last axis
+    '''
+    return (avecs * bvecs).sum(axis=-1)
+
+
+def _computesphericalareas(lons, lats):
+    '''
+    Computes the areas on the unit sphere; see sphericalquadareas
+    '''
+    pts = _unitvectors(lons, lats)
+    (p0, p1, p2, p3) = _quadcorners(pts)
+    # Signed spherical excess of the triangles (p0,p1,p2) and (p0,p2,p3)
+    # (Van Oosterom and Strackee); the sum is the area of the quadrilateral
+    excess = 0.0
+    for (a, b, c) in ((p0, p1, p2), (p0, p2, p3)):
+        triple = _dot(a, numpy.cross(b, c))
+        excess = excess + 2.0 * numpy.arctan2(triple,
+                          1.0 + _dot(a, b) + _dot(b, c) + _dot(c, a))
+    return (numpy.abs(excess),)
+
+
+def sphericalquadareas(lons, lats, radius=1.0):
+    '''
+    Returns the areas of the quadrilaterals, with great circle edges, on
+    a sphere of the given radius.  The corner longitudes and latitudes
+    are in degrees.  Raises a ValueError if lons and lats are not valid.
+    '''
+    (lonarray, latarray) = _cornerarrays(lons, lats, "sphericalquadareas")
+    areas = _memoized("sphericalquadareas", _computesphericalareas, lonarray, latarray)[0]
+    if radius == 1.0:
+        return areas
+    return areas * (radius * radius)
+
+
+def _computesphericalcentroids(lons, lats):
+    '''
+    Computes the spherical centroids; see sphericalquadcentroids
+    '''
+    pts = _unitvectors(lons, lats)
+    corners = _quadcorners(pts)
+    # The integral of the position vector over the area of a spherical
+    # polygon is half the sum, over the edges, of the angle of the edge
+    # times the unit normal of its great circle (for counterclockwise edges)
+    moment = numpy.zeros(corners[0].shape, dtype=numpy.float64)
+    for k in range(4):
+        (a, b) = (corners[k], corners[(k + 1) % 4])
+        normals = numpy.cross(a, b)
+        sines = numpy.sqrt(_dot(normals, normals))
+        angles = numpy.arctan2(sines, _dot(a, b))
+        scales = numpy.where(sines > 0.0, angles / numpy.where(sines > 0.0, sines, 1.0), 0.0)
+        moment += (0.5 * scales)[..., numpy.newaxis] * normals
+    # Correct for clockwise quadrilaterals; degenerate quadrilaterals
+    # (no area) use the average of the corners
+    average = corners[0] + corners[1] + corners[2] + corners[3]
+    signs = numpy.sign(_dot(moment, average))
+    moment = numpy.where((signs == 0.0)[..., numpy.newaxis], average,
+                         signs[..., numpy.newaxis] * moment)
+    ctrlats = numpy.rad2deg(numpy.arctan2(moment[..., 2],
+                            numpy.hypot(moment[..., 0], moment[..., 1])))
+    ctrlons = numpy.rad2deg(numpy.arctan2(moment[..., 1], moment[..., 0]))
+    # Keep the longitudes within 180 degrees of the first corner
+    reflons = lons[:-1, :-1]
+    ctrlons = reflons + numpy.mod(ctrlons - reflons + 180.0, 360.0) - 180.0
+    return (ctrlons, ctrlats)
+
+
+def sphericalquadcentroids(lons, lats):
+    '''
+    Returns the centroids (ctrlons, ctrlats) of the quadrilaterals, with
+    great circle edges, on a sphere; that is, the points on the sphere in
+    the direction of the center of mass of each quadrilateral.  The corner
+    longitudes and latitudes, and the centroid longitudes and latitudes
+    returned, are in degrees.  The centroid longitudes are within 180
+    degrees of the first corner longitude of each quadrilateral.
+    Raises a ValueError if lons and lats are not valid.
+    '''
+    (lonarray, latarray) = _cornerarrays(lons, lats, "sphericalquadcentroids")
+    return _memoized("sphericalquadcentroids", _computesphericalcentroids,
+                     lonarray, latarray)
+
+
+def _computecornersfrom3d(ptx3d, pty3d):
+    '''
+    Converts the 3D format of corner points; see quadcornersfrom3d
+    '''
+    # relative and absolute tolerances to be used in numpy.allclose
+    rtol = 1.0E-4
+    atol = 1.0E-6
+
+    if not (numpy.allclose(ptx3d[1:, 1:, 0], ptx3d[:-1, :-1, 2], rtol, atol) and \
+            numpy.allclose(pty3d[1:, 1:, 0], pty3d[:-1, :-1, 2], rtol, atol)):
+        raise ValueError("Unexpected ptx3d, pty3d values in quadcornersfrom3d")
+
+    # Check if corners are:
+    #     3 --- 2        1 --- 2
+    #    /     /   or   /     /
+    #   0 --- 1        0 --- 3
+    # and assign appropriately.
+    if numpy.allclose(ptx3d[1:, :, 0], ptx3d[:-1, :, 1], rtol, atol) and \
+       numpy.allclose(pty3d[1:, :, 0], pty3d[:-1, :, 1], rtol, atol) and \
+       numpy.allclose(ptx3d[:, 1:, 0], ptx3d[:, :-1, 3], rtol, atol) and \
+       numpy.allclose(pty3d[:, 1:, 0], pty3d[:, :-1, 3], rtol, atol):
+        (inext, jnext) = (1, 3)
+    elif numpy.allclose(ptx3d[1:, :, 0], ptx3d[:-1, :, 3], rtol, atol) and \
+         numpy.allclose(pty3d[1:, :, 0], pty3d[:-1, :, 3], rtol, atol) and \
+         numpy.allclose(ptx3d[:, 1:, 0], ptx3d[:, :-1, 1], rtol, atol) and \
+         numpy.allclose(pty3d[:, 1:, 0], pty3d[:, :-1, 1], rtol, atol):
+        (inext, jnext) = (3, 1)
+    else:
+        raise ValueError("Unexpected ptx3d, pty3d values in quadcornersfrom3d")
+
+    corners_shape = (ptx3d.shape[0] + 1, ptx3d.shape[1] + 1)
+    result = [ ]
+    for pt3d in (ptx3d, pty3d):
+        pt = numpy.empty(corners_shape, dtype=numpy.float64)
+        pt[0, 0] = pt3d[0, 0, 0]
+        pt[0, 1:] = pt3d[0, :, jnext]
+        pt[1:, 0] = pt3d[:, 0, inext]
+        pt[1:, 1:] = pt3d[:, :, 2]
+        result.append(pt)
+    return tuple(result)
+
+
+def quadcornersfrom3d(ptx3d, pty3d):
+    '''
+    Converts 3D formats of curvilinear corner coordinates, where
+    quad[i,j] is formed by the consecutive corner points
+    (ptx3d[i,j,k], pty3d[i,j,k]) for k = 0, 1, 2, 3, 0 in either
+    of the orders represented (using k) by:
+          3 --- 2        1 --- 2
+         /     /   or   /     /
+        0 --- 1        0 --- 3
+    to the 2D format (ptx, pty) described in this module.  Neighboring
+    quadrilaterals must share edges.  Raises a ValueError if ptx3d or
+    pty3d do not fit one of the expected formats.
+    '''
+    xarray = numpy.asarray(ptx3d, dtype=numpy.float64)
+    yarray = numpy.asarray(pty3d, dtype=numpy.float64)
+    if (xarray.shape != yarray.shape) or (len(xarray.shape) != 3) or \
+       (xarray.shape[2] != 4):
+        raise ValueError("ptx3d and pty3d in quadcornersfrom3d must have " \
+                         "the same shape, with four values along the third axis")
+    return _memoized("quadcornersfrom3d", _computecornersfrom3d, xarray, yarray)
+
+
+#
+# The following is only for testing this module from the command line
+#
+if __name__ == "__main__":
+
+    # Planar areas and centroids of a parallelogram
+    xvals = numpy.array(( ( 0.0, 1.0 ), ( 3.0, 4.0 ) ))
+    yvals = numpy.array(( ( 0.0, 2.0 ), ( 1.0, 3.0 ) ))
+    areas = planarquadareas(xvals, yvals)
+    if not numpy.allclose(areas, [[ 5.0 ]]):
+        raise ValueError("Planar areas: expected 5.0; found %s" % str(areas))
+    (ctrx, ctry) = planarquadcentroids(xvals, yvals)
+    if not (numpy.allclose(ctrx, [[ 2.0 ]]) and numpy.allclose(ctry, [[ 1.5 ]])):
+        raise ValueError("Planar centroids: expected (2.0, 1.5); found (%s, %s)" % \
+                         (str(ctrx), str(ctry)))
+    print("planar quadrilaterals: SUCCESS")
+
+    # Spherical areas of a lon/lat grid covering the whole sphere sum to 4 pi
+    (lats, lons) = numpy.meshgrid(numpy.linspace(-90.0, 90.0, 19),
+                                  numpy.linspace(0.0, 360.0, 37))
+    areas = sphericalquadareas(lons, lats)
+    if not numpy.allclose(areas.sum(), 4.0 * numpy.pi):
+        raise ValueError("Spherical areas: expected sum of 4 pi; found %s" % str(areas.sum()))
+    # memoized results are the same read-only arrays
+    if sphericalquadareas(lons.copy(), lats.copy()) is not areas:
+        raise ValueError("Spherical areas were not memoized")
+    if areas.flags.writeable:
+        raise ValueError("Memoized spherical areas are writeable")
+    # an octant of the sphere as a quadrilateral with a degenerate edge
+    lons = numpy.array(( ( 0.0, 0.0 ), ( 90.0, 0.0 ) ))
+    lats = numpy.array(( ( 0.0, 90.0 ), ( 0.0, 90.0 ) ))
+    areas = sphericalquadareas(lons, lats, 2.0)
+    if not numpy.allclose(areas, [[ 2.0 * numpy.pi ]]):
+        raise ValueError("Spherical areas: expected 2 pi; found %s" % str(areas))
+    print("spherical areas: SUCCESS")
+
+    # Spherical centroids of symmetric quadrilaterals
+    lons = numpy.array(( ( -10.0, -10.0 ), ( 10.0, 10.0 ) ))
+    lats = numpy.array(( ( -20.0, 20.0 ), ( -20.0, 20.0 ) ))
+    (ctrlons, ctrlats) = sphericalquadcentroids(lons, lats)
+    if not (numpy.allclose(ctrlons, 0.0) and numpy.allclose(ctrlats, 0.0, atol=1.0E-12)):
+        raise ValueError("Spherical centroids: expected (0, 0); found (%s, %s)" % \
+                         (str(ctrlons), str(ctrlats)))
+    lons = numpy.array(( ( 350.0, 350.0 ), ( 370.0, 370.0 ) ))
+    lats = numpy.array(( ( 40.0, 60.0 ), ( 40.0, 60.0 ) ))
+    (ctrlons, ctrlats) = sphericalquadcentroids(lons, lats)
+    if not numpy.allclose(ctrlons, 360.0):
+        raise ValueError("Spherical centroid longitude: expected 360; found %s" % str(ctrlons))
+    # great circle edges bow toward the pole, and the area is larger toward the equator
+    if not ((ctrlats > 49.0) and (ctrlats < 51.0)):
+        raise ValueError("Spherical centroid latitude: unexpected value %s" % str(ctrlats))
+    # small quadrilaterals are nearly planar
+    lons = numpy.array(( ( 0.0, 0.001 ), ( 0.003, 0.004 ) ))
+    lats = numpy.array(( ( 0.0, 0.002 ), ( 0.001, 0.003 ) ))
+    (ctrlons, ctrlats) = sphericalquadcentroids(lons, lats)
+    if not (numpy.allclose(ctrlons, 0.002) and numpy.allclose(ctrlats, 0.0015)):
+        raise ValueError("Small spherical centroids: expected (0.002, 0.0015); found (%s, %s)" % \
+                         (str(ctrlons), str(ctrlats)))
+    print("spherical centroids: SUCCESS")
+
+    # Conversion of 3D corners
+    (ptsy, ptsx) = numpy.meshgrid(numpy.linspace(15.0, 75.0, 7), numpy.linspace(2.0, 10.0, 5))
+    ptsx3d = numpy.stack((ptsx[:-1, :-1], ptsx[1:, :-1], ptsx[1:, 1:], ptsx[:-1, 1:]), axis=-1)
+    ptsy3d = numpy.stack((ptsy[:-1, :-1], ptsy[1:, :-1], ptsy[1:, 1:], ptsy[:-1, 1:]), axis=-1)
+    (cnrx, cnry) = quadcornersfrom3d(ptsx3d, ptsy3d)
+    if not (numpy.allclose(cnrx, ptsx) and numpy.allclose(cnry, ptsy)):
+        raise ValueError("quadcornersfrom3d failed for the 0-1-2-3 order")
+    (cnrx, cnry) = quadcornersfrom3d(ptsx3d[:, :, (0, 3, 2, 1)], ptsy3d[:, :, (0, 3, 2, 1)])
+    if not (numpy.allclose(cnrx, ptsx) and numpy.allclose(cnry, ptsy)):
+        raise ValueError("quadcornersfrom3d failed for the 0-3-2-1 order")
+    print("quadcornersfrom3d: SUCCESS")
+
+    # The memoization is bounded by the total size of the saved arrays
+    clearcache()
+    CACHE_MAX_BYTES = 2 * 36 * 18 * 8
+    (lats, lons) = numpy.meshgrid(numpy.linspace(-90.0, 90.0, 19),
+                                  numpy.linspace(0.0, 360.0, 37))
+    areas = sphericalquadareas(lons, lats)
+    (ctrlons, ctrlats) = sphericalquadcentroids(lons, lats)
+    if (len(_CACHE) != 1) or (_CACHE_BYTES != 2 * 36 * 18 * 8):
+        raise ValueError("Memoization: expected only the centroids; found %d results of %d bytes" % \
+                         (len(_CACHE), _CACHE_BYTES))
+    if sphericalquadcentroids(lons, lats)[0] is not ctrlons:
+        raise ValueError("Memoization: the most recent result was not kept")
+    (lats, lons) = numpy.meshgrid(numpy.linspace(-90.0, 90.0, 37),
+                                  numpy.linspace(0.0, 360.0, 73))
+    sphericalquadareas(lons, lats)
+    if len(_CACHE) != 1:
+        raise ValueError("Memoization: a result larger than CACHE_MAX_BYTES was saved")
+    print("memoization: SUCCESS")
+
+    clearcache()
@@ -6,17 +6,23 @@ safely start and stop ESMP once, and only once, in a Python session.
 @author: Karl Smith
 '''
 
-import numpy
+import pyferret.quadgeom
 
 # Import classes given in modules in this package so they are all seen here.
 try:
-    from esmpcontrol import ESMPControl
-    from regrid2d import CurvRectRegridder
-    from regrid3d import CurvRect3DRegridder
+    from pyferret.regrid.esmpcontrol import ESMPControl
+    from pyferret.regrid.regrid3d import CurvRect3DRegridder
 except ImportError:
     # No ESMP, but do not raise an error until attempting to actually use it
     pass
 
+# Sparse regridding weights and their cache do not require ESMP
+from pyferret.regrid.regridweights import RegridWeightCache, getWeightCache, \
+        weightsKey, weightsFromLinearMap, numProbeRegrids, applyWeights
+from pyferret.regrid.sparseregrid import SparseCurvRectRegridder
+# CurvRectRegridder only requires ESMP for the (default) 'esmp' backend
+from pyferret.regrid.regrid2d import CurvRectRegridder
+
 
 def quadCornersFrom3D(ptx3d, pty3d):
     '''
@@ -60,61 +66,13 @@ def quadCornersFrom3D(ptx3d, pty3d):
     Raises:
         ValueError if ptx3d or pty3d do not fit one of the expected formats
     '''
-    # relative and absolute tolerances to be used in numpy.allclose
-    rtol = 1.0E-4
-    atol = 1.0E-6
-
-    if ptx3d.shape != pty3d.shape:
-        raise ValueError("ptx3d and pty3d in quadCornersFrom3D must have the same shape ")
-    corners_shape = (ptx3d.shape[0] + 1, ptx3d.shape[1] + 1)
-
-    if not (numpy.allclose(ptx3d[1:, 1:, 0], ptx3d[:-1, :-1, 2], rtol, atol) and \
-            numpy.allclose(pty3d[1:, 1:, 0], pty3d[:-1, :-1, 2], rtol, atol)):
-        raise ValueError("Unexpected ptx3d, pty3d values in quadCornersFrom3D")
+    return pyferret.quadgeom.quadcornersfrom3d(ptx3d, pty3d)
 
-    # Check if corners are: 
-    #     3 --- 2        1 --- 2 
-    #    /     /   or   /     / 
-    #   0 --- 1        0 --- 3 
-    # and assign appropriately. 
-    if numpy.allclose(ptx3d[1:, :, 0], ptx3d[:-1, :, 1], rtol, atol) and \
-       numpy.allclose(pty3d[1:, :, 0], pty3d[:-1, :, 1], rtol, atol) and \
-       numpy.allclose(ptx3d[:, 1:, 0], ptx3d[:, :-1, 3], rtol, atol) and \
-       numpy.allclose(pty3d[:, 1:, 0], pty3d[:, :-1, 3], rtol, atol):
-        ptx = numpy.empty(corners_shape, dtype=numpy.float64)
-        ptx[0, 0] = ptx3d[0, 0, 0]
-        ptx[0, 1:] = ptx3d[0, :, 3]
-        ptx[1:, 0] = ptx3d[:, 0, 1]
-        ptx[1:, 1:] = ptx3d[:, :, 2]
-        pty = numpy.empty(corners_shape, dtype=numpy.float64)
-        pty[0, 0] = pty3d[0, 0, 0]
-        pty[0, 1:] = pty3d[0, :, 3]
-        pty[1:, 0] = pty3d[:, 0, 1]
-        pty[1:, 1:] = pty3d[:, :, 2]
-    elif numpy.allclose(ptx3d[1:, :, 0], ptx3d[:-1, :, 3], rtol, atol) and \
-         numpy.allclose(pty3d[1:, :, 0], pty3d[:-1, :, 3], rtol, atol) and \
-         numpy.allclose(ptx3d[:, 1:, 0], ptx3d[:, :-1, 1], rtol, atol) and \
-         numpy.allclose(pty3d[:, 1:, 0], pty3d[:, :-1, 1], rtol, atol):
-        ptx = numpy.empty(corners_shape, dtype=numpy.float64)
-        ptx[0, 0] = ptx3d[0, 0, 0]
-        ptx[0, 1:] = ptx3d[0, :, 1]
-        ptx[1:, 0] = ptx3d[:, 0, 3]
-        ptx[1:, 1:] = ptx3d[:, :, 2]
-        pty = numpy.empty(corners_shape, dtype=numpy.float64)
-        pty[0, 0] = pty3d[0, 0, 0]
-        pty[0, 1:] = pty3d[0, :, 1]
-        pty[1:, 0] = pty3d[:, 0, 3]
-        pty[1:, 1:] = pty3d[:, :, 2]
-    else:
-        raise ValueError("Unexpected ptx3d, pty3d values in quadCornersFrom3D")
 
-    return (ptx, pty)
-
-
-def quadCentroids(ptx, pty):
+def quadCentroids(ptx, pty, spherical=False):
     '''
-    Returns the centroids of quadrilaterals using the Surveyor's formula.
-    The quadilaterals are defined from the 2D corner point numpy arrays
+    Returns the centroids of quadrilaterals, either planar (the default)
+    or on the sphere.  The quadilaterals are defined from the 2D corner point numpy arrays
     ptx and pty, which must have the same shape, where quad[i,j] is formed
     by joined consecutive x,y points in the sequence:
     ( ptx[i,   j],   pty[i,   j] ) ,
@@ -124,28 +82,18 @@ def quadCentroids(ptx, pty):
     ( ptx[i,   j],   pty[i,   j] )
     The ctrx and ctry arrays returned will have a shape one smaller in the
     first two dimensions compared to ptx and pty.
-    '''
-    if ptx.shape != pty.shape:
-        raise ValueError("ptx and pty in quadCentroids must have the same shape")
 
-    side0010 = ptx[:-1, :-1] * pty[1:,  :-1] - ptx[1:,  :-1] * pty[:-1, :-1]
-    side1011 = ptx[1:,  :-1] * pty[1:,  1:]  - ptx[1:,  1:]  * pty[1:,  :-1]
-    side1101 = ptx[1:,  1:]  * pty[:-1, 1:]  - ptx[:-1, 1:]  * pty[1:,  1:]
-    side0100 = ptx[:-1, 1:]  * pty[:-1, :-1] - ptx[:-1, :-1] * pty[:-1, 1:]
-
-    area = 0.5 * (side0010 + side1011 + side1101 + side0100)
-
-    ctrx  = (ptx[:-1, :-1] + ptx[1:,  :-1]) * side0010
-    ctrx += (ptx[1:,  :-1] + ptx[1:,  1:])  * side1011
-    ctrx += (ptx[1:,  1:]  + ptx[:-1, 1:])  * side1101
-    ctrx += (ptx[:-1, 1:]  + ptx[:-1, :-1]) * side0100
-    ctrx /= 6.0 * area
-
-    ctry  = (pty[:-1, :-1] + pty[1:,  :-1]) * side0010
-    ctry += (pty[1:,  :-1] + pty[1:,  1:])  * side1011
-    ctry += (pty[1:,  1:]  + pty[:-1, 1:])  * side1101
-    ctry += (pty[:-1, 1:]  + pty[:-1, :-1]) * side0100
-    ctry /= 6.0 * area
-
-    return (ctrx, ctry)
+    If spherical is False, the edges of the quadrilaterals are straight
+    lines and the planar centroids are computed using the Surveyor's
+    formula.  If spherical is True, ptx and pty are longitudes and
+    latitudes in degrees, the edges of the quadrilaterals are great circle
+    arcs, and the centroids returned are the points on the sphere in the
+    direction of the center of mass of each quadrilateral, with longitudes
+    within 180 degrees of the first corner longitude.
 
+    The (read-only) spherical centroids returned are memoized by
+    pyferret.quadgeom.
+    '''
+    if spherical:
+        return pyferret.quadgeom.sphericalquadcentroids(ptx, pty)
+    return pyferret.quadgeom.planarquadcentroids(ptx, pty)
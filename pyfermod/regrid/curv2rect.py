@@ -1,14 +1,18 @@
 '''
 PyFerret Python External Function (PyEF) for regridding data from
 a curvilinear longitude, latitude grid to a rectilinear longitude,
-latitude grid.  Uses the Ferret2DRegridder class, which in turn
-uses ESMP/ESMF, to perform the regridding.
+latitude grid.  Uses the CurvRectRegridder class, which in turn
+uses ESMP/ESMF, to perform the regridding.  If ESMP is not available,
+the sparse backend of CurvRectRegridder (NumPy and SciPy) is used.
 
 @author: Karl Smith
 '''
 import numpy
 import pyferret
-import ESMP
+try:
+    import ESMP
+except ImportError:
+    ESMP = None
 import pyferret.regrid as regrid
 
 
@@ -16,9 +20,9 @@ def ferret_init(efid):
     '''
     Initializes the curv2rect function.  Either center or corner curvilinear
     coordinates must be given; both may be given.  If only corner coordinates
-    are given, center coordinates are positioned at the centroid of each cell
-    as computed using the Surveyor's Formula.  If conservative regridding is
-    used, corners must be given.
+    are given, center coordinates are positioned at the centroid on the
+    sphere of each cell (with great circle edges).  If conservative regridding
+    is used, corners must be given.
     '''
     init_dict = { }
     init_dict["numargs"] = 7
@@ -81,14 +85,19 @@ def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
     '''
     # Get the regridding method to use
     methodstr = pyferret.get_arg_one_val(efid, pyferret.ARG7).upper()
-    if methodstr == "BILINEAR":
+    if methodstr not in ("BILINEAR", "PATCH", "CONSERVE"):
+        raise ValueError("Unknown method %s" % methodstr)
+    if ESMP is None:
+        # Regrid using the sparse backend
+        if methodstr == "PATCH":
+            raise ValueError("PATCH method requires ESMP")
+        method = methodstr
+    elif methodstr == "BILINEAR":
         method = ESMP.ESMP_REGRIDMETHOD_BILINEAR
     elif methodstr == "PATCH":
         method = ESMP.ESMP_REGRIDMETHOD_PATCH
-    elif methodstr == "CONSERVE":
-        method = ESMP.ESMP_REGRIDMETHOD_CONSERVE
     else:
-        raise ValueError("Unknown method %s" % methodstr)
+        method = ESMP.ESMP_REGRIDMETHOD_CONSERVE
 
     # Get the template data and missing value
     template_data = inputs[pyferret.ARG6]
@@ -149,7 +158,7 @@ def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
         curv_corner_lats = lats
     elif (lons.shape == corners_shape_3d) and (lats.shape == corners_shape_3d):
         curv_corner_lons, curv_corner_lats = regrid.quadCornersFrom3D(lons, lats)
-    elif method == ESMP.ESMP_REGRIDMETHOD_CONSERVE:
+    elif methodstr == "CONSERVE":
         raise ValueError("CONSERVE method requires " \
                          "curvilinear grid corner coordinates")
     elif (lons.shape == ()) and (lats.shape == ()):
@@ -164,53 +173,92 @@ def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
     if curv_center_lons is None:
         if not curv_corner_lons is None:
             curv_center_lons, curv_center_lats = \
-                regrid.quadCentroids(curv_corner_lons, curv_corner_lats)
+                regrid.quadCentroids(curv_corner_lons, curv_corner_lats, True)
         else:
             raise ValueError("Valid center or corner curvilinear " \
                              "grid coordinates must be given")
 
-    # Make sure ESMP is, or has been, initialized
-    regrid.ESMPControl().startCheckESMP()
-
     # Create the regridder used repeatedly in this function 
-    regridder = regrid.CurvRectRegridder()
-    last_curv_center_ignore = None
-    last_rect_center_ignore = None
-
-    # Increment the depth index last
-    # most likely to change the undefined (e.g., land) mask 
-    for d_idx in range(curv_data.shape[2]):
-        # Arrays are probably in Fortran order, so increment last indices last
-        for f_idx in range(curv_data.shape[5]):
-            for e_idx in range(curv_data.shape[4]):
-                for t_idx in range(curv_data.shape[3]):
-                    # Determine curvilinear center points to ignore from undefined data
-                    curv_center_ignore = ( numpy.abs(curv_data[:, :, d_idx, t_idx,
-                                                e_idx, f_idx] - curv_undef) < 1.0E-7 )
-                    # If mask has changed, need to recreate the curvilinear grid
-                    if (last_curv_center_ignore is None) or \
-                       numpy.any(curv_center_ignore != last_curv_center_ignore):
-                        regridder.createCurvGrid(curv_center_lons, curv_center_lats,
-                                                 curv_center_ignore, curv_corner_lons,
-                                                 curv_corner_lats, None)
-                        last_curv_center_ignore = curv_center_ignore
-                    # Determine rectilinear center points to ignore from undefined data
-                    rect_center_ignore = ( numpy.abs(template_data[:, :, d_idx, t_idx,
-                                                e_idx, f_idx] - template_undef) < 1.0E-7 )
-                    # If mask has changed, need to recreate the rectilinear grid
-                    if (last_rect_center_ignore is None) or \
-                       numpy.any(rect_center_ignore != last_rect_center_ignore):
-                        regridder.createRectGrid(rect_center_lons, rect_center_lats,
-                                                 rect_center_ignore, rect_corner_lons,
-                                                 rect_corner_lats, None)
-                        last_rect_center_ignore = rect_center_ignore
-                    # Assign the curvilinear data
-                    regridder.assignCurvField(curv_data[:, :, d_idx, t_idx, e_idx, f_idx])
-                    # Allocate space for the rectilinear data from the regridding
-                    regridder.assignRectField(None)
-                    # Regrid and assign the rectilinear data to the results array
-                    regrid_data = regridder.regridCurvToRect(result_bdf, method)
-                    result[:, :, d_idx, t_idx, e_idx, f_idx] = regrid_data
+    if ESMP is None:
+        backend = 'sparse'
+    else:
+        backend = 'esmp'
+        # Make sure ESMP is, or has been, initialized
+        regrid.ESMPControl().startCheckESMP()
+    regridder = regrid.CurvRectRegridder(backend=backend)
+    weight_cache = regrid.getWeightCache()
 
-    return
+    # View the data as matrices with the X,Y points in each column
+    # and a column for every Z, T, E, and F slice (in Fortran order)
+    num_slices = int(numpy.prod(curv_data.shape[2:]))
+    num_curv_centers = curv_centers_shape[0] * curv_centers_shape[1]
+    rect_centers_shape = (result.shape[0], result.shape[1])
+    num_rect_centers = rect_centers_shape[0] * rect_centers_shape[1]
+    curv_values = curv_data.reshape((num_curv_centers, num_slices), order='F')
+    template_values = template_data.reshape((num_rect_centers, num_slices), order='F')
+
+    # Determine the center points to ignore from undefined data for all slices
+    curv_ignore = ( numpy.abs(curv_values - curv_undef) < 1.0E-7 )
+    rect_ignore = ( numpy.abs(template_values - template_undef) < 1.0E-7 )
 
+    # Group the slices with the same curvilinear and rectilinear masks
+    packed_masks = numpy.concatenate((numpy.packbits(curv_ignore, axis=0),
+                                      numpy.packbits(rect_ignore, axis=0)), axis=0)
+    group_nums = numpy.unique(packed_masks.T, axis=0, return_inverse=True)[1]
+    group_nums = group_nums.reshape(-1)
+
+    rect_values = numpy.empty((num_rect_centers, num_slices), dtype=numpy.float64)
+    for group in range(int(group_nums.max()) + 1):
+        slices = numpy.nonzero(group_nums == group)[0]
+        curv_center_ignore = curv_ignore[:, slices[0]].reshape(curv_centers_shape, order='F')
+        rect_center_ignore = rect_ignore[:, slices[0]].reshape(rect_centers_shape, order='F')
+        # The weights only depend on the coordinates, masks, and method
+        key = regrid.weightsKey(backend + ' ' + methodstr,
+                                curv_center_lons, curv_center_lats,
+                                curv_corner_lons, curv_corner_lats,
+                                curv_center_ignore, rect_center_lons,
+                                rect_center_lats, rect_corner_lons,
+                                rect_corner_lats, rect_center_ignore)
+        weights = weight_cache.get(key)
+        if weights is None:
+            regridder.createCurvGrid(curv_center_lons, curv_center_lats,
+                                     curv_center_ignore, curv_corner_lons,
+                                     curv_corner_lats, None)
+            regridder.createRectGrid(rect_center_lons, rect_center_lats,
+                                     rect_center_ignore, rect_corner_lons,
+                                     rect_corner_lats, None)
+            if ESMP is None:
+                weights = regridder.getCurvToRectWeights(method)
+                if weights is not None:
+                    weight_cache.put(key, weights)
+            else:
+                # Finding the ESMP weights takes a number of ESMP regrids, so
+                # unless saved to disk, only use up to one regrid per slice
+                if weight_cache.isPersistent():
+                    max_regrids = None
+                else:
+                    max_regrids = len(slices)
+                # Do not repeat probing already known to fail
+                if not weight_cache.probeFailed(key, max_regrids):
+                    weights = regridder.getCurvToRectWeights(method, max_regrids)
+                    if weights is not None:
+                        weight_cache.put(key, weights)
+                    else:
+                        weight_cache.putProbeFailure(key, max_regrids)
+        if weights is None:
+            # Regrid each slice using ESMP
+            for slice_idx in slices:
+                regridder.assignCurvField(curv_values[:, slice_idx] \
+                                          .reshape(curv_centers_shape, order='F'))
+                regridder.assignRectField(None)
+                rect_values[:, slice_idx] = regridder.regridCurvToRect(result_bdf, method) \
+                                                     .flatten('F')
+        else:
+            # Regrid all the slices in the group with one sparse matrix product
+            rect_values[:, slices] = regrid.applyWeights(weights,
+                                            curv_values[:, slices], result_bdf)
+
+    result[:] = rect_values.reshape(result.shape, order='F')
+
+    regridder.finalize()
+    return
@@ -188,17 +188,104 @@ def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
 
     # Create the regridder used repeatedly in this function 
     regridder3d = regrid.CurvRect3DRegridder()
+    weight_cache = regrid.getWeightCache()
+    rect_centers_shape = result.shape[:3]
+    num_curv_centers = curv_centers_shape[0] * curv_centers_shape[1] * \
+                       curv_centers_shape[2]
+
+    def probe_regrid(curv_values):
+        '''
+        Regrids one curvilinear field with ESMP, leaving zero
+        at unassigned rectilinear points, for finding weights
+        '''
+        regridder3d.assignCurvField(curv_values)
+        regridder3d.assignRectField(None)
+        return regridder3d.regridCurvToRect(0.0, method)
+
+    # Are the curvilinear depths different for each time step?
+    depths_vary = (curv_center_zetas is not None) and (curv_data.shape[3] > 1)
+
+    def regrid_slices(slices, curv_center_depths,
+                      curv_center_ignore, rect_center_ignore):
+        '''
+        Regrids the slices (t_idx, e_idx, f_idx), all with the given
+        curvilinear depths and curvilinear and rectilinear center masks
+        '''
+        # The weights only depend on the coordinates, masks, and method;
+        # with time-dependent zetas, the depths differ for every time step
+        # so the weights are never reused and are not cached
+        if not depths_vary:
+            key = regrid.weightsKey('esmp ' + methodstr,
+                                    curv_center_lons, curv_center_lats,
+                                    curv_center_depths, curv_center_ignore,
+                                    rect_center_lons, rect_center_lats,
+                                    rect_center_depths, rect_corner_lons,
+                                    rect_corner_lats, rect_corner_depths,
+                                    rect_center_ignore)
+            weights = weight_cache.get(key)
+        else:
+            key = None
+            weights = None
+        if weights is None:
+            regridder3d.createCurvGrid(curv_center_lons, curv_center_lats,
+                                       curv_center_depths, curv_center_ignore,
+                                       True, None, None, None, None)
+            regridder3d.createRectGrid(rect_center_lons, rect_center_lats,
+                                       rect_center_depths, rect_center_ignore,
+                                       True,
+                                       rect_corner_lons, rect_corner_lats,
+                                       rect_corner_depths, None)
+            # Finding the weights takes a number of ESMP regrids, so unless
+            # saved to disk, only use up to one regrid per slice
+            if (key is not None) and weight_cache.isPersistent():
+                max_regrids = None
+            else:
+                max_regrids = len(slices)
+            # Do not repeat probing already known to fail
+            if (key is None) or not weight_cache.probeFailed(key, max_regrids):
+                weights = regrid.weightsFromLinearMap(probe_regrid,
+                                                      curv_centers_shape, 3, 6,
+                                                      max_regrids)
+                if key is not None:
+                    if weights is not None:
+                        weight_cache.put(key, weights)
+                    else:
+                        weight_cache.putProbeFailure(key, max_regrids)
+        if weights is None:
+            # Regrid each slice using ESMP
+            for (t_idx, e_idx, f_idx) in slices:
+                regridder3d.assignCurvField(curv_data[:, :, :, t_idx, e_idx, f_idx])
+                regridder3d.assignRectField(None)
+                result[:, :, :, t_idx, e_idx, f_idx] = \
+                        regridder3d.regridCurvToRect(result_bdf, method)
+            return
+        # Regrid all the slices with one sparse matrix product
+        curv_values = numpy.empty((num_curv_centers, len(slices)), dtype=numpy.float64)
+        for (k, (t_idx, e_idx, f_idx)) in enumerate(slices):
+            curv_values[:, k] = curv_data[:, :, :, t_idx, e_idx, f_idx].flatten('F')
+        rect_values = regrid.applyWeights(weights, curv_values, result_bdf)
+        for (k, (t_idx, e_idx, f_idx)) in enumerate(slices):
+            result[:, :, :, t_idx, e_idx, f_idx] = \
+                    rect_values[:, k].reshape(rect_centers_shape, order='F')
+
+    # Collect consecutive slices with the same depths and masks to regrid together
+    slices = [ ]
+    last_curv_center_ignore = None
     last_rect_center_ignore = None
 
-    if curv_center_zetas == None:
+    if curv_center_zetas is None:
         # Create the curvilinear depths array
         curv_center_depths = curv_center_sigmas * curv_center_baths
-        last_curv_center_ignore = None
         
     # Increment the time index last since zeta is time dependent
     for t_idx in range(curv_data.shape[3]):
 
-        if curv_center_zetas != None:
+        if curv_center_zetas is not None:
+            # Different curvilinear depths, so regrid the slices collected so far
+            if slices:
+                regrid_slices(slices, curv_center_depths,
+                              last_curv_center_ignore, last_rect_center_ignore)
+                slices = [ ]
             # Expand the zetas for this time step to 3D - adding Z axis
             zetas = numpy.tile(curv_center_zetas[:,:,t_idx].flatten('F'),
                                curv_centers_shape[2]) \
@@ -206,8 +293,6 @@ def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
             # Create the curvilinear depths array
             curv_center_depths = curv_center_sigmas * (curv_center_baths + \
                                                        zetas) - zetas
-            # Different curvilinear depths, so need to recreate the curvilinear grid
-            last_curv_center_ignore = None
 
         # Arrays are probably in Fortran order, so increment last indices last
         for f_idx in range(curv_data.shape[5]):
@@ -215,32 +300,22 @@ def ferret_compute(efid, result, result_bdf, inputs, input_bdfs):
                 # Determine curvilinear center points to ignore from undefined data
                 curv_center_ignore = ( numpy.abs(curv_data[:, :, :, t_idx,
                                         e_idx, f_idx] - curv_undef) < 1.0E-7 )
-                # If mask has changed, need to recreate the curvilinear grid
-                if (last_curv_center_ignore is None) or \
-                   numpy.any(curv_center_ignore != last_curv_center_ignore):
-                    regridder3d.createCurvGrid(curv_center_lons, curv_center_lats,
-                                               curv_center_depths, curv_center_ignore,
-                                               True, None, None, None, None)
-                    last_curv_center_ignore = curv_center_ignore
                 # Determine rectilinear center points to ignore from undefined data
                 rect_center_ignore = ( numpy.abs(template_data[:, :, :, t_idx,
                                         e_idx, f_idx] - template_undef) < 1.0E-7 )
-                # If mask has changed, need to recreate the rectilinear grid
-                if (last_rect_center_ignore is None) or \
-                   numpy.any(rect_center_ignore != last_rect_center_ignore):
-                    regridder3d.createRectGrid(rect_center_lons, rect_center_lats,
-                                               rect_center_depths, rect_center_ignore,
-                                               True,
-                                               rect_corner_lons, rect_corner_lats,
-                                               rect_corner_depths, None)
-                    last_rect_center_ignore = rect_center_ignore
-                # Assign the curvilinear data
-                regridder3d.assignCurvField(curv_data[:, :, :, t_idx, e_idx, f_idx])
-                # Allocate space for the rectilinear data from the regridding
-                regridder3d.assignRectField(None)
-                # Regrid and assign the rectilinear data to the results array
-                regrid_data = regridder3d.regridCurvToRect(result_bdf, method)
-                result[:, :, :, t_idx, e_idx, f_idx] = regrid_data
+                # If a mask has changed, regrid the slices collected so far
+                if slices and \
+                   ( numpy.any(curv_center_ignore != last_curv_center_ignore) or \
+                     numpy.any(rect_center_ignore != last_rect_center_ignore) ):
+                    regrid_slices(slices, curv_center_depths,
+                                  last_curv_center_ignore, last_rect_center_ignore)
+                    slices = [ ]
+                last_curv_center_ignore = curv_center_ignore
+                last_rect_center_ignore = rect_center_ignore
+                slices.append((t_idx, e_idx, f_idx))
+    if slices:
+        regrid_slices(slices, curv_center_depths,
+                      last_curv_center_ignore, last_rect_center_ignore)
 
+    regridder3d.finalize()
     return
-
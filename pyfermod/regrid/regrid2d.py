@@ -1,13 +1,26 @@
 '''
 Regridder for converting data between a curvilinear longitude,
 latitude grid and a rectilinear longitude, latitude grid.
-Uses the ESMP interface to ESMF to perform the regridding.
+Uses the ESMP interface to ESMF, or sparse matrices of weights computed
+with NumPy and SciPy (see sparseregrid), to perform the regridding.
 
 @author: Karl Smith
 '''
 
 import numpy
-import ESMP
+try:
+    import ESMP
+except ImportError:
+    # Only the sparse backend can be used
+    ESMP = None
+
+try:
+    from pyferret.regrid.regridweights import weightsFromLinearMap
+    from pyferret.regrid.sparseregrid import SparseCurvRectRegridder
+except ImportError:
+    # Run from this directory, as by the unit tests, without pyferret
+    from regridweights import weightsFromLinearMap
+    from sparseregrid import SparseCurvRectRegridder
 
 
 class CurvRectRegridder(object):
@@ -34,16 +47,39 @@ class CurvRectRegridder(object):
 
     See the ESMPControl singleton class to simplify initializing and
     finalizing ESMP once, and only once, for a Python session.
+
+    If created with backend='sparse', the regridding is instead performed
+    by a SparseCurvRectRegridder using sparse matrices of weights computed
+    with NumPy and SciPy; ESMP is not used (and need not be available).
+    Only the BILINEAR and CONSERVE methods are supported by this backend.
     '''
 
 
-    def __init__(self):
+    def __init__(self, backend='esmp'):
         '''
-        Initializes to an empty regridder.  The ESMP module must be
-        imported and ESMP.ESMP_Initialize() called (possibly through
-        invoking ESMPControl().startCheckESMP()) prior to calling
-        any methods in this instance.
+        Initializes to an empty regridder.  For the 'esmp' backend, the
+        ESMP module must be imported and ESMP.ESMP_Initialize() called
+        (possibly through invoking ESMPControl().startCheckESMP()) prior
+        to calling any methods in this instance.
+
+        Arguments:
+            backend: 'esmp' to regrid using ESMP, or 'sparse' to regrid
+                     using sparse matrices of weights computed with
+                     NumPy and SciPy
+        Raises:
+            ValueError: if backend is not valid, or is 'esmp' but
+                        the ESMP module is not available
         '''
+        # the sparse backend regridder, if used
+        if backend == 'sparse':
+            self.__sparse = SparseCurvRectRegridder()
+        elif backend != 'esmp':
+            raise ValueError("Unknown regridding backend %s" % str(backend))
+        elif ESMP is None:
+            raise ValueError("The ESMP module is not available; " \
+                             "use the 'sparse' backend")
+        else:
+            self.__sparse = None
         # tuples giving the shape of the grid (defined by number of cells)
         self.__curv_shape = None
         self.__rect_shape = None
@@ -101,6 +137,9 @@ class CurvRectRegridder(object):
                         invalid, or if a value in an argument is invalid
             TypeError:  if an argument is not array-like
         '''
+        if self.__sparse is not None:
+            return self.__sparse.createCurvGrid(center_lons, center_lats, center_ignore,
+                                                corner_lons, corner_lats, corner_ignore)
         # Make sure center_lons is an appropriate array-like argument
         center_lons_array = numpy.array(center_lons, dtype=numpy.float64, copy=False)
         if len(center_lons_array.shape) != 2:
@@ -287,6 +326,8 @@ class CurvRectRegridder(object):
                         if a value in data is not numeric
             TypeError:  if data, if not None, is not array-like
         '''
+        if self.__sparse is not None:
+            return self.__sparse.assignCurvField(data)
         if data == None:
 
             # Create the curvilinear destination ESMP_Field if it does not exist
@@ -363,6 +404,9 @@ class CurvRectRegridder(object):
                         invalid, or if a value in an argument is invalid
             TypeError:  if an argument is not array-like
         '''
+        if self.__sparse is not None:
+            return self.__sparse.createRectGrid(center_lons, center_lats, center_ignore,
+                                                corner_lons, corner_lats, corner_ignore)
         # Make sure center_lons is an appropriate array-like argument
         center_lons_array = numpy.array(center_lons, dtype=numpy.float64, copy=False)
         if len(center_lons_array.shape) != 1:
@@ -558,6 +602,8 @@ class CurvRectRegridder(object):
                         if a value in data is not numeric
             TypeError:  if data, if not None, is not array-like
         '''
+        if self.__sparse is not None:
+            return self.__sparse.assignRectField(data)
         if data == None:
 
             # Create the rectilinear destination ESMP_Field if it does not exist
@@ -592,7 +638,7 @@ class CurvRectRegridder(object):
 
 
     def regridCurvToRect(self, undef_val,
-                         method=ESMP.ESMP_REGRIDMETHOD_BILINEAR):
+                         method=None):
         '''
         Regrids from the curvilinear source ESMP_Field to the rectilinear
         destination ESMP_Field using the given regridding method.  Reuses
@@ -614,6 +660,8 @@ class CurvRectRegridder(object):
                            ESMP.ESMP_REGRIDMETHOD_BILINEAR
                            ESMP.ESMP_REGRIDMETHOD_CONSERVE
                            ESMP.ESMP_REGRIDMETHOD_PATCH
+                       or None for bilinear; the sparse backend also
+                       accepts the names "BILINEAR" and "CONSERVE".
                        Conservative regridding requires that both
                        corner and center point coordinates are
                        defined in the grids.
@@ -627,11 +675,15 @@ class CurvRectRegridder(object):
                         the rectilinear destination ESMP_Field does not
                         exist.
         '''
+        if self.__sparse is not None:
+            return self.__sparse.regridCurvToRect(undef_val, method)
         # Check that the source and destination fields exist
         if self.__curv_src_field == None:
             raise ValueError("Curvilinear source ESMP_Field does not exist")
         if self.__rect_dest_field == None:
             raise ValueError("Rectilinear destination ESMP_Field does not exist")
+        if method is None:
+            method = ESMP.ESMP_REGRIDMETHOD_BILINEAR
         # Check if a regrid procedure handle already exists for this method
         handle = self.__curv_to_rect_handles.get(method, None)
         # If no handle found, create one
@@ -660,7 +712,7 @@ class CurvRectRegridder(object):
 
 
     def regridRectToCurv(self, undef_val,
-                         method=ESMP.ESMP_REGRIDMETHOD_BILINEAR):
+                         method=None):
         '''
         Regrids from the rectilinear source ESMP_Field to the curvilinear
         destination ESMP_Field using the given regridding method.  Reuses
@@ -682,6 +734,8 @@ class CurvRectRegridder(object):
                            ESMP.ESMP_REGRIDMETHOD_BILINEAR
                            ESMP.ESMP_REGRIDMETHOD_CONSERVE
                            ESMP.ESMP_REGRIDMETHOD_PATCH
+                       or None for bilinear; the sparse backend also
+                       accepts the names "BILINEAR" and "CONSERVE".
                        Conservative regridding requires that both
                        corner and center point coordinates are
                        defined in the grids.
@@ -695,11 +749,15 @@ class CurvRectRegridder(object):
                         the curvilinear destination ESMP_Field does not
                         exist.
         '''
+        if self.__sparse is not None:
+            return self.__sparse.regridRectToCurv(undef_val, method)
         # Check that the source and destination fields exist
         if self.__rect_src_field == None:
             raise ValueError("Rectilinear source ESMP_Field does not exist")
         if self.__curv_dest_field == None:
             raise ValueError("Curvilinear destination ESMP_Field does not exist")
+        if method is None:
+            method = ESMP.ESMP_REGRIDMETHOD_BILINEAR
         # Check if a regrid procedure handle already exists for this method
         handle = self.__rect_to_curv_handles.get(method, None)
         # If no handle found, create one
@@ -727,6 +785,72 @@ class CurvRectRegridder(object):
         return result
 
 
+    def getCurvToRectWeights(self, method=None, max_regrids=None):
+        '''
+        Returns the sparse matrix of weights for regridding from the
+        curvilinear grid center points to the rectilinear grid center
+        points using the given regridding method (see regridCurvToRect).
+        Regridding curvilinear data, as a 1D array in Fortran order, is
+        then regridweights.applyWeights(weights, data, undef_val).
+
+        Prior to calling this method, both grids must have been created.
+        For the ESMP backend, the weights are determined by regridding
+        probe fields (see regridweights.weightsFromLinearMap); the
+        curvilinear source ESMP_Field is then left with probe values,
+        so assignCurvField must be called before regridCurvToRect.
+
+        Arguments:
+            method: regridding method, as in regridCurvToRect
+            max_regrids: maximum number of ESMP regrids to use for finding
+                    the weights (see weightsFromLinearMap), or None for no limit
+        Returns:
+            the weights as a scipy.sparse.csr_matrix of shape (number of
+            rectilinear center points, number of curvilinear center points)
+            or None if the ESMP regridding weights could not be determined
+        '''
+        if self.__sparse is not None:
+            return self.__sparse.getCurvToRectWeights(method)
+        def regridfunc(data):
+            self.assignCurvField(data)
+            self.assignRectField(None)
+            return self.regridCurvToRect(0.0, method)
+        return weightsFromLinearMap(regridfunc, self.__curv_shape,
+                                    max_regrids=max_regrids)
+
+
+    def getRectToCurvWeights(self, method=None, max_regrids=None):
+        '''
+        Returns the sparse matrix of weights for regridding from the
+        rectilinear grid center points to the curvilinear grid center
+        points using the given regridding method (see regridRectToCurv).
+        Regridding rectilinear data, as a 1D array in Fortran order, is
+        then regridweights.applyWeights(weights, data, undef_val).
+
+        Prior to calling this method, both grids must have been created.
+        For the ESMP backend, the weights are determined by regridding
+        probe fields (see regridweights.weightsFromLinearMap); the
+        rectilinear source ESMP_Field is then left with probe values,
+        so assignRectField must be called before regridRectToCurv.
+
+        Arguments:
+            method: regridding method, as in regridRectToCurv
+            max_regrids: maximum number of ESMP regrids to use for finding
+                    the weights (see weightsFromLinearMap), or None for no limit
+        Returns:
+            the weights as a scipy.sparse.csr_matrix of shape (number of
+            curvilinear center points, number of rectilinear center points)
+            or None if the ESMP regridding weights could not be determined
+        '''
+        if self.__sparse is not None:
+            return self.__sparse.getRectToCurvWeights(method)
+        def regridfunc(data):
+            self.assignRectField(data)
+            self.assignCurvField(None)
+            return self.regridRectToCurv(0.0, method)
+        return weightsFromLinearMap(regridfunc, self.__rect_shape,
+                                    max_regrids=max_regrids)
+
+
     def finalize(self):
         '''
         Destroys any ESMP_Grid, ESMP_Field, and ESMP regridding
@@ -740,6 +864,8 @@ class CurvRectRegridder(object):
         Returns:
             None
         '''
+        if self.__sparse is not None:
+            return self.__sparse.finalize()
         # Release any regridding procedures and clear the dictionaries
         for handle in self.__rect_to_curv_handles.values():
             ESMP.ESMP_FieldRegridRelease(handle)
@@ -6,9 +6,16 @@ Unit tests for CurvRectRegridder
 
 from __future__ import print_function
 
+import os
+import sys
 import unittest
 import numpy
 import ESMP
+
+# Allow the regridding modules to import quadgeom from the parent
+# directory when run in this directory without pyferret
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from esmpcontrol import ESMPControl
 from regrid2d import CurvRectRegridder
 
@@ -0,0 +1,350 @@
+'''
+Sparse matrices of regridding weights.  The values regridded to the
+destination points are linear in the values at the source points, so
+once the weights are known, regridding any number of fields is the
+product W * data of a sparse weight matrix W and a matrix of data
+whose columns are the fields.  The weights only depend on the grid
+coordinates, the masks, and the regridding method, so they are saved
+in a cache keyed by a hash of these values.  The cache keeps the most
+recently used weights in memory and, optionally, keeps all weights
+as compressed sparse row (CSR) matrices in .npz files in a directory
+so they are available to later commands and sessions.
+'''
+
+import collections
+import itertools
+import os
+import numpy
+import scipy.sparse
+
+try:
+    from pyferret.quadgeom import arrayskey
+except ImportError:
+    # Run from this directory, as by the unit tests, without pyferret
+    from quadgeom import arrayskey
+
+# Environment variable giving the directory for saving regridding
+# weights to disk; if not defined, weights are only kept in memory
+WEIGHTS_DIR_ENVNAME = 'PYFERRET_REGRID_WEIGHTS'
+
+# Default number of weight matrices kept in memory
+DEFAULT_CACHE_SIZE = 16
+
+# Maximum number of failed attempts at finding weights remembered
+MAX_PROBE_FAILURES = 256
+
+# Weight cache shared by the regridding functions; see getWeightCache
+_WEIGHT_CACHE = None
+
+
+def weightsKey(method, *arrays):
+    '''
+    Returns a key (a string of hexadecimal digits) identifying regridding
+    weights from a hash of the regridding method and the given arrays;
+    for example, the source and destination coordinates and masks.
+    The shape and the type of each array, as well as the values, are
+    part of the hash (see pyferret.quadgeom.arrayskey).  Any array may
+    be None.
+
+    Arguments:
+        method - a value (converted to a string) identifying the
+                 regridding method
+        arrays - array-like values (or None) that determine the weights
+    Returns:
+        the key as a string
+    '''
+    return arrayskey(str(method), *arrays)
+
+
+class RegridWeightCache(object):
+    '''
+    A cache of sparse regridding weight matrices, keyed by the strings
+    from weightsKey.  At most maxsize matrices are kept in memory, the
+    least recently used matrix being removed when space is needed.  If
+    a directory is given, each matrix added to the cache is also saved
+    in that directory as a compressed sparse row matrix (key.npz), and
+    matrices not in memory are read from that directory when requested.
+    The cache also remembers (in memory only) keys for which finding the
+    weights by probing failed, so the probing is not repeated.
+    '''
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, cachedir=None):
+        '''
+        Creates an empty cache of regridding weights.
+
+        Arguments:
+            maxsize  - maximum number of weight matrices kept in memory
+            cachedir - directory for saving weight matrices; if None,
+                       weight matrices are only kept in memory
+        Raises:
+            ValueError if maxsize is not a positive integer
+        '''
+        self.__maxsize = int(maxsize)
+        if self.__maxsize < 1:
+            raise ValueError("maxsize must be a positive integer")
+        self.__cachedir = cachedir
+        self.__weights = collections.OrderedDict()
+        self.__failures = collections.OrderedDict()
+
+
+    def __len__(self):
+        '''
+        Returns the number of weight matrices held in memory
+        '''
+        return len(self.__weights)
+
+
+    def isPersistent(self):
+        '''
+        Returns True if weight matrices are saved to disk
+        '''
+        return bool(self.__cachedir)
+
+
+    def __filename(self, key):
+        '''
+        Returns the name of the file for the weight matrix with the
+        given key, or None if weights are not saved to disk
+        '''
+        if not self.__cachedir:
+            return None
+        return os.path.join(self.__cachedir, key + '.npz')
+
+
+    def get(self, key):
+        '''
+        Returns the weight matrix for the given key as a
+        scipy.sparse.csr_matrix, or None if it is not in the cache.
+        '''
+        weights = self.__weights.pop(key, None)
+        if weights is None:
+            filename = self.__filename(key)
+            if (filename is None) or not os.path.exists(filename):
+                return None
+            try:
+                weights = scipy.sparse.load_npz(filename).tocsr()
+            except (IOError, OSError, ValueError):
+                # unreadable (perhaps partially written) file - recompute
+                return None
+            self.__trim(self.__maxsize - 1)
+        # (re)insert as the most recently used
+        self.__weights[key] = weights
+        return weights
+
+
+    def put(self, key, weights):
+        '''
+        Adds the weight matrix (any scipy.sparse matrix) with the given
+        key to the cache, saving it to disk if a directory was given.
+        '''
+        weights = scipy.sparse.csr_matrix(weights)
+        self.__weights.pop(key, None)
+        self.__trim(self.__maxsize - 1)
+        self.__weights[key] = weights
+        filename = self.__filename(key)
+        if filename is not None:
+            try:
+                if not os.path.isdir(self.__cachedir):
+                    os.makedirs(self.__cachedir)
+                # write to a temporary file and rename so another
+                # process never reads a partially written file
+                tmpname = '%s.%d.tmp.npz' % (filename[:-4], os.getpid())
+                scipy.sparse.save_npz(tmpname, weights, compressed=True)
+                os.rename(tmpname, filename)
+            except (IOError, OSError):
+                # unable to save; the weights are still kept in memory
+                pass
+
+
+    def putProbeFailure(self, key, max_regrids=None):
+        '''
+        Records that the weights for the given key could not be found
+        by weightsFromLinearMap using at most max_regrids regrids
+        (None if the number of regrids was not limited).
+        '''
+        if max_regrids is None:
+            max_regrids = float('inf')
+        max_regrids = max(max_regrids, self.__failures.pop(key, 0))
+        while len(self.__failures) >= MAX_PROBE_FAILURES:
+            self.__failures.popitem(last=False)
+        self.__failures[key] = max_regrids
+
+
+    def probeFailed(self, key, max_regrids=None):
+        '''
+        Returns True if finding the weights for the given key by
+        weightsFromLinearMap using at most max_regrids regrids (None
+        if not limited) is known to fail from an earlier attempt.
+        '''
+        if max_regrids is None:
+            max_regrids = float('inf')
+        return self.__failures.get(key, -1) >= max_regrids
+
+
+    def clear(self):
+        '''
+        Removes all weight matrices, and all records of failures to find
+        weights, held in memory.  Files of weights saved to disk are not
+        removed.
+        '''
+        self.__weights.clear()
+        self.__failures.clear()
+
+
+    def __trim(self, size):
+        '''
+        Removes the least recently used weight matrices
+        until at most size matrices are held in memory
+        '''
+        while len(self.__weights) > max(size, 0):
+            self.__weights.popitem(last=False)
+
+
+def getWeightCache():
+    '''
+    Returns the RegridWeightCache shared by the regridding functions
+    in this Python session.  Weights are saved to disk in the directory
+    given by the environment variable PYFERRET_REGRID_WEIGHTS, if that
+    variable is defined when this cache is first used.
+    '''
+    global _WEIGHT_CACHE
+    if _WEIGHT_CACHE is None:
+        cachedir = os.environ.get(WEIGHTS_DIR_ENVNAME, None)
+        _WEIGHT_CACHE = RegridWeightCache(DEFAULT_CACHE_SIZE, cachedir)
+    return _WEIGHT_CACHE
+
+
+def weightsFromLinearMap(regridfunc, src_shape, stride=3, max_stride=16,
+                         max_regrids=None):
+    '''
+    Determines the sparse weight matrix of a regridding procedure that
+    can only be used as a function regridding one field at a time (such
+    as an ESMP_FieldRegrid routehandle).  The procedure is applied to
+    "probe" fields that are non-zero only at source points whose indices
+    are congruent modulo stride.  When no destination point depends on
+    more than one of these source points, the regridded values of a probe
+    of ones give the weights and a probe of the point numbers identify
+    the source point for each weight.  The weights found are checked by
+    comparing with regridding a field of random values; if they do not
+    agree, the stride is doubled (up to max_stride) and the probing is
+    repeated.  Probing with a stride of s takes numProbeRegrids(src_shape, s)
+    regrids (including the check); if max_regrids is given, the probing
+    stops without weights rather than exceed this total number of regrids.
+
+    Arguments:
+        regridfunc - function taking an array of shape src_shape of
+                     values at the source points and returning an array
+                     of the regridded values at the destination points;
+                     destination points not assigned must be zero
+        src_shape  - shape of the source point arrays
+        stride     - initial stride; three suffices for bilinear weights
+        max_stride - maximum stride to try
+        max_regrids - maximum total number of regrids to perform,
+                     or None for no limit
+    Returns:
+        the weights as a scipy.sparse.csr_matrix of shape (number of
+        destination points, number of source points), with the points
+        numbered in Fortran (column-major) order, or None if weights
+        reproducing regridfunc could not be determined (using at most
+        max_regrids regrids)
+    '''
+    src_shape = tuple(src_shape)
+    numsrc = int(numpy.prod(src_shape))
+    stride = max(int(stride), 1)
+    if (max_regrids is not None) and \
+       (numProbeRegrids(src_shape, stride) > max_regrids):
+        return None
+    # point indices along each axis, in Fortran order
+    src_indices = [ idx.flatten('F') for idx in numpy.indices(src_shape) ]
+    # point numbers, offset by one so zero means no point
+    src_numbers = numpy.arange(1.0, numsrc + 1.0)
+
+    # reference values for checking the weights
+    randgen = numpy.random.RandomState(20141103)
+    test_values = randgen.uniform(0.5, 1.5, numsrc)
+    test_result = numpy.asarray(regridfunc(test_values.reshape(src_shape, order='F')),
+                                dtype=numpy.float64).flatten('F')
+    numdst = test_result.shape[0]
+    test_tol = 1.0E-8 * max(numpy.abs(test_result).max(), 1.0) if numdst > 0 else 0.0
+    num_regrids = 1
+
+    while True:
+        num_regrids += numProbeRegrids(src_shape, stride) - 1
+        rows = [ ]
+        cols = [ ]
+        vals = [ ]
+        for offsets in itertools.product(range(stride), repeat=len(src_shape)):
+            probe = numpy.ones(numsrc, dtype=bool)
+            for (idx, offset) in zip(src_indices, offsets):
+                probe &= ( (idx % stride) == offset )
+            if not probe.any():
+                continue
+            ones = probe.astype(numpy.float64)
+            weights = numpy.asarray(regridfunc(ones.reshape(src_shape, order='F')),
+                                    dtype=numpy.float64).flatten('F')
+            dst = numpy.nonzero(weights)[0]
+            if len(dst) == 0:
+                continue
+            numbered = numpy.where(probe, src_numbers, 0.0)
+            sums = numpy.asarray(regridfunc(numbered.reshape(src_shape, order='F')),
+                                 dtype=numpy.float64).flatten('F')
+            src = numpy.rint(sums[dst] / weights[dst]).astype(numpy.int64) - 1
+            # a source point not in the probe is never correct;
+            # dropping it makes the check below fail
+            valid = (src >= 0) & (src < numsrc)
+            valid[valid] = probe[src[valid]]
+            rows.append(dst[valid])
+            cols.append(src[valid])
+            vals.append(weights[dst[valid]])
+        if rows:
+            rows = numpy.concatenate(rows)
+            cols = numpy.concatenate(cols)
+            vals = numpy.concatenate(vals)
+        weights = scipy.sparse.csr_matrix((vals, (rows, cols)), shape=(numdst, numsrc))
+        if numpy.all(numpy.abs(weights.dot(test_values) - test_result) <= test_tol):
+            return weights
+        if stride >= min(max(src_shape), max_stride):
+            return None
+        stride = min(2 * stride, max(src_shape), max_stride)
+        if (max_regrids is not None) and \
+           (num_regrids + numProbeRegrids(src_shape, stride) - 1 > max_regrids):
+            return None
+
+
+def numProbeRegrids(src_shape, stride=3):
+    '''
+    Returns the number of regrids performed by weightsFromLinearMap
+    for source points with the given shape, if the weights are found
+    using the given stride: two for each probe (only strides up to the
+    size of an axis give distinct probes) and one for the check.
+    '''
+    numprobes = 1
+    for size in src_shape:
+        numprobes *= max(min(int(stride), int(size)), 1)
+    return 2 * numprobes + 1
+
+
+def applyWeights(weights, data, undef_val):
+    '''
+    Regrids fields using a sparse weight matrix.  Destination points
+    without any weights (points that are masked or were not mapped)
+    are assigned the undefined value.  Masked source points have no
+    weights, so their values (typically the undefined value) are
+    never used.
+
+    Arguments:
+        weights   - scipy.sparse.csr_matrix of weights with shape
+                    (number of destination points, number of source points)
+        data      - array of source values with the source points along
+                    the first axis (numbered in Fortran order); each
+                    column (if 2D) is a separate field
+        undef_val - undefined value assigned to unmapped destination points
+    Returns:
+        array of the regridded values with the destination points along
+        the first axis (numbered in Fortran order) and the same number of
+        columns (if 2D) as data
+    '''
+    result = numpy.asarray(weights.dot(numpy.asarray(data, dtype=numpy.float64)))
+    unmapped = ( numpy.diff(weights.indptr) == 0 )
+    result[unmapped] = undef_val
+    return result
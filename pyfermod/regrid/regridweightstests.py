@@ -0,0 +1,242 @@
+'''
+Unit tests for the sparse regridding weights in regridweights
+'''
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy
+import scipy.sparse
+
+# Allow the regridding modules to import quadgeom from the parent
+# directory when run in this directory without pyferret
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from regridweights import RegridWeightCache, weightsKey, \
+                          weightsFromLinearMap, numProbeRegrids, applyWeights
+
+
+class RegridWeightsTests(unittest.TestCase):
+    '''
+    Unit tests for the sparse regridding weights functions and cache
+    '''
+
+    def setUp(self):
+        '''
+        Create a weight matrix where each of the destination points is
+        a combination of the values at the corners of a source cell,
+        as in bilinear regridding.
+        '''
+        self.src_shape = (9, 7)
+        self.dst_shape = (5, 4)
+        randgen = numpy.random.RandomState(12345)
+        rows = [ ]
+        cols = [ ]
+        vals = [ ]
+        for j in range(self.dst_shape[1]):
+            for i in range(self.dst_shape[0]):
+                # leave one destination point unmapped
+                if (i == 2) and (j == 1):
+                    continue
+                srci = randgen.randint(0, self.src_shape[0] - 1)
+                srcj = randgen.randint(0, self.src_shape[1] - 1)
+                wts = randgen.uniform(0.1, 1.0, 4)
+                wts /= wts.sum()
+                dst = i + j * self.dst_shape[0]
+                for (k, (di, dj)) in enumerate( ((0,0), (1,0), (0,1), (1,1)) ):
+                    rows.append(dst)
+                    cols.append((srci + di) + (srcj + dj) * self.src_shape[0])
+                    vals.append(wts[k])
+        self.weights = scipy.sparse.csr_matrix((vals, (rows, cols)),
+                          shape=(self.dst_shape[0] * self.dst_shape[1],
+                                 self.src_shape[0] * self.src_shape[1]))
+        self.tempdir = tempfile.mkdtemp()
+
+
+    def tearDown(self):
+        '''
+        Remove the directory of any saved weights
+        '''
+        shutil.rmtree(self.tempdir, ignore_errors=True)
+
+
+    def regridfunc(self, weights):
+        '''
+        Returns a function regridding one 2D field using weights
+        '''
+        def func(data):
+            values = weights.dot(numpy.asarray(data).flatten('F'))
+            return values.reshape(self.dst_shape, order='F')
+        return func
+
+
+    def test01WeightsKey(self):
+        '''
+        Tests that weightsKey depends on the method and on the
+        values, shape, and type of each array.
+        '''
+        lons = numpy.linspace(0.0, 10.0, 6)
+        lats = numpy.linspace(-5.0, 5.0, 4)
+        key = weightsKey('BILINEAR', lons, lats, None)
+        self.assertEqual(key, weightsKey('BILINEAR', lons.copy(), lats.copy(), None))
+        self.assertNotEqual(key, weightsKey('CONSERVE', lons, lats, None))
+        self.assertNotEqual(key, weightsKey('BILINEAR', lats, lons, None))
+        self.assertNotEqual(key, weightsKey('BILINEAR', lons, lats))
+        self.assertNotEqual(key, weightsKey('BILINEAR', lons, lats.astype(numpy.float32), None))
+        self.assertNotEqual(key, weightsKey('BILINEAR', lons.reshape((2,3)), lats, None))
+        mask = numpy.zeros((6,4), dtype=bool)
+        otherkey = weightsKey('BILINEAR', lons, lats, mask)
+        mask[3,2] = True
+        self.assertNotEqual(otherkey, weightsKey('BILINEAR', lons, lats, mask))
+
+
+    def test02CacheEviction(self):
+        '''
+        Tests the least-recently-used eviction of RegridWeightCache
+        '''
+        cache = RegridWeightCache(2)
+        self.assertFalse(cache.isPersistent())
+        cache.put('a', self.weights)
+        cache.put('b', 2.0 * self.weights)
+        # using 'a' makes 'b' the least recently used
+        self.assertTrue(cache.get('a') is not None)
+        cache.put('c', 3.0 * self.weights)
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.get('b') is None)
+        self.assertTrue(cache.get('a') is not None)
+        self.assertTrue(cache.get('c') is not None)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertTrue(cache.get('a') is None)
+        self.assertRaises(ValueError, RegridWeightCache, 0)
+
+
+    def test03CachePersistence(self):
+        '''
+        Tests that weights saved to disk are used by another RegridWeightCache
+        '''
+        cachedir = os.path.join(self.tempdir, 'weights')
+        cache = RegridWeightCache(1, cachedir)
+        self.assertTrue(cache.isPersistent())
+        cache.put('a', self.weights)
+        cache.put('b', 2.0 * self.weights)
+        self.assertTrue(os.path.exists(os.path.join(cachedir, 'a.npz')))
+        # 'a' is no longer in memory, but is read from disk
+        weights = cache.get('a')
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(weights.format, 'csr')
+        self.assertEqual(abs(weights - self.weights).max(), 0.0)
+        othercache = RegridWeightCache(4, cachedir)
+        weights = othercache.get('b')
+        self.assertEqual(abs(weights - 2.0 * self.weights).max(), 0.0)
+        self.assertTrue(othercache.get('c') is None)
+
+
+    def test04WeightsFromLinearMap(self):
+        '''
+        Tests weightsFromLinearMap recovers the weights of a regridding function
+        '''
+        weights = weightsFromLinearMap(self.regridfunc(self.weights), self.src_shape)
+        self.assertTrue(weights is not None)
+        self.assertEqual(weights.shape, self.weights.shape)
+        self.assertTrue(abs(weights - self.weights).max() < 1.0E-12)
+        # a destination point using source points three apart requires a larger stride
+        wide = self.weights.tolil()
+        src = self.weights[0].indices.min()
+        srci = src % self.src_shape[0]
+        if srci + 3 < self.src_shape[0]:
+            wide[0, src + 3] = 0.25
+        else:
+            wide[0, src - 3] = 0.25
+        wide = wide.tocsr()
+        weights = weightsFromLinearMap(self.regridfunc(wide), self.src_shape)
+        self.assertTrue(weights is not None)
+        self.assertTrue(abs(weights - wide).max() < 1.0E-12)
+        # unable to determine with the maximum stride limited to the initial stride
+        self.assertTrue(weightsFromLinearMap(self.regridfunc(wide), self.src_shape,
+                                             3, 3) is None)
+
+
+    def test05ApplyWeights(self):
+        '''
+        Tests applyWeights regrids several fields at once
+        '''
+        undef = -1.0E34
+        randgen = numpy.random.RandomState(54321)
+        data = randgen.uniform(-10.0, 10.0, (self.src_shape[0] * self.src_shape[1], 3))
+        result = applyWeights(self.weights, data, undef)
+        self.assertEqual(result.shape, (self.dst_shape[0] * self.dst_shape[1], 3))
+        unmapped = 2 + 1 * self.dst_shape[0]
+        for k in range(3):
+            expected = self.regridfunc(self.weights)(data[:, k]).flatten('F')
+            expected[unmapped] = undef
+            self.assertTrue(numpy.allclose(result[:, k], expected, rtol=1.0E-12, atol=0.0))
+        # values at source points without weights are never used
+        unused = numpy.diff(self.weights.tocsc().indptr) == 0
+        data[unused, :] = numpy.nan
+        self.assertTrue(numpy.allclose(applyWeights(self.weights, data, undef),
+                                       result, rtol=1.0E-12, atol=0.0))
+
+
+    def test06ProbeRegridLimits(self):
+        '''
+        Tests weightsFromLinearMap stays within max_regrids, and that
+        RegridWeightCache remembers failures to find weights
+        '''
+        self.assertEqual(numProbeRegrids(self.src_shape), 2 * 3 * 3 + 1)
+        self.assertEqual(numProbeRegrids(self.src_shape, 8), 2 * 8 * 7 + 1)
+        self.assertEqual(numProbeRegrids((2, 7), 8), 2 * 2 * 7 + 1)
+        numcalls = [ 0 ]
+        def countedfunc(data):
+            numcalls[0] += 1
+            return self.regridfunc(self.weights)(data)
+        weights = weightsFromLinearMap(countedfunc, self.src_shape,
+                                       max_regrids=numProbeRegrids(self.src_shape))
+        self.assertTrue(weights is not None)
+        self.assertTrue(numcalls[0] <= numProbeRegrids(self.src_shape))
+        # too few regrids allowed to even start probing
+        numcalls[0] = 0
+        self.assertTrue(weightsFromLinearMap(countedfunc, self.src_shape,
+                        max_regrids=numProbeRegrids(self.src_shape) - 1) is None)
+        self.assertEqual(numcalls[0], 0)
+        # a destination point using source points three apart requires
+        # a stride of six; stop after the stride of three fails
+        wide = self.weights.tolil()
+        src = self.weights[0].indices.min()
+        if (src % self.src_shape[0]) + 3 < self.src_shape[0]:
+            wide[0, src + 3] = 0.25
+        else:
+            wide[0, src - 3] = 0.25
+        widefunc = self.regridfunc(wide.tocsr())
+        numcalls[0] = 0
+        def countedwidefunc(data):
+            numcalls[0] += 1
+            return widefunc(data)
+        limit = numProbeRegrids(self.src_shape, 6) - 1
+        self.assertTrue(weightsFromLinearMap(countedwidefunc, self.src_shape,
+                                             max_regrids=limit) is None)
+        self.assertEqual(numcalls[0], numProbeRegrids(self.src_shape))
+        self.assertTrue(weightsFromLinearMap(widefunc, self.src_shape,
+                        max_regrids=limit + numProbeRegrids(self.src_shape)) is not None)
+        # remembering failures
+        cache = RegridWeightCache(2)
+        self.assertFalse(cache.probeFailed('a', 10))
+        cache.putProbeFailure('a', 10)
+        self.assertTrue(cache.probeFailed('a', 10))
+        self.assertTrue(cache.probeFailed('a', 5))
+        self.assertFalse(cache.probeFailed('a', 20))
+        self.assertFalse(cache.probeFailed('a'))
+        cache.putProbeFailure('a')
+        self.assertTrue(cache.probeFailed('a'))
+        self.assertFalse(cache.probeFailed('b', 1))
+        cache.clear()
+        self.assertFalse(cache.probeFailed('a', 1))
+
+
+if __name__ == "__main__":
+    '''
+    Run the unit tests in this module.
+    '''
+    unittest.main()
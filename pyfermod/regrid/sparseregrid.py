@@ -0,0 +1,764 @@
+'''
+Regridder for converting data between a curvilinear longitude,
+latitude grid and a rectilinear longitude, latitude grid using
+sparse matrices of weights computed with NumPy and SciPy; thus
+not requiring ESMP.  This is the "sparse" backend of
+CurvRectRegridder.
+
+Bilinear weights are found by locating each destination point in
+a quadrilateral of source center points; candidate quadrilaterals
+are the nearest (using a scipy.spatial.cKDTree of the quadrilateral
+centroids) and the position in the quadrilateral is found by
+inverting the bilinear map.  First-order conservative weights are
+the areas of the intersections of the curvilinear cells with the
+rectilinear cells, computed by clipping the curvilinear cells to the
+rectilinear cells in the (Lambert cylindrical) equal-area projection
+x = longitude, y = sin(latitude), where the areas of rectilinear
+cells are exact.  The weights of a destination cell are normalized
+by the area of that cell covered by source cells not ignored, so
+the values are area-weighted averages even along the edges of the
+source grid and of masked regions.
+'''
+
+import numpy
+import scipy.sparse
+import scipy.spatial
+
+try:
+    from pyferret.regrid.regridweights import applyWeights
+except ImportError:
+    # Run from this directory, as by the unit tests, without pyferret
+    from regridweights import applyWeights
+
+try:
+    import ESMP
+    # Allow the ESMP regridding method identifiers to be used
+    _ESMP_METHOD_NAMES = { ESMP.ESMP_REGRIDMETHOD_BILINEAR: 'BILINEAR',
+                           ESMP.ESMP_REGRIDMETHOD_PATCH: 'PATCH',
+                           ESMP.ESMP_REGRIDMETHOD_CONSERVE: 'CONSERVE' }
+except ImportError:
+    _ESMP_METHOD_NAMES = { }
+
+# Regridding methods supported
+BILINEAR = 'BILINEAR'
+CONSERVE = 'CONSERVE'
+
+# Number of nearest quadrilaterals examined for containing a point
+_NUM_CANDIDATE_QUADS = 8
+
+# Number of curvilinear cells clipped at one time in conservative regridding
+_CLIP_CHUNK_SIZE = 1 << 16
+
+
+def regridMethodName(method):
+    '''
+    Returns the name of the sparse regridding method, BILINEAR or
+    CONSERVE, for method, which can be one of these names (in any
+    case), the equivalent ESMP regridding method identifier, or None
+    (for BILINEAR).  Raises a ValueError if the method is not supported.
+    '''
+    if method is None:
+        return BILINEAR
+    try:
+        name = _ESMP_METHOD_NAMES.get(method, None)
+    except TypeError:
+        name = None
+    if name is None:
+        name = str(method).upper()
+    if name not in (BILINEAR, CONSERVE):
+        raise ValueError("Unsupported regridding method %s " \
+                         "(only BILINEAR and CONSERVE)" % str(method))
+    return name
+
+
+def _wrapLons(dlons):
+    '''
+    Returns the longitude differences dlons, in degrees, as values in [-180,180)
+    '''
+    return numpy.mod(dlons + 180.0, 360.0) - 180.0
+
+
+def _unitVectors(lons, lats):
+    '''
+    Returns the unit vectors, as an (n, 3) array, of the points
+    on the sphere at the longitudes and latitudes (in degrees)
+    '''
+    lonrads = numpy.deg2rad(lons)
+    latrads = numpy.deg2rad(lats)
+    coslats = numpy.cos(latrads)
+    return numpy.column_stack((coslats * numpy.cos(lonrads),
+                               coslats * numpy.sin(lonrads),
+                               numpy.sin(latrads)))
+
+
+def _quadCorners(arr):
+    '''
+    Returns the values of the 2D array arr at the four corners of each
+    quadrilateral formed by neighboring points as an (n, 4) array;
+    quadrilateral [i, j] (numbered in Fortran order) has the corners
+    [i, j], [i+1, j], [i+1, j+1], and [i, j+1] of arr.
+    '''
+    return numpy.column_stack((arr[:-1, :-1].flatten('F'),
+                               arr[1:, :-1].flatten('F'),
+                               arr[1:, 1:].flatten('F'),
+                               arr[:-1, 1:].flatten('F')))
+
+
+def bilinearWeights(src_lons, src_lats, src_ignore,
+                    dst_lons, dst_lats, dst_ignore):
+    '''
+    Computes the bilinear regridding weights from points on a curvilinear
+    grid to arbitrary points.  A destination point is not assigned if it
+    is ignored, if it does not lie in a quadrilateral of neighboring source
+    points, or if any of the four source points of that quadrilateral are
+    ignored.
+
+    Arguments:
+        src_lons:   2D array of the source point longitudes, in degrees
+        src_lats:   2D array of the source point latitudes, in degrees
+        src_ignore: 2D array of booleans indicating source points to
+                    ignore, or None if no source points are ignored
+        dst_lons:   1D array of the destination point longitudes, in degrees
+        dst_lats:   1D array of the destination point latitudes, in degrees
+        dst_ignore: 1D array of booleans indicating destination points to
+                    ignore, or None if no destination points are ignored
+    Returns:
+        the weights as a scipy.sparse.csr_matrix of shape (number of
+        destination points, number of source points), with source points
+        numbered in Fortran order
+    '''
+    src_shape = src_lons.shape
+    num_src = src_shape[0] * src_shape[1]
+    num_dst = dst_lons.shape[0]
+    if (src_shape[0] < 2) or (src_shape[1] < 2) or (num_dst == 0):
+        return scipy.sparse.csr_matrix((num_dst, num_src), dtype=numpy.float64)
+
+    # Source point numbers and coordinates of the corners of each quadrilateral
+    src_nums = numpy.arange(num_src).reshape(src_shape, order='F')
+    quad_nums = _quadCorners(src_nums)
+    quad_lons = _quadCorners(src_lons)
+    quad_lats = _quadCorners(src_lats)
+    # Do not consider quadrilaterals with an ignored corner
+    if src_ignore is not None:
+        usable = numpy.logical_not(_quadCorners(src_ignore).any(axis=1))
+        quad_nums = quad_nums[usable]
+        quad_lons = quad_lons[usable]
+        quad_lats = quad_lats[usable]
+    num_quads = quad_nums.shape[0]
+
+    # Destination points to consider
+    dst_idx = numpy.arange(num_dst)
+    if dst_ignore is not None:
+        dst_idx = dst_idx[numpy.logical_not(dst_ignore)]
+    if (num_quads == 0) or (dst_idx.shape[0] == 0):
+        return scipy.sparse.csr_matrix((num_dst, num_src), dtype=numpy.float64)
+    pt_lons = dst_lons[dst_idx]
+    pt_lats = dst_lats[dst_idx]
+
+    # Find the nearest quadrilaterals, by centroid, to each destination point
+    centroids = _unitVectors(quad_lons.reshape(-1), quad_lats.reshape(-1)) \
+                    .reshape((num_quads, 4, 3)).sum(axis=1)
+    centroids /= numpy.sqrt((centroids * centroids).sum(axis=1))[:, numpy.newaxis]
+    tree = scipy.spatial.cKDTree(centroids)
+    num_cands = min(_NUM_CANDIDATE_QUADS, num_quads)
+    cands = tree.query(_unitVectors(pt_lons, pt_lats), k=num_cands)[1]
+    cands = cands.reshape((pt_lons.shape[0], num_cands))
+
+    # Corners of the candidate quadrilaterals in a local planar projection
+    # centered at the destination point (which is then the origin)
+    coslats = numpy.cos(numpy.deg2rad(pt_lats))[:, numpy.newaxis, numpy.newaxis]
+    xs = _wrapLons(quad_lons[cands] - pt_lons[:, numpy.newaxis, numpy.newaxis]) * coslats
+    ys = quad_lats[cands] - pt_lats[:, numpy.newaxis, numpy.newaxis]
+
+    # Point-in-quadrilateral test: the cross products of the edges with
+    # the vectors to the origin all have the same sign (either orientation)
+    crosses = xs * numpy.roll(ys, -1, axis=2) - ys * numpy.roll(xs, -1, axis=2)
+    scale = numpy.abs(xs).max(axis=2) + numpy.abs(ys).max(axis=2)
+    tol = 1.0E-10 * scale[:, :, numpy.newaxis]**2
+    inside = numpy.logical_or((crosses >= -tol).all(axis=2),
+                              (crosses <= tol).all(axis=2))
+
+    # Invert the bilinear map
+    #     (s, t) -> (1-s)(1-t) P0 + s(1-t) P1 + s t P2 + (1-s) t P3
+    # for the origin using Newton's method
+    ax, bx, cx, dx = [ xs[:, :, k] for k in range(4) ]
+    ay, by, cy, dy = [ ys[:, :, k] for k in range(4) ]
+    (ux, vx, wx) = (bx - ax, dx - ax, ax - bx + cx - dx)
+    (uy, vy, wy) = (by - ay, dy - ay, ay - by + cy - dy)
+    s = numpy.full(ax.shape, 0.5)
+    t = numpy.full(ax.shape, 0.5)
+    for _ in range(12):
+        fx = ax + s * ux + t * vx + s * t * wx
+        fy = ay + s * uy + t * vy + s * t * wy
+        j11 = ux + t * wx
+        j12 = vx + s * wx
+        j21 = uy + t * wy
+        j22 = vy + s * wy
+        det = j11 * j22 - j12 * j21
+        det = numpy.where(numpy.abs(det) > 1.0E-300, det, 1.0E-300)
+        s = numpy.clip(s - (j22 * fx - j12 * fy) / det, -1.0, 2.0)
+        t = numpy.clip(t - (j11 * fy - j21 * fx) / det, -1.0, 2.0)
+    fx = ax + s * ux + t * vx + s * t * wx
+    fy = ay + s * uy + t * vy + s * t * wy
+    found = inside & (numpy.abs(fx) + numpy.abs(fy) <= 1.0E-8 * scale) & \
+            (s >= -1.0E-8) & (s <= 1.0 + 1.0E-8) & \
+            (t >= -1.0E-8) & (t <= 1.0 + 1.0E-8)
+
+    # Use the nearest quadrilateral containing the point
+    mapped = found.any(axis=1)
+    first = numpy.argmax(found, axis=1)[mapped]
+    pts = numpy.nonzero(mapped)[0]
+    s = numpy.clip(s[pts, first], 0.0, 1.0)
+    t = numpy.clip(t[pts, first], 0.0, 1.0)
+    corners = quad_nums[cands[pts, first]]
+    weights = numpy.column_stack(((1.0 - s) * (1.0 - t), s * (1.0 - t),
+                                  s * t, (1.0 - s) * t))
+    rows = numpy.repeat(dst_idx[pts], 4)
+    result = scipy.sparse.csr_matrix((weights.reshape(-1), (rows, corners.reshape(-1))),
+                                     shape=(num_dst, num_src))
+    return result
+
+
+def _appendVertices(outx, outy, outcnt, select, ptx, pty):
+    '''
+    Appends the vertex (ptx, pty) to the polygons (outx, outy, outcnt)
+    where select is True
+    '''
+    rows = numpy.nonzero(select)[0]
+    outx[rows, outcnt[rows]] = ptx[rows]
+    outy[rows, outcnt[rows]] = pty[rows]
+    outcnt[rows] += 1
+
+
+def _clipPolygons(polyx, polyy, counts, bounds, useyvals, keepabove):
+    '''
+    Clips polygons to a half-plane (Sutherland-Hodgman algorithm
+    applied to all polygons at once).
+
+    Arguments:
+        polyx, polyy: (n, m) arrays of the polygon vertex coordinates
+        counts:       number of vertices of each polygon
+        bounds:       coordinate of the line bounding the half-plane
+                      for each polygon
+        useyvals:     if True, the line is y = bounds; otherwise x = bounds
+        keepabove:    if True, keep the half-plane of coordinates greater
+                      than bounds; otherwise, keep the coordinates less
+    Returns:
+        (clipx, clipy, clipcounts) for the clipped polygons
+    '''
+    (num, maxv) = polyx.shape
+    outx = numpy.zeros((num, maxv + 1))
+    outy = numpy.zeros((num, maxv + 1))
+    outcnt = numpy.zeros((num,), dtype=numpy.intp)
+    coords = polyy if useyvals else polyx
+    if keepabove:
+        inside = ( coords >= bounds[:, numpy.newaxis] )
+    else:
+        inside = ( coords <= bounds[:, numpy.newaxis] )
+    rows = numpy.arange(num)
+    for k in range(maxv):
+        valid = ( k < counts )
+        prev = numpy.maximum(counts - 1, 0) if k == 0 else numpy.full((num,), k - 1)
+        (curx, cury, curc) = (polyx[:, k], polyy[:, k], coords[:, k])
+        (prvx, prvy, prvc) = (polyx[rows, prev], polyy[rows, prev], coords[rows, prev])
+        curin = inside[:, k]
+        prvin = inside[rows, prev]
+        # intersection of the edge from the previous vertex with the line
+        delta = curc - prvc
+        frac = (bounds - prvc) / numpy.where(delta == 0.0, 1.0, delta)
+        _appendVertices(outx, outy, outcnt, valid & (curin != prvin),
+                        prvx + frac * (curx - prvx), prvy + frac * (cury - prvy))
+        _appendVertices(outx, outy, outcnt, valid & curin, curx, cury)
+    return (outx, outy, outcnt)
+
+
+def _polygonAreas(polyx, polyy, counts):
+    '''
+    Returns the areas of the polygons with the given vertex coordinates
+    '''
+    maxv = polyx.shape[1]
+    rows = numpy.arange(polyx.shape[0])
+    twice = numpy.zeros((polyx.shape[0],))
+    for k in range(maxv):
+        nxt = numpy.where(k + 1 < counts, k + 1, 0)
+        term = polyx[:, k] * polyy[rows, nxt] - polyx[rows, nxt] * polyy[:, k]
+        twice += numpy.where(k < counts, term, 0.0)
+    return 0.5 * numpy.abs(twice)
+
+
+def overlapAreas(curv_corner_lons, curv_corner_lats,
+                 rect_corner_lons, rect_corner_lats):
+    '''
+    Computes the areas, on the unit sphere, of the intersections of the
+    cells of a curvilinear grid with the cells of a rectilinear grid.
+    The edges of the curvilinear cells are taken to be straight lines in
+    the equal-area projection x = longitude, y = sin(latitude).  A
+    curvilinear cell crossing an end of the rectilinear longitudes (such
+    as the 0/360 seam of a global grid) is also clipped shifted by 360
+    degrees, so its overlap with the cells at the other end is included.
+
+    Arguments:
+        curv_corner_lons: 2D array of curvilinear corner longitudes, in degrees
+        curv_corner_lats: 2D array of curvilinear corner latitudes, in degrees
+        rect_corner_lons: 1D array of strictly increasing rectilinear
+                          corner longitudes, in degrees
+        rect_corner_lats: 1D array of strictly increasing rectilinear
+                          corner latitudes, in degrees
+    Returns:
+        the areas as a scipy.sparse.csr_matrix of shape (number of
+        rectilinear cells, number of curvilinear cells), with cells
+        numbered in Fortran order
+    '''
+    num_rect_lons = rect_corner_lons.shape[0] - 1
+    num_rect_lats = rect_corner_lats.shape[0] - 1
+    num_rect = num_rect_lons * num_rect_lats
+    num_curv = (curv_corner_lons.shape[0] - 1) * (curv_corner_lons.shape[1] - 1)
+
+    # Curvilinear cell corners with continuous longitudes, shifted
+    # by multiples of 360 to be as close as possible to the rectilinear grid
+    quad_lons = _quadCorners(curv_corner_lons)
+    quad_lons = quad_lons[:, :1] + _wrapLons(quad_lons - quad_lons[:, :1])
+    mid_lon = 0.5 * (rect_corner_lons[0] + rect_corner_lons[-1])
+    quad_lons -= 360.0 * numpy.round((quad_lons.mean(axis=1) - mid_lon) / 360.0)[:, numpy.newaxis]
+    quad_lats = _quadCorners(curv_corner_lats)
+
+    # Projected coordinates
+    quad_xs = numpy.deg2rad(quad_lons)
+    quad_ys = numpy.sin(numpy.deg2rad(quad_lats))
+    rect_xs = numpy.deg2rad(numpy.asarray(rect_corner_lons, dtype=numpy.float64))
+    rect_ys = numpy.sin(numpy.deg2rad(numpy.asarray(rect_corner_lats, dtype=numpy.float64)))
+
+    # Add copies, shifted by 360 degrees, of the curvilinear cells extending
+    # past an end of the rectilinear longitudes; curv_nums gives the number
+    # of the curvilinear cell of each (possibly shifted) cell
+    curv_nums = numpy.arange(num_curv)
+    (min_xs, max_xs) = (quad_xs.min(axis=1), quad_xs.max(axis=1))
+    shifted_xs = [ quad_xs ]
+    shifted_ys = [ quad_ys ]
+    shifted_nums = [ curv_nums ]
+    for shift in (-2.0 * numpy.pi, 2.0 * numpy.pi):
+        copies = numpy.nonzero( (min_xs + shift < rect_xs[-1]) &
+                                (max_xs + shift > rect_xs[0]) )[0]
+        if copies.shape[0] > 0:
+            shifted_xs.append(quad_xs[copies] + shift)
+            shifted_ys.append(quad_ys[copies])
+            shifted_nums.append(curv_nums[copies])
+    if len(shifted_nums) > 1:
+        quad_xs = numpy.concatenate(shifted_xs)
+        quad_ys = numpy.concatenate(shifted_ys)
+        curv_nums = numpy.concatenate(shifted_nums)
+    num_cells = curv_nums.shape[0]
+
+    # Ranges of rectilinear cells overlapping the bounding box of each curvilinear cell
+    lon_lo = numpy.maximum(numpy.searchsorted(rect_xs, quad_xs.min(axis=1), 'right') - 1, 0)
+    lon_hi = numpy.minimum(numpy.searchsorted(rect_xs, quad_xs.max(axis=1), 'left') - 1,
+                           num_rect_lons - 1)
+    lat_lo = numpy.maximum(numpy.searchsorted(rect_ys, quad_ys.min(axis=1), 'right') - 1, 0)
+    lat_hi = numpy.minimum(numpy.searchsorted(rect_ys, quad_ys.max(axis=1), 'left') - 1,
+                           num_rect_lats - 1)
+    num_lons = numpy.maximum(lon_hi - lon_lo + 1, 0)
+    num_pairs = num_lons * numpy.maximum(lat_hi - lat_lo + 1, 0)
+
+    rows = [ ]
+    cols = [ ]
+    areas = [ ]
+    for start in range(0, num_cells, _CLIP_CHUNK_SIZE):
+        end = min(start + _CLIP_CHUNK_SIZE, num_cells)
+        # Expand to all pairs of a curvilinear cell and an overlapping rectilinear cell
+        curv = numpy.repeat(numpy.arange(start, end), num_pairs[start:end])
+        if curv.shape[0] == 0:
+            continue
+        offsets = numpy.arange(curv.shape[0]) - \
+                  numpy.repeat(numpy.cumsum(num_pairs[start:end]) - num_pairs[start:end],
+                               num_pairs[start:end])
+        lon_idx = lon_lo[curv] + offsets % num_lons[curv]
+        lat_idx = lat_lo[curv] + offsets // num_lons[curv]
+        # Clip each curvilinear cell to the rectilinear cell
+        polyx = quad_xs[curv]
+        polyy = quad_ys[curv]
+        counts = numpy.full((curv.shape[0],), 4, dtype=numpy.intp)
+        (polyx, polyy, counts) = _clipPolygons(polyx, polyy, counts,
+                                               rect_xs[lon_idx], False, True)
+        (polyx, polyy, counts) = _clipPolygons(polyx, polyy, counts,
+                                               rect_xs[lon_idx + 1], False, False)
+        (polyx, polyy, counts) = _clipPolygons(polyx, polyy, counts,
+                                               rect_ys[lat_idx], True, True)
+        (polyx, polyy, counts) = _clipPolygons(polyx, polyy, counts,
+                                               rect_ys[lat_idx + 1], True, False)
+        pair_areas = _polygonAreas(polyx, polyy, counts)
+        # Ignore slivers from round-off error
+        rect_areas = (rect_xs[lon_idx + 1] - rect_xs[lon_idx]) * \
+                     (rect_ys[lat_idx + 1] - rect_ys[lat_idx])
+        keep = ( pair_areas > 1.0E-12 * rect_areas )
+        rows.append(lon_idx[keep] + lat_idx[keep] * num_rect_lons)
+        cols.append(curv_nums[curv[keep]])
+        areas.append(pair_areas[keep])
+    if rows:
+        rows = numpy.concatenate(rows)
+        cols = numpy.concatenate(cols)
+        areas = numpy.concatenate(areas)
+    return scipy.sparse.csr_matrix((areas, (rows, cols)), shape=(num_rect, num_curv))
+
+
+def conserveWeights(overlaps, src_ignore, dst_ignore):
+    '''
+    Computes first-order conservative regridding weights from the areas of
+    the intersections of destination cells with source cells.  The weights
+    of a destination cell are the intersection areas with the source cells
+    not ignored divided by the sum of these areas.  A destination cell is
+    not assigned if it is ignored or if it does not intersect any source
+    cell not ignored.
+
+    Arguments:
+        overlaps:   scipy.sparse matrix of intersection areas with shape
+                    (number of destination cells, number of source cells)
+        src_ignore: 1D array of booleans (Fortran order) indicating source
+                    cells to ignore, or None if no source cells are ignored
+        dst_ignore: 1D array of booleans (Fortran order) indicating destination
+                    cells to ignore, or None if no destination cells are ignored
+    Returns:
+        the weights as a scipy.sparse.csr_matrix with the shape of overlaps
+    '''
+    (num_dst, num_src) = overlaps.shape
+    if src_ignore is None:
+        src_keep = numpy.ones((num_src,))
+    else:
+        src_keep = numpy.logical_not(src_ignore).astype(numpy.float64)
+    if dst_ignore is None:
+        dst_keep = numpy.ones((num_dst,))
+    else:
+        dst_keep = numpy.logical_not(dst_ignore).astype(numpy.float64)
+    areas = scipy.sparse.diags(dst_keep).dot(overlaps).dot(scipy.sparse.diags(src_keep))
+    areas = scipy.sparse.csr_matrix(areas)
+    areas.eliminate_zeros()
+    totals = numpy.asarray(areas.sum(axis=1)).reshape(-1)
+    scales = numpy.where(totals > 0.0, 1.0 / numpy.where(totals > 0.0, totals, 1.0), 0.0)
+    weights = scipy.sparse.csr_matrix(scipy.sparse.diags(scales).dot(areas))
+    weights.eliminate_zeros()
+    return weights
+
+
+class SparseCurvRectRegridder(object):
+    '''
+    Regridder for regridding data between a 2D curvilinear grid, where
+    the longitude and latitude of each grid corner and/or center point
+    is explicitly defined, and a 2D rectilinear grid, where the grid
+    corners are all intersections of a given set of strictly increasing
+    longitudes with a set of strictly increasing latitudes.
+
+    The methods mirror those of CurvRectRegridder, but the regridding is
+    performed with sparse matrices of weights computed using NumPy and
+    SciPy.  The weights for each direction and method are computed when
+    first needed and kept until a grid is recreated.  Only the BILINEAR
+    and CONSERVE methods are supported.  Corner masks are not used;
+    cells are ignored according to the center masks.
+    '''
+
+    def __init__(self):
+        '''
+        Initializes to an empty regridder.
+        '''
+        # curvilinear grid center and corner coordinates, and centers to ignore
+        self.__curv_shape = None
+        self.__curv_center_lons = None
+        self.__curv_center_lats = None
+        self.__curv_center_ignore = None
+        self.__curv_corner_lons = None
+        self.__curv_corner_lats = None
+        # rectilinear grid center and corner coordinates, and centers to ignore
+        self.__rect_shape = None
+        self.__rect_center_lons = None
+        self.__rect_center_lats = None
+        self.__rect_center_ignore = None
+        self.__rect_corner_lons = None
+        self.__rect_corner_lats = None
+        # source data assigned
+        self.__curv_src_data = None
+        self.__rect_src_data = None
+        # areas of intersections of rectilinear cells with curvilinear cells
+        self.__overlaps = None
+        # weights, for each method, for regridding between the grids
+        self.__curv_to_rect_weights = { }
+        self.__rect_to_curv_weights = { }
+
+
+    def __clearWeights(self):
+        '''
+        Removes the weights and overlaps computed from the grids
+        '''
+        self.__overlaps = None
+        self.__curv_to_rect_weights.clear()
+        self.__rect_to_curv_weights.clear()
+
+
+    @staticmethod
+    def __ignoreArray(ignore, shape, name):
+        '''
+        Returns ignore as a boolean array of the given shape, or
+        None if ignore is None or does not ignore any points
+        '''
+        if ignore is None:
+            return None
+        ignore_array = numpy.array(ignore, dtype=bool)
+        if ignore_array.shape != shape:
+            raise ValueError("%s does not have the expected shape" % name)
+        if not ignore_array.any():
+            return None
+        return ignore_array
+
+
+    def createCurvGrid(self, center_lons, center_lats, center_ignore=None,
+                       corner_lons=None, corner_lats=None, corner_ignore=None):
+        '''
+        Defines the curvilinear grid.  See CurvRectRegridder.createCurvGrid.
+        Corner coordinates are required for conservative regridding.
+        The corner_ignore argument is accepted but not used.
+        '''
+        center_lons_array = numpy.array(center_lons, dtype=numpy.float64)
+        if len(center_lons_array.shape) != 2:
+            raise ValueError("center_lons must be two-dimensional")
+        center_lats_array = numpy.array(center_lats, dtype=numpy.float64)
+        if center_lats_array.shape != center_lons_array.shape:
+            raise ValueError("center_lats and center_lons must have the same shape")
+        center_ignore_array = self.__ignoreArray(center_ignore,
+                                      center_lons_array.shape, "center_ignore")
+        if (corner_lons is not None) and (corner_lats is not None):
+            corner_lons_array = numpy.array(corner_lons, dtype=numpy.float64)
+            if corner_lons_array.shape != (center_lons_array.shape[0] + 1,
+                                           center_lons_array.shape[1] + 1):
+                raise ValueError("corner_lons must have one more point along " \
+                                 "each dimension when compared to center_lons")
+            corner_lats_array = numpy.array(corner_lats, dtype=numpy.float64)
+            if corner_lats_array.shape != corner_lons_array.shape:
+                raise ValueError("corner_lats and corner_lons must have the same shape")
+        elif corner_lons is not None:
+            raise ValueError("corner_lons given without corner_lats")
+        elif corner_lats is not None:
+            raise ValueError("corner_lats given without corner_lons")
+        elif corner_ignore is not None:
+            raise ValueError("corner_ignore given without corner_lons and corner_lats")
+        else:
+            corner_lons_array = None
+            corner_lats_array = None
+        self.__curv_shape = center_lons_array.shape
+        self.__curv_center_lons = center_lons_array
+        self.__curv_center_lats = center_lats_array
+        self.__curv_center_ignore = center_ignore_array
+        self.__curv_corner_lons = corner_lons_array
+        self.__curv_corner_lats = corner_lats_array
+        self.__curv_src_data = None
+        self.__clearWeights()
+
+
+    def assignCurvField(self, data=None):
+        '''
+        Assigns the data values at the curvilinear center points to be
+        regridded.  If data is None, nothing is done (the destination
+        array is created when regridding).
+        Raises a ValueError if data does not have the shape of the
+        center points arrays.
+        '''
+        if data is None:
+            return
+        data_array = numpy.array(data, dtype=numpy.float64)
+        if data_array.shape != self.__curv_shape:
+            raise ValueError("data must have the same shape " \
+                             "as the center points arrays")
+        self.__curv_src_data = data_array
+
+
+    def createRectGrid(self, center_lons, center_lats, center_ignore=None,
+                       corner_lons=None, corner_lats=None, corner_ignore=None):
+        '''
+        Defines the rectilinear grid.  See CurvRectRegridder.createRectGrid.
+        Corner coordinates are required for conservative regridding.
+        The corner_ignore argument is accepted but not used.
+        '''
+        center_lons_array = numpy.array(center_lons, dtype=numpy.float64)
+        if len(center_lons_array.shape) != 1:
+            raise ValueError("center_lons must be one-dimensional")
+        center_lats_array = numpy.array(center_lats, dtype=numpy.float64)
+        if len(center_lats_array.shape) != 1:
+            raise ValueError("center_lats must be one-dimensional")
+        rect_shape = (center_lons_array.shape[0], center_lats_array.shape[0])
+        center_ignore_array = self.__ignoreArray(center_ignore, rect_shape,
+                                                 "center_ignore")
+        if (corner_lons is not None) and (corner_lats is not None):
+            corner_lons_array = numpy.array(corner_lons, dtype=numpy.float64)
+            if corner_lons_array.shape != (center_lons_array.shape[0] + 1, ):
+                raise ValueError("corner_lons must have shape ( len(center_lons) + 1, )")
+            corner_lats_array = numpy.array(corner_lats, dtype=numpy.float64)
+            if corner_lats_array.shape != (center_lats_array.shape[0] + 1, ):
+                raise ValueError("corner_lats must have shape ( len(center_lats) + 1, )")
+            if numpy.any(numpy.diff(corner_lons_array) <= 0.0) or \
+               numpy.any(numpy.diff(corner_lats_array) <= 0.0):
+                raise ValueError("corner_lons and corner_lats must be strictly increasing")
+        elif corner_lons is not None:
+            raise ValueError("corner_lons given without corner_lats")
+        elif corner_lats is not None:
+            raise ValueError("corner_lats given without corner_lons")
+        elif corner_ignore is not None:
+            raise ValueError("corner_ignore given without corner_lons and corner_lats")
+        else:
+            corner_lons_array = None
+            corner_lats_array = None
+        self.__rect_shape = rect_shape
+        self.__rect_center_lons = center_lons_array
+        self.__rect_center_lats = center_lats_array
+        self.__rect_center_ignore = center_ignore_array
+        self.__rect_corner_lons = corner_lons_array
+        self.__rect_corner_lats = corner_lats_array
+        self.__rect_src_data = None
+        self.__clearWeights()
+
+
+    def assignRectField(self, data=None):
+        '''
+        Assigns the data values at the rectilinear center points to be
+        regridded.  If data is None, nothing is done (the destination
+        array is created when regridding).
+        Raises a ValueError if data does not have the shape of the
+        center points arrays.
+        '''
+        if data is None:
+            return
+        data_array = numpy.array(data, dtype=numpy.float64)
+        if len(data_array.shape) != 2:
+            raise ValueError("data must be two-dimensional")
+        if data_array.shape != self.__rect_shape:
+            raise ValueError("data must have the same shape " \
+                             "as the center points arrays")
+        self.__rect_src_data = data_array
+
+
+    def __checkGrids(self):
+        '''
+        Raises a ValueError if either grid has not been created
+        '''
+        if self.__curv_shape is None:
+            raise ValueError("Curvilinear grid does not exist")
+        if self.__rect_shape is None:
+            raise ValueError("Rectilinear grid does not exist")
+
+
+    def __rectCenterPoints(self):
+        '''
+        Returns the longitudes and latitudes of the rectilinear center
+        points as 2D arrays
+        '''
+        return numpy.meshgrid(self.__rect_center_lons,
+                              self.__rect_center_lats, indexing='ij')
+
+
+    def __getOverlaps(self):
+        '''
+        Returns the areas of intersection of the rectilinear cells
+        with the curvilinear cells, computing them if needed
+        '''
+        if (self.__curv_corner_lons is None) or (self.__rect_corner_lons is None):
+            raise ValueError("CONSERVE regridding requires the " \
+                             "corner points of both grids")
+        if self.__overlaps is None:
+            self.__overlaps = overlapAreas(self.__curv_corner_lons,
+                                           self.__curv_corner_lats,
+                                           self.__rect_corner_lons,
+                                           self.__rect_corner_lats)
+        return self.__overlaps
+
+
+    @staticmethod
+    def __flatIgnore(ignore):
+        '''
+        Returns the 2D ignore array flattened in Fortran order, or None
+        '''
+        if ignore is None:
+            return None
+        return ignore.flatten('F')
+
+
+    def getCurvToRectWeights(self, method=None):
+        '''
+        Returns the sparse matrix (scipy.sparse.csr_matrix) of weights for
+        regridding from the curvilinear grid center points to the rectilinear
+        grid center points using the given method (BILINEAR if None).
+        Points are numbered in Fortran order.
+        '''
+        self.__checkGrids()
+        name = regridMethodName(method)
+        weights = self.__curv_to_rect_weights.get(name, None)
+        if weights is None:
+            if name == BILINEAR:
+                (lons, lats) = self.__rectCenterPoints()
+                weights = bilinearWeights(self.__curv_center_lons,
+                                          self.__curv_center_lats,
+                                          self.__curv_center_ignore,
+                                          lons.flatten('F'), lats.flatten('F'),
+                                          self.__flatIgnore(self.__rect_center_ignore))
+            else:
+                weights = conserveWeights(self.__getOverlaps(),
+                                          self.__flatIgnore(self.__curv_center_ignore),
+                                          self.__flatIgnore(self.__rect_center_ignore))
+            self.__curv_to_rect_weights[name] = weights
+        return weights
+
+
+    def getRectToCurvWeights(self, method=None):
+        '''
+        Returns the sparse matrix (scipy.sparse.csr_matrix) of weights for
+        regridding from the rectilinear grid center points to the curvilinear
+        grid center points using the given method (BILINEAR if None).
+        Points are numbered in Fortran order.
+        '''
+        self.__checkGrids()
+        name = regridMethodName(method)
+        weights = self.__rect_to_curv_weights.get(name, None)
+        if weights is None:
+            if name == BILINEAR:
+                (lons, lats) = self.__rectCenterPoints()
+                weights = bilinearWeights(lons, lats, self.__rect_center_ignore,
+                                          self.__curv_center_lons.flatten('F'),
+                                          self.__curv_center_lats.flatten('F'),
+                                          self.__flatIgnore(self.__curv_center_ignore))
+            else:
+                weights = conserveWeights(self.__getOverlaps().T,
+                                          self.__flatIgnore(self.__rect_center_ignore),
+                                          self.__flatIgnore(self.__curv_center_ignore))
+            self.__rect_to_curv_weights[name] = weights
+        return weights
+
+
+    def regridCurvToRect(self, undef_val, method=None):
+        '''
+        Regrids the assigned curvilinear data to the rectilinear grid
+        using the given method (BILINEAR if None).  Returns a 2D array
+        of data values at the rectilinear center points, with undef_val
+        assigned to unassigned points.  Raises a ValueError if either
+        grid does not exist or curvilinear data has not been assigned.
+        '''
+        if self.__curv_src_data is None:
+            raise ValueError("Curvilinear source data has not been assigned")
+        weights = self.getCurvToRectWeights(method)
+        result = applyWeights(weights, self.__curv_src_data.flatten('F'), undef_val)
+        return result.reshape(self.__rect_shape, order='F')
+
+
+    def regridRectToCurv(self, undef_val, method=None):
+        '''
+        Regrids the assigned rectilinear data to the curvilinear grid
+        using the given method (BILINEAR if None).  Returns a 2D array
+        of data values at the curvilinear center points, with undef_val
+        assigned to unassigned points.  Raises a ValueError if either
+        grid does not exist or rectilinear data has not been assigned.
+        '''
+        if self.__rect_src_data is None:
+            raise ValueError("Rectilinear source data has not been assigned")
+        weights = self.getRectToCurvWeights(method)
+        result = applyWeights(weights, self.__rect_src_data.flatten('F'), undef_val)
+        return result.reshape(self.__curv_shape, order='F')
+
+
+    def finalize(self):
+        '''
+        Removes the grids, data, and weights in this regridder.
+        '''
+        self.__init__()
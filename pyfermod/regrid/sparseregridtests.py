@@ -0,0 +1,234 @@
+'''
+Unit tests for CurvRectRegridder using the sparse backend
+'''
+
+import os
+import sys
+import unittest
+import numpy
+
+# Allow the regridding modules to import quadgeom from the parent
+# directory when run in this directory without pyferret
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from regrid2d import CurvRectRegridder
+from sparseregrid import overlapAreas
+
+
+class SparseCurvRectRegridderTests(unittest.TestCase):
+    '''
+    Unit tests for the sparse backend (SparseCurvRectRegridder)
+    of the CurvRectRegridder class
+    '''
+
+    def setUp(self):
+        '''
+        Create some repeatedly used test data.
+        '''
+        self.undef_val = numpy.array([-1.0E34])
+
+        # Rectilinear coordinates
+        self.rect_corner_lons = numpy.linspace(-110.0, -90.0, 11)
+        self.rect_corner_lats = numpy.linspace(0.0, 32.0, 9)
+        self.rect_center_lons = 0.5 * (self.rect_corner_lons[:-1] + self.rect_corner_lons[1:])
+        self.rect_center_lats = 0.5 * (self.rect_corner_lats[:-1] + self.rect_corner_lats[1:])
+        (self.rect_lons_mat, self.rect_lats_mat) = numpy.meshgrid(self.rect_center_lons,
+                                                 self.rect_center_lats, indexing='ij')
+
+        # Curvilinear coordinates - a sheared grid covering the rectilinear grid
+        (idx, jdx) = numpy.meshgrid(numpy.arange(33.0), numpy.arange(25.0), indexing='ij')
+        self.curv_corner_lons = -118.0 + 1.0 * idx - 0.25 * jdx
+        self.curv_corner_lats = -8.0 + 0.2 * idx + 2.0 * jdx
+        self.curv_center_lons = 0.25 * (self.curv_corner_lons[:-1, :-1] +
+                                        self.curv_corner_lons[1:, :-1] +
+                                        self.curv_corner_lons[1:, 1:] +
+                                        self.curv_corner_lons[:-1, 1:])
+        self.curv_center_lats = 0.25 * (self.curv_corner_lats[:-1, :-1] +
+                                        self.curv_corner_lats[1:, :-1] +
+                                        self.curv_corner_lats[1:, 1:] +
+                                        self.curv_corner_lats[:-1, 1:])
+
+
+    def linearFunc(self, lons, lats):
+        '''
+        Data linear in longitude and latitude; reproduced by bilinear regridding
+        '''
+        return 3.0 * lons - 2.0 * lats + 5.0
+
+
+    def createGrids(self, regridder, curv_ignore=None, rect_ignore=None, lon_shift=0.0):
+        '''
+        Creates the curvilinear and rectilinear grids in regridder
+        '''
+        regridder.createCurvGrid(self.curv_center_lons + lon_shift,
+                                 self.curv_center_lats, curv_ignore,
+                                 self.curv_corner_lons + lon_shift,
+                                 self.curv_corner_lats, None)
+        regridder.createRectGrid(self.rect_center_lons, self.rect_center_lats,
+                                 rect_ignore, self.rect_corner_lons,
+                                 self.rect_corner_lats, None)
+
+
+    def test01Init(self):
+        '''
+        Tests the backend argument of CurvRectRegridder
+        '''
+        regridder = CurvRectRegridder(backend='sparse')
+        regridder.finalize()
+        self.assertRaises(ValueError, CurvRectRegridder, backend='unknown')
+
+
+    def test02RegridCurvToRectBilinear(self):
+        '''
+        Tests bilinear regridding from curvilinear to rectilinear
+        '''
+        regridder = CurvRectRegridder(backend='sparse')
+        expect = self.linearFunc(self.rect_lons_mat, self.rect_lats_mat)
+        # longitudes shifted by 360 should not matter
+        for lon_shift in (0.0, 360.0):
+            self.createGrids(regridder, lon_shift=lon_shift)
+            regridder.assignCurvField(self.linearFunc(self.curv_center_lons,
+                                                      self.curv_center_lats))
+            regridder.assignRectField(None)
+            result = regridder.regridCurvToRect(self.undef_val, 'BILINEAR')
+            self.assertEqual(result.shape, expect.shape)
+            self.assertTrue(numpy.allclose(result, expect, rtol=1.0E-10, atol=1.0E-10))
+
+        # Ignored points are not assigned
+        curv_ignore = numpy.zeros(self.curv_center_lons.shape, dtype=bool)
+        curv_ignore[12, 10] = True
+        rect_ignore = numpy.zeros(self.rect_lons_mat.shape, dtype=bool)
+        rect_ignore[:2, :2] = True
+        self.createGrids(regridder, curv_ignore, rect_ignore)
+        regridder.assignCurvField(self.linearFunc(self.curv_center_lons,
+                                                  self.curv_center_lats))
+        result = regridder.regridCurvToRect(self.undef_val, 'BILINEAR')
+        undefined = ( result == self.undef_val )
+        self.assertTrue(undefined[rect_ignore].all())
+        self.assertTrue(undefined.sum() > rect_ignore.sum())
+        self.assertTrue(numpy.allclose(result[~undefined], expect[~undefined],
+                                       rtol=1.0E-10, atol=1.0E-10))
+        weights = regridder.getCurvToRectWeights('BILINEAR')
+        self.assertEqual(weights.shape, (expect.size, self.curv_center_lons.size))
+        self.assertEqual(weights.getcol(12 + 10 * self.curv_center_lons.shape[0]).nnz, 0)
+        regridder.finalize()
+
+
+    def test03RegridRectToCurvBilinear(self):
+        '''
+        Tests bilinear regridding from rectilinear to curvilinear
+        '''
+        regridder = CurvRectRegridder(backend='sparse')
+        self.createGrids(regridder)
+        regridder.assignRectField(self.linearFunc(self.rect_lons_mat, self.rect_lats_mat))
+        regridder.assignCurvField(None)
+        result = regridder.regridRectToCurv(self.undef_val, 'BILINEAR')
+        self.assertEqual(result.shape, self.curv_center_lons.shape)
+        # Curvilinear points within the rectilinear center points are assigned
+        inside = (self.curv_center_lons > self.rect_center_lons[0]) & \
+                 (self.curv_center_lons < self.rect_center_lons[-1]) & \
+                 (self.curv_center_lats > self.rect_center_lats[0]) & \
+                 (self.curv_center_lats < self.rect_center_lats[-1])
+        self.assertTrue(inside.any())
+        assigned = ( result != self.undef_val )
+        self.assertTrue(numpy.array_equal(assigned, inside))
+        expect = self.linearFunc(self.curv_center_lons, self.curv_center_lats)
+        self.assertTrue(numpy.allclose(result[inside], expect[inside],
+                                       rtol=1.0E-10, atol=1.0E-10))
+        regridder.finalize()
+
+
+    def test04RegridCurvToRectConserve(self):
+        '''
+        Tests conservative regridding from curvilinear to rectilinear using
+        a curvilinear grid that divides each rectilinear cell into four cells
+        '''
+        regridder = CurvRectRegridder(backend='sparse')
+        crn_lons = numpy.linspace(-110.0, -90.0, 21)
+        crn_lats = numpy.linspace(0.0, 32.0, 17)
+        (crn_lons, crn_lats) = numpy.meshgrid(crn_lons, crn_lats, indexing='ij')
+        ctr_lons = 0.5 * (crn_lons[:-1, :-1] + crn_lons[1:, 1:])
+        ctr_lats = 0.5 * (crn_lats[:-1, :-1] + crn_lats[1:, 1:])
+        # area of each curvilinear cell is proportional to the difference in sin(lat)
+        areas = numpy.sin(numpy.deg2rad(crn_lats[:-1, 1:])) - \
+                numpy.sin(numpy.deg2rad(crn_lats[:-1, :-1]))
+        data = self.linearFunc(ctr_lons, ctr_lats) + numpy.cos(ctr_lons)
+        curv_ignore = numpy.zeros(data.shape, dtype=bool)
+        curv_ignore[0, 0] = True
+        regridder.createCurvGrid(ctr_lons, ctr_lats, curv_ignore, crn_lons, crn_lats)
+        regridder.createRectGrid(self.rect_center_lons, self.rect_center_lats, None,
+                                 self.rect_corner_lons, self.rect_corner_lats)
+        regridder.assignCurvField(data)
+        result = regridder.regridCurvToRect(self.undef_val, 'CONSERVE')
+        # area-weighted averages of the four curvilinear cells not ignored
+        keep = numpy.logical_not(curv_ignore) * areas
+        sums = (data * keep).reshape((10, 2, 8, 2)).sum(axis=(1, 3))
+        totals = keep.reshape((10, 2, 8, 2)).sum(axis=(1, 3))
+        self.assertTrue(numpy.allclose(result, sums / totals, rtol=1.0E-10, atol=1.0E-10))
+        regridder.finalize()
+
+
+    def test05RegridRectToCurvConserve(self):
+        '''
+        Tests conservative regridding from rectilinear to curvilinear
+        '''
+        regridder = CurvRectRegridder(backend='sparse')
+        self.createGrids(regridder)
+        regridder.assignRectField(numpy.full(self.rect_lons_mat.shape, 4.0))
+        result = regridder.regridRectToCurv(self.undef_val, 'CONSERVE')
+        assigned = ( result != self.undef_val )
+        self.assertTrue(assigned.any() and not assigned.all())
+        self.assertTrue(numpy.allclose(result[assigned], 4.0, rtol=1.0E-12, atol=0.0))
+        regridder.finalize()
+
+
+    def test06Errors(self):
+        '''
+        Tests errors raised by the sparse backend
+        '''
+        regridder = CurvRectRegridder(backend='sparse')
+        self.createGrids(regridder)
+        # no data assigned
+        self.assertRaises(ValueError, regridder.regridCurvToRect, self.undef_val)
+        regridder.assignCurvField(self.linearFunc(self.curv_center_lons,
+                                                  self.curv_center_lats))
+        self.assertRaises(ValueError, regridder.regridCurvToRect, self.undef_val, 'PATCH')
+        # conservative regridding requires corners
+        regridder.createCurvGrid(self.curv_center_lons, self.curv_center_lats)
+        regridder.assignCurvField(self.linearFunc(self.curv_center_lons,
+                                                  self.curv_center_lats))
+        self.assertRaises(ValueError, regridder.regridCurvToRect, self.undef_val, 'CONSERVE')
+        regridder.finalize()
+
+
+    def test07OverlapAreasSeam(self):
+        '''
+        Tests overlapAreas includes the overlap of curvilinear cells crossing
+        the seam of a global rectilinear grid with the cells on both sides
+        '''
+        rect_lons = numpy.linspace(0.0, 360.0, 37)
+        rect_lats = numpy.linspace(-30.0, 30.0, 7)
+        # a row of cells from 345 to 375 (15 east), each 10 degrees wide
+        (crn_lons, crn_lats) = numpy.meshgrid(numpy.linspace(345.0, 375.0, 4),
+                                              numpy.array([-10.0, 10.0]), indexing='ij')
+        overlaps = overlapAreas(crn_lons, crn_lats, rect_lons, rect_lats).toarray()
+        cell_area = numpy.deg2rad(10.0) * 2.0 * numpy.sin(numpy.deg2rad(10.0))
+        # every curvilinear cell is completely covered by rectilinear cells
+        self.assertTrue(numpy.allclose(overlaps.sum(axis=0), cell_area, rtol=1.0E-12, atol=0.0))
+        # the middle cell (355 to 5) is split between the cells 350-360 and 0-10
+        # (rectilinear cells are numbered in Fortran order, so longitude varies fastest)
+        lon_overlaps = overlaps[:, 1].reshape((6, 36)).sum(axis=0)
+        self.assertEqual(list(numpy.nonzero(lon_overlaps)[0]), [ 0, 35 ])
+        self.assertTrue(numpy.allclose(lon_overlaps[[0, 35]], 0.5 * cell_area,
+                                       rtol=1.0E-12, atol=0.0))
+        # the same cells given with longitudes in [-180, 180]
+        wrapped = overlapAreas(numpy.where(crn_lons > 180.0, crn_lons - 360.0, crn_lons),
+                               crn_lats, rect_lons, rect_lats).toarray()
+        self.assertTrue(numpy.allclose(wrapped, overlaps, rtol=1.0E-12, atol=1.0E-15))
+
+
+if __name__ == "__main__":
+    '''
+    Run the unit tests in this module.
+    '''
+    unittest.main()
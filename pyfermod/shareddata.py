@@ -0,0 +1,122 @@
+'''
+Numeric arrays in memory shared between processes, for passing data
+to and from multiprocessing workers without copying.
+'''
+
+import os
+import tempfile
+import numpy
+
+# Directory for the memory-mapped files; /dev/shm (when available)
+# is a memory file system, so the data is never written to disk
+if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+    _SHARED_DIR = '/dev/shm'
+else:
+    _SHARED_DIR = None
+
+class SharedData(object):
+    '''
+    A handle to a NumPy array, in Fortran order, whose values are kept
+    in a memory-mapped file that can be used by any number of processes.
+    Pickling a SharedData (as done when passing it to or from a
+    multiprocessing worker) only pickles this small handle, and the
+    array returned by getarray in any process uses the same memory,
+    so the data is never copied.
+    '''
+
+    def __init__(self, shape, dtype=numpy.float64, filename=None):
+        '''
+        Creates a new shared array of zeros, or, if filename is given,
+        a handle to an existing shared array.
+            shape (tuple of int): shape of the array
+            dtype (numpy.dtype or string): type of the array values
+            filename (string): memory-mapped file of an existing shared array
+        Raises a ValueError if a problem occurs.
+        '''
+        try:
+            self._shape = tuple( [ int(size) for size in shape ] )
+            self._dtype = numpy.dtype(dtype)
+        except (TypeError, ValueError):
+            raise ValueError('shape must be a sequence of int and dtype must be a NumPy type')
+        if (filename is None) and (int(numpy.prod(self._shape)) == 0):
+            # memory mapping zero bytes is not possible, so nothing to share
+            filename = ''
+        if filename is None:
+            nbytes = int(numpy.prod(self._shape)) * self._dtype.itemsize
+            try:
+                (fd, filename) = tempfile.mkstemp(prefix='pyferret_', suffix='.dat', dir=_SHARED_DIR)
+                try:
+                    # the file is sparse, so the values are all zero
+                    os.ftruncate(fd, nbytes)
+                finally:
+                    os.close(fd)
+            except OSError as ex:
+                raise ValueError('unable to create shared memory of %d bytes: %s' % (nbytes, str(ex)))
+        self._filename = filename
+        self._array = None
+
+
+    def __reduce__(self):
+        '''
+        Pickles only the handle, not the array values
+        '''
+        return (SharedData, (self._shape, self._dtype.str, self._filename))
+
+
+    def __repr__(self):
+        '''
+        Representation of this SharedData
+        '''
+        return "SharedData(shape=%s, dtype='%s', filename='%s')" % \
+               (str(self._shape), self._dtype.str, self._filename)
+
+
+    def getshape(self):
+        '''
+        Returns the shape of the shared array.
+        '''
+        return self._shape
+
+
+    def getdtype(self):
+        '''
+        Returns the numpy.dtype of the shared array values.
+        '''
+        return self._dtype
+
+
+    def getarray(self):
+        '''
+        Returns the shared array as a writeable NumPy ndarray (a numpy.memmap)
+        in Fortran order.  Changes to the values in this array are seen by
+        every process using this shared array.
+        Raises a ValueError if the shared array no longer exists.
+        '''
+        if self._array is None:
+            if not self._filename:
+                self._array = numpy.zeros(self._shape, dtype=self._dtype, order='F')
+            else:
+                try:
+                    self._array = numpy.memmap(self._filename, dtype=self._dtype,
+                                               mode='r+', shape=self._shape, order='F')
+                except (IOError, OSError) as ex:
+                    raise ValueError('shared array no longer exists: %s' % str(ex))
+        return self._array
+
+
+    def unlink(self):
+        '''
+        Frees the shared array once all arrays using it (in any process)
+        have been deleted.  After this call, the shared array can no longer
+        be attached to by processes that have not already called getarray.
+        This should be called by one process when the shared array is no
+        longer needed; it is not called automatically since a handle being
+        passed to another process may be the only one remaining.
+        '''
+        if not self._filename:
+            return
+        try:
+            os.remove(self._filename)
+        except OSError:
+            pass
+
@@ -60,9 +60,47 @@ def create_all_scripts():
                 # function does not exist for the distribution - skip
                 pass
 
+def create_axis_script(scriptname, statname, statreturn, axisname):
+    """
+    Creates scriptname from 'stats_axis_template' using remaining
+    arguments for replacement strings in the template file.
+    """
+    templatefile = file("stats_axis_template", "r")
+    scriptfile = file(scriptname, "w")
+    for line in templatefile:
+        line = line.replace("<statname>", statname)
+        line = line.replace("<statreturn>", statreturn)
+        line = line.replace("<axisname>", axisname)
+        line = line.replace("<axisfuncname>", axisname.lower())
+        print(line, end=" ", file=scriptfile)
+    templatefile.close()
+    scriptfile.close()
+
+def create_all_axis_scripts():
+    """
+    Creates the stats_<statname>_<axisname>.py scripts, if they do not
+    already exist, for all the statistics computed along a single axis.
+    """
+    # List of statistics supported by pyferret.stats.assignaxisresults
+    statnamelist = [ ( "stats", "(unweighted) mean, variance, skew, and excess kurtosis", ),
+                     ( "pearsonr", "Pearson correlation coefficient and number of good points", ),
+                     ( "spearmanr", "Spearman's rank correlation coefficient and number of good points", ),
+                     ( "linregress", "linear regression slope, intercept, correlation coefficient, and number of good points", ),
+                     ( "zscore", "standard scores of the data values", ), ]
+    for (statname, statreturn) in statnamelist:
+        for axisname in "XYZTEF":
+            scriptname = "stats_%s_%s.py" % (statname, axisname.lower())
+            # Verify the script does not already exist.
+            if not os.path.exists(scriptname):
+                create_axis_script(scriptname, statname, statreturn, axisname)
+
 if __name__ == "__main__":
     # create all scripts from the 'stats_template' file
     if not os.path.exists("stats_template"):
         raise ValueError("The file 'stats_template' does not exist")
     create_all_scripts()
+    # create all scripts from the 'stats_axis_template' file
+    if not os.path.exists("stats_axis_template"):
+        raise ValueError("The file 'stats_axis_template' does not exist")
+    create_all_axis_scripts()
 
@@ -8,6 +8,7 @@ from __future__ import print_function
 
 import numpy
 import pyferret
+import pyferret.stats
 import scipy.stats
 
 
@@ -28,6 +29,7 @@ def ferret_init(id):
                                   "Difference from standard (N-1) degrees of freedom (num. computed parameters)", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, pyferret.FLOAT_ARRAY, pyferret.FLOAT_ONEVAL, ),
                 "influences": ( false_influences, false_influences, false_influences, ),
+                "argmasks": ( True, True, False, ),
               }
     return retdict
 
@@ -41,7 +43,7 @@ def ferret_custom_axes(id):
     return axis_defs
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Performs a chi-square test that a sample with the observed counts
     of categorical data, given in inputs[0], comes from a population
@@ -63,12 +65,8 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
                              "or both have only one defined non-singular axis of the same length")
     samcnts = inputs[0].reshape(-1)
     popcnts = inputs[1].reshape(-1)
-    badsam = ( numpy.fabs(samcnts - inpbdfs[0]) < 1.0E-5 )
-    badsam = numpy.logical_or(badsam, numpy.isnan(samcnts))
-    goodsam = numpy.logical_not(badsam)
-    badpop = ( numpy.fabs(popcnts - inpbdfs[1]) < 1.0E-5 )
-    badpop = numpy.logical_or(badpop, numpy.isnan(popcnts))
-    goodpop = numpy.logical_not(badpop)
+    goodsam = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0).reshape(-1)
+    goodpop = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 1).reshape(-1)
     goodmask = numpy.logical_and(goodsam, goodpop)
     samcnts = numpy.array(samcnts[goodmask], dtype=numpy.float64)
     numgood = len(samcnts)
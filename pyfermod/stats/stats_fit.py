@@ -28,6 +28,7 @@ def ferret_init(id):
                                   "Initial parameter estimates for this probability distribution", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, pyferret.STRING_ONEVAL, pyferret.FLOAT_ARRAY, ),
                 "influences": ( false_influences, false_influences, false_influences, ),
+                "argmasks": ( True, False, False, ),
               }
     return retdict
 
@@ -44,7 +45,7 @@ def ferret_custom_axes(id):
     return axis_defs
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns result with parameters for the probability distribution type
     indicated by inputs[1] (a string) that best fit the distribution of
@@ -54,9 +55,7 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
     """
     distribname = inputs[1]
     estparams = inputs[2].reshape(-1)
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
     values = inputs[0][goodmask]
     # values is a flattened array
     fitparams = pyferret.stats.getfitparams(values, distribname, estparams)
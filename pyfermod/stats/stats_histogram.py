@@ -6,6 +6,7 @@ from __future__ import print_function
 
 import numpy
 import pyferret
+import pyferret.stats
 
 # The following is just to circumvent to call to pyferret.get_axis_info for testing
 DOING_UNIT_TEST = False
@@ -25,16 +26,19 @@ def ferret_init(id):
                                  "Template argument whose one defined axis gives midpoints of bins"),
                 "argtypes": (pyferret.FLOAT_ARRAY, pyferret.FLOAT_ARRAY),
                 "influences": (false_influences, true_influences),
+                "argmasks": (True, False),
               }
     return retdict
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns result with histogram bin counts of data in inputs[0].  Bin
     limits are defined using the values of the one defined non-singular
     axis associated with inputs[1].  The argument inputs[1] is otherwise
     unused.  Undefined values in inputs[0] are eliminated before binning.
+    The values are binned a chunk at a time, so a flattened copy of all
+    the defined values is never created.
     """
     # get the box limits of the one defined non-singular axis of the second argument
     if DOING_UNIT_TEST:
@@ -59,13 +63,11 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
     bin_edges = numpy.empty( ( len(limits_tuple[1]) + 1, ), dtype=numpy.float64)
     bin_edges[0] = limits_tuple[0][0]
     bin_edges[1:] = limits_tuple[1]
-    # get the clean data as a flattened array
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
-    values = inputs[0][goodmask]
-    # compute the histogram and assign the counts to result
-    (hist, edges) = numpy.histogram(values, bins=bin_edges)
+    # compute the histogram from chunks of the clean data and assign the counts to result
+    histogram = pyferret.stats.StreamingHistogram(bin_edges)
+    for values in pyferret.stats.iterinputchunks(inputs, inpbdfs, inpmasks, 0):
+        histogram.update(values)
+    hist = histogram.getcounts()
     if axis_used == pyferret.X_AXIS:
         result[:,0,0,0,0,0] = hist
     elif axis_used == pyferret.Y_AXIS:
@@ -28,6 +28,7 @@ def ferret_init(id):
                                   "Parameters for this continuous probability distribution"),
                 "argtypes": ( pyferret.FLOAT_ARRAY, pyferret.STRING_ONEVAL, pyferret.FLOAT_ARRAY, ),
                 "influences": ( false_influences, false_influences, false_influences, ),
+                "argmasks": ( True, False, False, ),
               }
     return retdict
 
@@ -41,7 +42,7 @@ def ferret_custom_axes(id):
     return axis_defs
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Performs a two-sided Kolmogorov-Smirnov test that the provided sample
     comes from a population with the given probability distribution function.
@@ -64,9 +65,7 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
     if distscipyparams is None:
         raise ValueError("Unknown or unsupported (for params) probability distribution function %s" % inputs[1])
     # get the valid sample values
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
     values = inputs[0][goodmask]
     # perform the test and assign the results
     fitparams = scipy.stats.kstest(values, distscipyname, distscipyparams)
@@ -8,6 +8,7 @@ from __future__ import print_function
 import math
 import numpy
 import pyferret
+import pyferret.stats
 import scipy.stats
 
 
@@ -26,6 +27,7 @@ def ferret_init(id):
                                   "Ordinate values for the linear regression fit", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, pyferret.FLOAT_ARRAY, ),
                 "influences": ( false_influences, false_influences, ),
+                "argmasks": True,
               }
     return retdict
 
@@ -47,7 +49,7 @@ def ferret_custom_axes(id):
     return axis_defs
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns result with parameters for the linear regression of the
     ordinate values given inputs[1] to the abscissa values given in
@@ -70,11 +72,8 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
                              "both have only one defined non-singular axis of the same length")
     abscissa = inputs[0].reshape(-1)
     ordinate = inputs[1].reshape(-1)
-    badmaska = ( numpy.fabs(abscissa - inpbdfs[0]) < 1.0E-5 )
-    badmaska = numpy.logical_or(badmaska, numpy.isnan(abscissa))
-    badmasko = ( numpy.fabs(ordinate - inpbdfs[1]) < 1.0E-5 )
-    badmasko = numpy.logical_or(badmasko, numpy.isnan(ordinate))
-    goodmask = numpy.logical_not(numpy.logical_or(badmaska, badmasko))
+    goodmask = numpy.logical_and(pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0).reshape(-1),
+                                 pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 1).reshape(-1))
     xvals = numpy.array(abscissa[goodmask], dtype=numpy.float64)
     numpts = len(xvals)
     if numpts < 2:
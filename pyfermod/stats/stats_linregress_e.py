@@ -0,0 +1,33 @@
+"""
+Returns the linear regression slope, intercept, correlation coefficient, and number of good points
+computed along the E axis of the given data
+for every point of the other axes.
+"""
+import numpy
+import pyferret
+import pyferret.stats
+
+STAT_NAME = "linregress"
+AXIS_NAME = "E"
+
+
+def ferret_init(id):
+    """
+    Initialization for the stats_linregress_e Ferret PyEF
+    """
+    return pyferret.stats.getaxisinitdict(STAT_NAME, AXIS_NAME)
+
+
+def ferret_custom_axes(id):
+    """
+    Define custom axis of the stats_linregress_e Ferret PyEF
+    """
+    return pyferret.stats.getaxiscustomaxes(STAT_NAME, AXIS_NAME)
+
+
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
+    """
+    Result array assignment for the stats_linregress_e Ferret PyEF
+    """
+    pyferret.stats.assignaxisresults(STAT_NAME, AXIS_NAME,
+                                     result, resbdf, inputs, inpbdfs, inpmasks)
@@ -4,6 +4,9 @@ for the Normal probability distribution
 using the given arrays for the abscissa or template
 values and each of the parameters values.
 """
+
+from __future__ import print_function
+
 import numpy
 import pyferret
 import pyferret.stats
@@ -26,3 +29,38 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
     pyferret.stats.assignresultsarray(DISTRIB_NAME, FUNC_NAME,
                                       result, resbdf, inputs, inpbdfs)
 
+
+#
+# The rest of this is just for testing this module at the command line
+#
+if __name__ == "__main__":
+    # make sure ferret_init does not have problems
+    info = ferret_init(0)
+
+    # Normal percent point function values along the Y axis, including the
+    # infinite values at probabilities of zero and one, with MU on the X axis
+    probs = numpy.array([0.0, 0.025, 0.5, -9999.0, 0.975, 1.0], dtype=numpy.float64)
+    mus = numpy.array([0.0, -8888.0, 5.0], dtype=numpy.float64)
+    sigma = 2.0
+    expected = numpy.empty((3, 6, 1, 1, 1, 1), dtype=numpy.float64, order='F')
+    for i in range(3):
+        expected[i, :, 0, 0, 0, 0] = mus[i] + sigma * numpy.array(
+                [-numpy.inf, -1.959963984540054, 0.0, 0.0, 1.959963984540054, numpy.inf])
+    resbdf = numpy.array([-6666.0], dtype=numpy.float64)
+    expected[:, 3, 0, 0, 0, 0] = resbdf[0]
+    expected[1, :, 0, 0, 0, 0] = resbdf[0]
+    # configure arrays for ferret_compute
+    probs = probs.reshape((1, 6, 1, 1, 1, 1), order='F')
+    mus = mus.reshape((3, 1, 1, 1, 1, 1), order='F')
+    sigmas = numpy.array([sigma], dtype=numpy.float64).reshape((1, 1, 1, 1, 1, 1), order='F')
+    inpbdfs = numpy.array([-9999.0, -8888.0, -7777.0], dtype=numpy.float64)
+    # Get the result from ferret_compute and compare
+    result = -5555.0 * numpy.ones((3, 6, 1, 1, 1, 1), dtype=numpy.float64, order='F')
+    ferret_compute(0, result, resbdf, (probs, mus, sigmas), inpbdfs)
+    if not numpy.allclose(result, expected):
+        print("Expect (flattened) =\n%s" % str(expected.reshape(-1)))
+        print("Result (flattened) =\n%s" % str(result.reshape(-1)))
+        raise ValueError("Unexpected result")
+
+    # All successful
+    print("Success")
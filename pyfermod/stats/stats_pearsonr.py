@@ -8,6 +8,7 @@ from __future__ import print_function
 import math
 import numpy
 import pyferret
+import pyferret.stats
 import scipy.stats
 
 
@@ -26,6 +27,7 @@ def ferret_init(id):
                                   "Second array of sample data", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, pyferret.FLOAT_ARRAY, ),
                 "influences": ( false_influences, false_influences, ),
+                "argmasks": True,
               }
     return retdict
 
@@ -39,7 +41,7 @@ def ferret_custom_axes(id):
     return axis_defs
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns result with the Pearson product-moment correlation
     coefficient, and the number of good points, between the two
@@ -55,11 +57,8 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
                              "both have only one defined non-singular axis of the same length")
     sampa = inputs[0].reshape(-1)
     sampb = inputs[1].reshape(-1)
-    bada = ( numpy.fabs(sampa - inpbdfs[0]) < 1.0E-5 )
-    bada = numpy.logical_or(bada, numpy.isnan(sampa))
-    badb = ( numpy.fabs(sampb - inpbdfs[1]) < 1.0E-5 )
-    badb = numpy.logical_or(badb, numpy.isnan(sampb))
-    goodmask = numpy.logical_not(numpy.logical_or(bada, badb))
+    goodmask = numpy.logical_and(pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0).reshape(-1),
+                                 pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 1).reshape(-1))
     valsa = numpy.array(sampa[goodmask], dtype=numpy.float64)
     numpts = len(valsa)
     if numpts < 2:
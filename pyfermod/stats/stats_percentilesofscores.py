@@ -6,6 +6,7 @@ from __future__ import print_function
 
 import numpy
 import pyferret
+import pyferret.stats
 import scipy.stats
 
 
@@ -24,11 +25,12 @@ def ferret_init(id):
                                   "Scores (values) to find percentiles through sample", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, pyferret.FLOAT_ARRAY, ),
                 "influences": ( false_influences, true_influences, ),
+                "argmasks": True,
               }
     return retdict
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns result with interpolated percentiles through a sample
     that correspond to given scores.  The sample scores are given
@@ -43,14 +45,11 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
         raise ValueError("Unexpected error; SCORES dimen: %s; result dimen: %s" % \
                          (str(inputs[1].shape), str(result.shape)))
     # get the clean sample data as a flattened array
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
     values = inputs[0][goodmask]
     # get the mask for the good scores
-    badmask = ( numpy.fabs(inputs[1] - inpbdfs[1]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[1]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 1)
+    badmask = numpy.logical_not(goodmask)
     # percentileofscore doesn't take an array for the scores
     # so do them one at a time
     prcnts = [ ]
@@ -27,11 +27,12 @@ def ferret_init(id):
                                  "Parameters for this discrete probability distribution"),
                 "argtypes": (pyferret.FLOAT_ARRAY, pyferret.STRING_ONEVAL, pyferret.FLOAT_ARRAY),
                 "influences": (true_influences, false_influences, false_influences),
+                "argmasks": (True, False, False),
               }
     return retdict
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns result with the probability mass function values for the discrete
     probability distribution indicated by inputs[1] (a string) using the
@@ -41,9 +42,8 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
     distribname = inputs[1]
     distribparams = inputs[2].reshape(-1)
     distrib = pyferret.stats.getdistrib(distribname, distribparams)
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
+    badmask = numpy.logical_not(goodmask)
     result[badmask] = resbdf
     # array[goodmask] is a flattened array
     result[goodmask] = distrib.pmf(inputs[0][goodmask])
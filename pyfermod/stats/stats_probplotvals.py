@@ -41,6 +41,7 @@ def ferret_init(id):
                                  "Parameters for this continuous probability distribution"),
                 "argtypes": (pyferret.FLOAT_ARRAY, pyferret.STRING_ONEVAL, pyferret.FLOAT_ARRAY),
                 "influences": (false_influences, false_influences, false_influences),
+                "argmasks": (True, False, False),
               }
     return retdict
 
@@ -63,7 +64,7 @@ def ferret_custom_axes(id):
     return axis_defs
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns to result[:,0] the order statistic medians for
     the probability distribution named in inputs[1] with 
@@ -85,8 +86,7 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
         raise ValueError("Unknown (for params) probability function %s" % distribname)
 
     sample = inputs[0].reshape(-1)
-    badmask = ( numpy.fabs(sample - inpbdfs[0]) < 1.0E-5 )
-    goodmask = numpy.logical_not(numpy.logical_or(badmask, numpy.isnan(sample)))
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0).reshape(-1)
     ppdata = scipy.stats.probplot(sample[goodmask], distparams, distname, fit=1)
     result[:] = resbdf
     result[goodmask,0,0,0,0,0] = ppdata[0][0]
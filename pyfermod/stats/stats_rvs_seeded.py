@@ -0,0 +1,117 @@
+"""
+Returns the array of random variates for a probability distribution
+assigned to positions corresponding to defined values in an input array,
+generated reproducibly from a given seed and stream.
+"""
+
+from __future__ import print_function
+
+import numpy
+import pyferret
+import pyferret.stats
+
+
+def ferret_init(id):
+    """
+    Initialization for the stats_rvs_seeded python-backed ferret external function
+    """
+    axes_values = [ pyferret.AXIS_IMPLIED_BY_ARGS ] * pyferret.MAX_FERRET_NDIM
+    true_influences = [ True ] * pyferret.MAX_FERRET_NDIM
+    false_influences = [ False ] * pyferret.MAX_FERRET_NDIM
+    retdict = { "numargs": 4,
+                "descript": "Returns reproducible random variates for a probability distribution",
+                "axes": axes_values,
+                "argnames": ("TEMPLATE", "PDNAME", "PDPARAMS", "SEED"),
+                "argdescripts": ("Template array for the array of random variates to be returned",
+                                 "Name of a probability distribution",
+                                 "Parameters for this probability distribution",
+                                 "Seed, and optional stream number, for the random variates"),
+                "argtypes": (pyferret.FLOAT_ARRAY, pyferret.STRING_ONEVAL,
+                             pyferret.FLOAT_ARRAY, pyferret.FLOAT_ARRAY),
+                "influences": (true_influences, false_influences,
+                               false_influences, false_influences),
+                "argmasks": (True, False, False, False),
+              }
+    return retdict
+
+
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
+    """
+    Assigns result with random variates of the probability distribution
+    indicated by inputs[1] (a string) using the parameters given in
+    inputs[2].  Random variates will be assigned to positions corresponding
+    to defined positions in inputs[0].  For positions where the inputs[0]
+    value is undefined, the result value will be undefined.  The random
+    variates are generated from the non-negative integer seed given as the
+    first value of inputs[3], using the independent stream of values given
+    by the optional second value of inputs[3].  The same seed and stream
+    always give the same random variates.
+    """
+    distribname = inputs[1]
+    distribparams = inputs[2].reshape(-1)
+    # raises a ValueError if the distribution or parameters are invalid
+    pyferret.stats.getdistrib(distribname, distribparams)
+    seedvals = inputs[3].reshape(-1)
+    seedvals = seedvals[ pyferret.stats.getgoodmask(seedvals, inpbdfs[3]) ]
+    if (len(seedvals) < 1) or (len(seedvals) > 2):
+        raise ValueError("SEED must be one or two defined values (seed and stream)")
+    if numpy.any(seedvals < 0.0) or numpy.any(seedvals != numpy.floor(seedvals)):
+        raise ValueError("SEED values must be non-negative integers")
+    seed = int(seedvals[0])
+    if len(seedvals) > 1:
+        stream = int(seedvals[1])
+    else:
+        stream = 0
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
+    badmask = numpy.logical_not(goodmask)
+    result[badmask] = resbdf
+    # result[goodmask] is a flattened array
+    result[goodmask] = pyferret.stats.getrandomvariates(distribname,
+                           distribparams, (numpy.count_nonzero(goodmask),),
+                           seed=seed, stream=stream)
+
+
+#
+# The rest of this is just for testing this module at the command line
+#
+if __name__ == "__main__":
+    # make sure ferret_init does not have problems
+    info = ferret_init(0)
+
+    undefval = -65536.0
+    xdim = 19
+    ydim = 21
+    zdim = 17
+    tdim = 23
+
+    pfname = "norm"
+    pfparams = numpy.array([5.0, 0.5], dtype=numpy.float64)
+    inpbdfs = numpy.array([-1.0, 0.0, 0.0, -1.0], dtype=numpy.float64)
+    resbdf = numpy.array([undefval], dtype=numpy.float64)
+    template = numpy.zeros((xdim, ydim, zdim, tdim, 1, 1), dtype=numpy.float64, order='F')
+    template.reshape(-1, order='F')[1::53] = inpbdfs[0]
+    expectedgood = ( template != inpbdfs[0] )
+
+    # the same seed and stream give the same values
+    results = [ ]
+    for seed in ( (123.0,), (123.0,), (123.0, 1.0), (124.0,) ):
+        result = -8888.0 * numpy.ones((xdim, ydim, zdim, tdim, 1, 1), dtype=numpy.float64, order='F')
+        seedarray = numpy.array(seed, dtype=numpy.float64).reshape((len(seed), 1, 1, 1, 1, 1))
+        ferret_compute(0, result, resbdf, (template, pfname, pfparams, seedarray), inpbdfs)
+        resultgood = ( result != resbdf )
+        if numpy.any( resultgood != expectedgood ):
+            raise ValueError("Assigned random variates does not match template")
+        results.append(result)
+    if not numpy.array_equal(results[0], results[1]):
+        raise ValueError("Random variates from the same seed differ")
+    if numpy.array_equal(results[0], results[2]) or numpy.array_equal(results[0], results[3]):
+        raise ValueError("Random variates from different seeds or streams are the same")
+    mean = numpy.mean(results[0][expectedgood])
+    if abs(mean - 5.0) > 5.0E-3:
+        raise ValueError("Mean of random sample: expected: 5.0; found: %f" % mean)
+    stdev = numpy.std(results[0][expectedgood])
+    if abs(stdev - 0.5) > 5.0E-3:
+        raise ValueError("Standard deviation of random sample: expected: 0.5; found: %f" % stdev)
+
+    # All successful
+    print("Success")
@@ -6,8 +6,11 @@ from __future__ import print_function
 
 import numpy
 import pyferret
-import scipy.stats
+import pyferret.stats
 
+# Largest number of defined sample values for which the scores are exact;
+# larger samples use a quantile sketch instead of a copy of the values
+_EXACT_MAX_VALUES = 1 << 27
 
 def ferret_init(id):
     """
@@ -17,45 +20,54 @@ def ferret_init(id):
     true_influences = [ True ] * pyferret.MAX_FERRET_NDIM
     false_influences = [ False ] * pyferret.MAX_FERRET_NDIM
     retdict = { "numargs": 2,
-                "descript": "Returns interpolated scores (values) that are given percentiles through a sample",
+                "descript": "Returns interpolated scores (values) that are given percentiles through a sample " \
+                            "(approximate for samples of more than %d defined values)" % _EXACT_MAX_VALUES,
                 "axes": axes_values,
                 "argnames": ( "SAMPLE", "PERCENTILES", ),
                 "argdescripts": ( "Sample of scores (values)",
                                   "Percentiles (0-100) through sample to find scores (values) of", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, pyferret.FLOAT_ARRAY, ),
                 "influences": ( false_influences, true_influences, ),
+                "argmasks": True,
               }
     return retdict
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns result with interpolated scores that are given percentiles
     through a sample.  The sample scores are given in inputs[0], and the
     percentiles are given in inputs[1].  Undefined values in inputs[0]
-    are eliminated before using it in scipy.stats.scoreatpercentile.
-    Undefined values in inputs[1] return corresponding undefined values
-    in result.
+    are eliminated before finding the scores, which are exact, as from
+    scipy.stats.scoreatpercentile.  For samples of more than
+    _EXACT_MAX_VALUES defined values, the defined values are instead
+    added, a chunk at a time, to a quantile sketch, and the scores are
+    approximate with errors bounded as described in
+    pyferret.stats.QuantileSketch.  Undefined values in inputs[1] return
+    corresponding undefined values in result.
     """
     # make sure result has the expected dimensions
     if result.shape != inputs[1].shape:
         raise ValueError("Unexpected error; PERCENTILE dimen: %s; result dimen: %s" % \
                          (str(inputs[1].shape), str(result.shape)))
-    # get the clean sample data as a flattened array
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
-    values = inputs[0][goodmask]
     # get the mask for the good percentiles
-    badmask = ( numpy.fabs(inputs[1] - inpbdfs[1]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[1]))
-    goodmask = numpy.logical_not(badmask)
-    # scoreatpercentile doesn't take an array for the percentiles
-    # so do them one at a time
-    scores = [ ]
-    for prcnt in inputs[1][goodmask]:
-        scores.append(scipy.stats.scoreatpercentile(values, prcnt))
-    result[goodmask] = scores
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 1)
+    badmask = numpy.logical_not(goodmask)
+    prcnts = inputs[1][goodmask]
+    samplemask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
+    numvalues = numpy.count_nonzero(samplemask)
+    if numvalues == 0:
+        result[goodmask] = numpy.nan
+    elif numvalues <= _EXACT_MAX_VALUES:
+        # exact scores from the clean sample data as a flattened array
+        values = inputs[0][samplemask]
+        result[goodmask] = numpy.percentile(values, prcnts, overwrite_input=True)
+    else:
+        # summarize chunks of the clean sample data
+        sketch = pyferret.stats.QuantileSketch()
+        for values in pyferret.stats.iterinputchunks(inputs, inpbdfs, inpmasks, 0):
+            sketch.update(values)
+        result[goodmask] = sketch.percentiles(prcnts)
     result[badmask] = resbdf
 
 
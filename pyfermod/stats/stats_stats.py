@@ -8,6 +8,7 @@ from __future__ import print_function
 import math
 import numpy
 import pyferret
+import pyferret.stats
 import scipy.stats
 
 
@@ -25,6 +26,7 @@ def ferret_init(id):
                 "argdescripts": ( "Array of values to find the statistical values of", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, ),
                 "influences": ( false_influences, ),
+                "argmasks": True,
               }
     return retdict
 
@@ -38,7 +40,7 @@ def ferret_custom_axes(id):
     return axis_defs
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns result with the (unweighted) mean, variance, skew, and
     excess kurtosis of the sample given in inputs[0].  Undefined
@@ -46,9 +48,7 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
     methods.
     """
     # get the clean sample data as a flattened array
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
     values = numpy.array(inputs[0][goodmask], dtype=numpy.float64)
     # Use the numpy/scipy methods which includes some guards
     result[:] = resbdf
@@ -7,6 +7,7 @@ from __future__ import print_function
 
 import numpy
 import pyferret
+import pyferret.stats
 import scipy.stats
 
 
@@ -27,6 +28,7 @@ def ferret_init(id):
                                   "Proposed population means (averages)", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, pyferret.FLOAT_ARRAY, ),
                 "influences": ( false_influences, false_influences, ),
+                "argmasks": True,
               }
     return retdict
 
@@ -49,7 +51,7 @@ def ferret_custom_axes(id):
     return axis_defs
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Performs a two-sided T-test that the provided sampe comes from a
     population with the given mean values.  The sample is given in
@@ -59,16 +61,12 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
     Undefined data in inputs[0] are removed before performing the test.
     """
     # get the valid sample values as 64-bit floats
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
     values = numpy.array(inputs[0][goodmask], dtype=numpy.float64)
     # get the good mean values
     # need to flatten so the mask is one-dimensional
     means = inputs[1].reshape(-1)
-    badmask = ( numpy.fabs(means - inpbdfs[1]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(means))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 1).reshape(-1)
     means = numpy.array(means[goodmask], dtype=numpy.float64)
     # perform the test and assign the results
     fitparams = scipy.stats.ttest_1samp(values, means)
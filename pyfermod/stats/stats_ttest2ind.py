@@ -7,6 +7,7 @@ from __future__ import print_function
 
 import numpy
 import pyferret
+import pyferret.stats
 import scipy.stats
 
 
@@ -26,6 +27,7 @@ def ferret_init(id):
                                   "Second sample data array", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, pyferret.FLOAT_ARRAY, ),
                 "influences": ( false_influences, false_influences, ),
+                "argmasks": True,
               }
     return retdict
 
@@ -39,7 +41,7 @@ def ferret_custom_axes(id):
     return axis_defs
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Performs a two-sided T-test that two independent samples come from
     (normal) distributions with the same mean.  The samples are given
@@ -50,13 +52,9 @@ def ferret_compute(id, result, resbdf, inputs, inpbdfs):
     thus there are no restrictions on the relative dimensions of sample
     arrays.
     """
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
     sampa = inputs[0][goodmask]
-    badmask = ( numpy.fabs(inputs[1] - inpbdfs[1]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[1]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 1)
     sampb = inputs[1][goodmask]
     fitparams = scipy.stats.ttest_ind(sampa, sampb)
     result[:] = resbdf
@@ -9,6 +9,7 @@ from __future__ import print_function
 import math
 import numpy
 import pyferret
+import pyferret.stats
 import scipy.stats
 
 
@@ -26,20 +27,20 @@ def ferret_init(id):
                 "argdescripts": ( "Array of data values", ),
                 "argtypes": ( pyferret.FLOAT_ARRAY, ),
                 "influences": ( true_influences, ),
+                "argmasks": True,
               }
     return retdict
 
 
-def ferret_compute(id, result, resbdf, inputs, inpbdfs):
+def ferret_compute(id, result, resbdf, inputs, inpbdfs, inpmasks=None):
     """
     Assigns result standard scores of data values given in inputs[0]
     relative to a normal distribution with the same mean and variance
     as the data.  For undefined data values, the result value will
     be undefined.
     """
-    badmask = ( numpy.fabs(inputs[0] - inpbdfs[0]) < 1.0E-5 )
-    badmask = numpy.logical_or(badmask, numpy.isnan(inputs[0]))
-    goodmask = numpy.logical_not(badmask)
+    goodmask = pyferret.stats.getinputmask(inputs, inpbdfs, inpmasks, 0)
+    badmask = numpy.logical_not(goodmask)
     result[badmask] = resbdf
     # convert to 64-bit for precision in calculating the mean and variance
     sample = numpy.array(inputs[0][goodmask], dtype=numpy.float64)